@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Script de migration pour créer les index composites des tables demandes_conges et notifications
+(create_all au démarrage ne crée pas les index des tables déjà existantes)
+"""
+
+import asyncio
+from sqlalchemy import text
+from models.database import engine
+from models.demande_conge import DemandeConge
+from models.notification import Notification
+
+async def add_composite_indexes():
+    """Crée les index déclarés sur les modèles s'ils n'existent pas encore"""
+    async with engine.begin() as conn:
+        for table in (DemandeConge.__table__, Notification.__table__):
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                colonnes = ", ".join(column.name for column in index.columns)
+                await conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index.name} ON {table.name} ({colonnes})"
+                ))
+                print(f"✓ Index {index.name} ({colonnes})")
+        
+        # Mettre à jour les statistiques utilisées par le planificateur de requêtes SQLite
+        await conn.execute(text("ANALYZE"))
+        print("✓ Statistiques mises à jour")
+
+if __name__ == "__main__":
+    print("Migration: Ajout des index composites")
+    asyncio.run(add_composite_indexes())
+    print("✓ Migration terminée")
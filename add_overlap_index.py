@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script de migration pour remplacer l'index (demandeur_id, statut) de demandes_conges
+par l'index couvrant (demandeur_id, statut, date_debut, date_fin, id) utilisé par la détection de chevauchements
+(l'index est recréé s'il existe déjà sans la colonne id)
+"""
+
+import asyncio
+from sqlalchemy import text
+from models.database import engine
+
+async def add_overlap_index():
+    """Crée l'index couvrant et supprime l'ancien index dont il est un préfixe"""
+    async with engine.begin() as conn:
+        colonnes = await conn.execute(text("PRAGMA index_info(ix_demandes_conges_demandeur_statut_dates)"))
+        if "id" not in [colonne[2] for colonne in colonnes.all()]:
+            await conn.execute(text("DROP INDEX IF EXISTS ix_demandes_conges_demandeur_statut_dates"))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_demandes_conges_demandeur_statut_dates "
+            "ON demandes_conges (demandeur_id, statut, date_debut, date_fin, id)"
+        ))
+        print("✓ Index ix_demandes_conges_demandeur_statut_dates (demandeur_id, statut, date_debut, date_fin, id)")
+        
+        await conn.execute(text("DROP INDEX IF EXISTS ix_demandes_conges_demandeur_statut"))
+        print("✓ Ancien index ix_demandes_conges_demandeur_statut supprimé")
+        
+        await conn.execute(text("ANALYZE demandes_conges"))
+        print("✓ Statistiques mises à jour")
+
+if __name__ == "__main__":
+    print("Migration: Index de détection des chevauchements")
+    asyncio.run(add_overlap_index())
+    print("✓ Migration terminée")
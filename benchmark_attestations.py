@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la latence d'un endpoint sans rapport (p50/p99) pendant la génération
+concurrente d'attestations : rendu reportlab dans l'event loop (ancien comportement)
+contre rendu dans le pool de processus (GenerateurAttestations).
+
+Usage : python benchmark_attestations.py [attestations_concurrentes]   (8 par défaut)
+Les PDF sont écrits dans un dossier temporaire, le dossier attestations n'est pas modifié.
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date
+
+import httpx
+from fastapi import FastAPI
+
+from services.attestation_service import DonneesAttestation, GenerateurAttestations, rendre_attestation_octets
+from services.stockage_attestations import StockageLocal
+
+NOMBRE_PINGS = 500
+INTERVALLE_PINGS = 0.005
+ATTESTATIONS_PAR_CLIENT = 5
+
+DONNEES = DonneesAttestation(
+    demande_id=uuid.uuid4(), user_id=uuid.uuid4(), nom="Kouassi", prenom="Aya", role="employe",
+    date_debut=date(2025, 7, 1), date_fin=date(2025, 7, 21), date_generation=date(2025, 6, 15)
+)
+
+def creer_app(mode: str, generateur: GenerateurAttestations) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.post("/attestation/{numero}")
+    async def attestation(numero: int):
+        pdf_filename = f"attestation_{numero}.pdf"
+        if mode == "bloquant":
+            await generateur.stockage.enregistrer(pdf_filename, rendre_attestation_octets(DONNEES))
+        else:
+            await generateur.generer(DONNEES, pdf_filename)
+        return {"filename": pdf_filename}
+
+    return app
+
+def percentile(valeurs: list, rang: float) -> float:
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * rang))]
+
+async def mesurer(mode: str, concurrentes: int, dossier: str) -> None:
+    generateur = GenerateurAttestations(stockage=StockageLocal(dossier))
+    if mode == "pool":
+        await generateur.demarrer()
+        # Préchauffer les processus (import de reportlab) hors mesure
+        await asyncio.gather(*(generateur.generer(DONNEES, f"prechauffage_{i}.pdf") for i in range(generateur.taille_pool)))
+
+    app = creer_app(mode, generateur)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        en_cours = True
+
+        async def client_attestations(numero_client: int) -> None:
+            numero = numero_client * 1000
+            while en_cours:
+                for _ in range(ATTESTATIONS_PAR_CLIENT):
+                    numero += 1
+                    await client.post(f"/attestation/{numero}")
+
+        clients = [asyncio.create_task(client_attestations(i)) for i in range(concurrentes)]
+        latences = []
+        debut_total = time.perf_counter()
+        for _ in range(NOMBRE_PINGS):
+            debut = time.perf_counter()
+            await client.get("/ping")
+            latences.append((time.perf_counter() - debut) * 1000)
+            await asyncio.sleep(INTERVALLE_PINGS)
+        duree_totale = time.perf_counter() - debut_total
+
+        en_cours = False
+        await asyncio.gather(*clients)
+
+    await generateur.arreter()
+    print(f"{mode:>9} : p50 {statistics.median(latences):7.2f} ms   p99 {percentile(latences, 0.99):7.2f} ms   "
+          f"max {max(latences):7.2f} ms   ({NOMBRE_PINGS} pings en {duree_totale:.1f} s)")
+
+async def main(concurrentes: int) -> None:
+    with tempfile.TemporaryDirectory() as dossier:
+        print(f"Latence de /ping pendant {concurrentes} générations d'attestations concurrentes")
+        for mode in ("bloquant", "pool"):
+            await mesurer(mode, concurrentes, dossier)
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark des index composites : plans de requête (EXPLAIN QUERY PLAN) et temps
+d'exécution des requêtes les plus fréquentes, avant et après création des index.
+
+Usage : python benchmark_index_plans.py [nombre_de_lignes]   (1 000 000 par défaut)
+La base de test est créée dans un fichier temporaire, conges.db n'est pas modifiée.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models.demande_conge import DemandeConge, StatutDemandeEnum, TypeCongeEnum
+from models.notification import Notification, TypeNotificationEnum
+
+NOMBRE_UTILISATEURS = 5000
+NOMBRE_VALIDEURS = 200
+REPETITIONS = 20
+
+# Requêtes représentatives des routes (mêmes formes que les requêtes SQLAlchemy générées)
+REQUETES = {
+    "demandes d'un employé par statut": (
+        "SELECT * FROM demandes_conges WHERE demandeur_id = :user_id AND statut = 'APPROUVEE'"
+    ),
+    "demandes à valider": (
+        "SELECT * FROM demandes_conges WHERE valideur_id = :valideur_id AND statut = 'EN_ATTENTE'"
+    ),
+    "congés en cours": (
+        "SELECT * FROM demandes_conges WHERE statut = 'APPROUVEE' "
+        "AND date_debut <= :jour AND date_fin >= :jour"
+    ),
+    "notifications non lues": (
+        "SELECT * FROM notifications WHERE destinataire_id = :user_id AND lue = 0 "
+        "ORDER BY date_creation DESC LIMIT 50"
+    ),
+}
+
+def creer_schema(conn: sqlite3.Connection) -> None:
+    """Crée les tables à partir des modèles, sans leurs index"""
+    for table in (DemandeConge.__table__, Notification.__table__):
+        ddl = str(CreateTable(table).compile(dialect=sqlite.dialect()))
+        # Les clés étrangères vers users ne sont pas vérifiées (PRAGMA foreign_keys désactivé)
+        conn.execute(ddl)
+
+def creer_index(conn: sqlite3.Connection) -> None:
+    """Crée les index composites déclarés sur les modèles"""
+    for table in (DemandeConge.__table__, Notification.__table__):
+        for index in table.indexes:
+            conn.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+    conn.execute("ANALYZE")
+
+def remplir(conn: sqlite3.Connection, nombre_lignes: int, utilisateurs: list, valideurs: list) -> None:
+    """Insère des demandes et notifications aléatoires (identifiants au format stocké en base)"""
+    statuts = [statut.name for statut in StatutDemandeEnum]
+    poids_statuts = [15, 60, 10, 10, 3, 2]
+    types_conge = [type_conge.name for type_conge in TypeCongeEnum]
+    types_notification = [type_notif.name for type_notif in TypeNotificationEnum]
+    debut_periode = date(2020, 1, 1)
+    maintenant = datetime.utcnow()
+
+    def demandes():
+        for _ in range(nombre_lignes):
+            date_debut = debut_periode + timedelta(days=random.randint(0, 8 * 365))
+            date_fin = date_debut + timedelta(days=random.randint(0, 20))
+            yield (
+                uuid.uuid4().hex, random.choice(utilisateurs), random.choice(types_conge),
+                date_debut.isoformat(), date_fin.isoformat(),
+                random.choices(statuts, poids_statuts)[0], random.choice(valideurs),
+                maintenant.isoformat(sep=" ")
+            )
+
+    def notifications():
+        for _ in range(nombre_lignes):
+            yield (
+                uuid.uuid4().hex, random.choice(utilisateurs), random.choice(types_notification),
+                "Titre", "Message", random.random() < 0.8,
+                (maintenant - timedelta(minutes=random.randint(0, 500000))).isoformat(sep=" ")
+            )
+
+    conn.executemany(
+        "INSERT INTO demandes_conges (id, demandeur_id, type_conge, date_debut, date_fin, statut, "
+        "valideur_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        demandes()
+    )
+    conn.executemany(
+        "INSERT INTO notifications (id, destinataire_id, type_notification, titre, message, lue, "
+        "date_creation) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        notifications()
+    )
+    conn.commit()
+
+def mesurer(conn: sqlite3.Connection, utilisateurs: list, valideurs: list) -> dict:
+    """Retourne, pour chaque requête, son plan et son temps moyen d'exécution (ms)"""
+    resultats = {}
+    for nom, requete in REQUETES.items():
+        parametres = [
+            {
+                "user_id": random.choice(utilisateurs),
+                "valideur_id": random.choice(valideurs),
+                "jour": (date(2020, 1, 1) + timedelta(days=random.randint(0, 8 * 365))).isoformat()
+            }
+            for _ in range(REPETITIONS)
+        ]
+        plan = [ligne[3] for ligne in conn.execute(f"EXPLAIN QUERY PLAN {requete}", parametres[0])]
+
+        debut = time.perf_counter()
+        for valeurs in parametres:
+            conn.execute(requete, valeurs).fetchall()
+        duree_ms = (time.perf_counter() - debut) * 1000 / REPETITIONS
+
+        resultats[nom] = (plan, duree_ms)
+    return resultats
+
+def main():
+    nombre_lignes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(42)
+    utilisateurs = [uuid.uuid4().hex for _ in range(NOMBRE_UTILISATEURS)]
+    valideurs = random.sample(utilisateurs, NOMBRE_VALIDEURS)
+
+    fd, chemin = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(chemin)
+        creer_schema(conn)
+
+        print(f"Insertion de {nombre_lignes} demandes et {nombre_lignes} notifications...")
+        debut = time.perf_counter()
+        remplir(conn, nombre_lignes, utilisateurs, valideurs)
+        print(f"✓ Données insérées en {time.perf_counter() - debut:.1f} s\n")
+
+        avant = mesurer(conn, utilisateurs, valideurs)
+
+        debut = time.perf_counter()
+        creer_index(conn)
+        print(f"✓ Index créés en {time.perf_counter() - debut:.1f} s\n")
+
+        apres = mesurer(conn, utilisateurs, valideurs)
+
+        for nom in REQUETES:
+            plan_avant, duree_avant = avant[nom]
+            plan_apres, duree_apres = apres[nom]
+            print(f"=== {nom} ===")
+            print(f"  Sans index : {duree_avant:9.2f} ms  | {' / '.join(plan_avant)}")
+            print(f"  Avec index : {duree_apres:9.2f} ms  | {' / '.join(plan_apres)}")
+            print(f"  Gain       : x{duree_avant / max(duree_apres, 1e-6):.1f}\n")
+
+        conn.close()
+    finally:
+        os.remove(chemin)
+
+if __name__ == "__main__":
+    main()
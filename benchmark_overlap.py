@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la détection de chevauchements : ancienne condition (OR de trois cas)
+contre le prédicat unique date_debut <= :fin AND date_fin >= :debut, sur l'index couvrant
+(demandeur_id, statut, date_debut, date_fin, id). La requête des routes ne lit que des
+colonnes de l'index : son plan doit indiquer USING COVERING INDEX.
+
+Usage : python benchmark_overlap.py [demandes_par_utilisateur]   (10 000 par défaut)
+La base de test est créée dans un fichier temporaire, conges.db n'est pas modifiée.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models.demande_conge import DemandeConge, StatutDemandeEnum, TypeCongeEnum
+
+NOMBRE_UTILISATEURS = 50
+REPETITIONS = 200
+
+# Condition historique des routes de création/modification
+REQUETE_OR = (
+    "SELECT * FROM demandes_conges WHERE demandeur_id = :user_id "
+    "AND statut IN ('EN_ATTENTE', 'APPROUVEE') AND ("
+    "(date_debut <= :debut AND date_fin >= :debut) OR "
+    "(date_debut <= :fin AND date_fin >= :fin) OR "
+    "(date_debut >= :debut AND date_fin <= :fin)) LIMIT 1"
+)
+
+# Requête produite par select_demande_chevauchante (routes/demandes_conges.py)
+REQUETE_PREDICAT = (
+    "SELECT date_debut, date_fin FROM demandes_conges WHERE demandeur_id = :user_id "
+    "AND statut IN ('EN_ATTENTE', 'APPROUVEE') "
+    "AND date_debut <= :fin AND date_fin >= :debut AND id != :exclure_id LIMIT 1"
+)
+
+def creer_schema(conn: sqlite3.Connection) -> None:
+    """Crée la table demandes_conges et ses index à partir du modèle"""
+    table = DemandeConge.__table__
+    conn.execute(str(CreateTable(table).compile(dialect=sqlite.dialect())))
+    for index in table.indexes:
+        conn.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+
+def remplir(conn: sqlite3.Connection, utilisateurs: list, demandes_par_utilisateur: int) -> None:
+    """Insère pour chaque utilisateur un historique de demandes consécutives sans chevauchement"""
+    statuts = [statut.name for statut in StatutDemandeEnum]
+    poids_statuts = [5, 60, 15, 15, 3, 2]
+    types_conge = [type_conge.name for type_conge in TypeCongeEnum]
+
+    def demandes():
+        for user_id in utilisateurs:
+            date_debut = date(1990, 1, 1)
+            for _ in range(demandes_par_utilisateur):
+                date_debut += timedelta(days=random.randint(1, 5))
+                date_fin = date_debut + timedelta(days=random.randint(0, 2))
+                yield (
+                    uuid.uuid4().hex, user_id, random.choice(types_conge),
+                    date_debut.isoformat(), date_fin.isoformat(),
+                    random.choices(statuts, poids_statuts)[0]
+                )
+                date_debut = date_fin
+
+    conn.executemany(
+        "INSERT INTO demandes_conges (id, demandeur_id, type_conge, date_debut, date_fin, statut) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        demandes()
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+
+def mesurer(conn: sqlite3.Connection, requete: str, parametres: list) -> tuple:
+    """Retourne le plan de la requête et son temps moyen d'exécution (ms)"""
+    plan = [ligne[3] for ligne in conn.execute(f"EXPLAIN QUERY PLAN {requete}", parametres[0])]
+
+    debut = time.perf_counter()
+    for valeurs in parametres:
+        conn.execute(requete, valeurs).fetchall()
+    duree_ms = (time.perf_counter() - debut) * 1000 / len(parametres)
+
+    return plan, duree_ms
+
+def main():
+    demandes_par_utilisateur = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    random.seed(42)
+    utilisateurs = [uuid.uuid4().hex for _ in range(NOMBRE_UTILISATEURS)]
+
+    fd, chemin = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(chemin)
+        creer_schema(conn)
+
+        print(f"Insertion de {demandes_par_utilisateur} demandes pour {NOMBRE_UTILISATEURS} utilisateurs...")
+        debut = time.perf_counter()
+        remplir(conn, utilisateurs, demandes_par_utilisateur)
+        print(f"✓ Données insérées en {time.perf_counter() - debut:.1f} s\n")
+
+        # Périodes de 1 à 30 jours réparties sur tout l'historique
+        derniere_date = conn.execute("SELECT MAX(date_fin) FROM demandes_conges").fetchone()[0]
+        etendue = (date.fromisoformat(derniere_date) - date(1990, 1, 1)).days
+        parametres = []
+        for _ in range(REPETITIONS):
+            periode_debut = date(1990, 1, 1) + timedelta(days=random.randint(0, etendue))
+            parametres.append({
+                "user_id": random.choice(utilisateurs),
+                "exclure_id": uuid.uuid4().hex,
+                "debut": periode_debut.isoformat(),
+                "fin": (periode_debut + timedelta(days=random.randint(0, 29))).isoformat()
+            })
+
+        for nom, requete in (("OR de trois cas", REQUETE_OR), ("prédicat unique", REQUETE_PREDICAT)):
+            plan, duree_ms = mesurer(conn, requete, parametres)
+            print(f"=== {nom} ===")
+            print(f"  {duree_ms:9.3f} ms / vérification  | {' / '.join(plan)}\n")
+
+        conn.close()
+    finally:
+        os.remove(chemin)
+
+if __name__ == "__main__":
+    main()
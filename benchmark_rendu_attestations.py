@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du rendu des attestations (PDF par seconde) : rendu historique, qui met
+en page toute la page à chaque document, contre le modèle précompilé (partie fixe recopiée
+telle quelle, seuls les champs variables mis en page par document), puis contre le modèle
+précompilé dans un processus initialisé comme ceux du pool (flux sans encodage ASCII85).
+
+Usage : python benchmark_rendu_attestations.py [nombre_de_pdf]   (500 par défaut)
+Les PDF sont rendus en mémoire, aucun fichier n'est écrit.
+"""
+
+import io
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+from services.attestation_service import (
+    DonneesAttestation, compiler_modele, initialiser_processus_rendu, rendre_attestation_pdf
+)
+
+def rendre_ancien(donnees: DonneesAttestation, pdf_path) -> None:
+    """Rendu historique : toute la page est mise en page et dessinée à chaque document"""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    # Créer le canvas
+    c = canvas.Canvas(pdf_path, pagesize=A4)
+    width, height = A4
+
+    # Variables pour simplifier
+    left_margin = 50
+    y_pos = height - 100
+
+    # En-tête centré
+    c.setFont("Helvetica-Bold", 14)
+    title1 = "RÉPUBLIQUE DE CÔTE D'IVOIRE"
+    text_width = c.stringWidth(title1, "Helvetica-Bold", 14)
+    c.drawString((width - text_width) / 2, y_pos, title1)
+    y_pos -= 20
+
+    c.setFont("Helvetica", 12)
+    title2 = "Union - Discipline - Travail"
+    text_width = c.stringWidth(title2, "Helvetica", 12)
+    c.drawString((width - text_width) / 2, y_pos, title2)
+    y_pos -= 40
+
+    c.setFont("Helvetica-Bold", 12)
+    title3 = "ENTREPRISE"
+    text_width = c.stringWidth(title3, "Helvetica-Bold", 12)
+    c.drawString((width - text_width) / 2, y_pos, title3)
+    y_pos -= 40
+
+    # Ligne de séparation
+    c.line(left_margin, y_pos, width - left_margin, y_pos)
+    y_pos -= 40
+
+    # Titre principal
+    c.setFont("Helvetica-Bold", 16)
+    main_title = "ATTESTATION DE CONGÉ"
+    text_width = c.stringWidth(main_title, "Helvetica-Bold", 16)
+    c.drawString((width - text_width) / 2, y_pos, main_title)
+    y_pos -= 60
+
+    # Contenu
+    c.setFont("Helvetica", 12)
+
+    # Données
+    nom_complet = f"{donnees.nom} {donnees.prenom}"
+    role_text = donnees.role or "employe"
+    date_debut = donnees.date_debut.strftime('%d/%m/%Y')
+    date_fin = donnees.date_fin.strftime('%d/%m/%Y')
+    date_today = donnees.date_generation.strftime('%d/%m/%Y')
+
+    # Paragraphe 1
+    text1 = "Nous soussignés entreprise, attestons que"
+    c.drawString(left_margin, y_pos, text1)
+    y_pos -= 15
+
+    text2 = f"Monsieur/Madame {nom_complet}, fait partie de notre personnel"
+    c.drawString(left_margin, y_pos, text2)
+    y_pos -= 15
+
+    text3 = f"en qualité de {role_text} depuis sa date d'embauche."
+    c.drawString(left_margin, y_pos, text3)
+    y_pos -= 30
+
+    # Paragraphe 2
+    text4 = f"Il bénéficie d'un congé allant du {date_debut} au {date_fin} inclus."
+    c.drawString(left_margin, y_pos, text4)
+    y_pos -= 30
+
+    # Paragraphe 3
+    text5 = "En foi de quoi, cette attestation lui est délivrée pour servir"
+    c.drawString(left_margin, y_pos, text5)
+    y_pos -= 15
+
+    text6 = "et valoir ce que de droit."
+    c.drawString(left_margin, y_pos, text6)
+    y_pos -= 60
+
+    # Date (alignée à droite)
+    date_text = f"Fait à Abidjan, le {date_today}"
+    text_width = c.stringWidth(date_text, "Helvetica", 12)
+    c.drawString(width - left_margin - text_width, y_pos, date_text)
+    y_pos -= 80
+
+    # Signature centrée
+    signature_text = "Nom et signature du DRH"
+    text_width = c.stringWidth(signature_text, "Helvetica", 12)
+    c.drawString((width - text_width) / 2, y_pos, signature_text)
+    y_pos -= 30
+
+    # Ligne de signature
+    line_length = 150
+    start_x = (width - line_length) / 2
+    end_x = start_x + line_length
+    c.line(start_x, y_pos, end_x, y_pos)
+
+    # Sauvegarder
+    c.save()
+
+
+def mesurer(nom: str, rendre, lot: list) -> None:
+    # Premier rendu hors mesure (imports de reportlab, compilation du modèle)
+    rendre(lot[0], io.BytesIO())
+    debut = time.perf_counter()
+    taille = 0
+    for donnees in lot:
+        tampon = io.BytesIO()
+        rendre(donnees, tampon)
+        taille += tampon.tell()
+    duree = time.perf_counter() - debut
+    print(f"{nom:>24} : {len(lot) / duree:8.1f} PDF/s   ({duree * 1000 / len(lot):.3f} ms par PDF, "
+          f"{taille / len(lot):.0f} octets en moyenne)")
+
+if __name__ == "__main__":
+    nombre = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    lot = [
+        DonneesAttestation(
+            demande_id=uuid.uuid4(), user_id=uuid.uuid4(),
+            nom=f"Nom{i}", prenom=f"Prénom{i}", role="employe",
+            date_debut=date(2025, 1, 1) + timedelta(days=i % 365),
+            date_fin=date(2025, 1, 15) + timedelta(days=i % 365),
+            date_generation=date(2024, 12, 15)
+        )
+        for i in range(nombre)
+    ]
+    compiler_modele()
+    print(f"Rendu de {nombre} attestations")
+    mesurer("historique", rendre_ancien, lot)
+    mesurer("précompilé", rendre_attestation_pdf, lot)
+    initialiser_processus_rendu()
+    mesurer("précompilé (pool)", rendre_attestation_pdf, lot)
@@ -2,19 +2,25 @@ import sys
 from pathlib import Path
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from datetime import date
 import os
 
 # Ajouter le répertoire courant au PYTHONPATH
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-from models.database import Base, engine
-from routes import auth_router, users_router, departements_router, demandes_conges_router
+from models.database import Base, engine, async_session_maker
+from routes import auth_router, users_router, departements_router, demandes_conges_router, jours_feries_router, taches_router
 from routes.notifications import router as notifications_router
+from routes.attestations import router as attestations_router
 from middlewares.logging_middleware import LoggingMiddleware
 from middlewares.error_handling import setup_error_handlers
+from utils.date_calculator import warm_holidays_cache
+from services.notification_worker import notification_worker
+from services.planificateur import planificateur
+from services.attestation_service import generateur_attestations
+from services.absence_jour_service import AbsenceJourService
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,12 +28,40 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
-    # Créer le dossier attestations s'il n'existe pas
-    attestations_dir = Path("attestations")
-    attestations_dir.mkdir(exist_ok=True)
+    # Remplir la table des jours d'absence si elle vient d'être créée (lue par le calendrier et les dashboards)
+    try:
+        async with async_session_maker() as db:
+            nombre_jours = await AbsenceJourService(db).initialiser_si_vide()
+            await db.commit()
+        if nombre_jours is not None:
+            print(f"{nombre_jours} jour(s) d'absence reconstruit(s) au démarrage")
+    except Exception as e:
+        # Un autre worker a pu remplir la table en même temps
+        print(f"Erreur lors de l'initialisation des jours d'absence: {e}")
+    
+    # Précalculer les jours fériés de l'année en cours et de la suivante
+    annee_courante = date.today().year
+    warm_holidays_cache([annee_courante, annee_courante + 1])
+    
+    # Démarrer le traitement des notifications en tâche de fond
+    await notification_worker.demarrer()
+    
+    # Démarrer le pool de processus de rendu des attestations PDF
+    await generateur_attestations.demarrer()
+    
+    # Démarrer le planificateur des tâches périodiques (rappels, maintenance)
+    await planificateur.demarrer()
     
     yield
-    # Cleanup au shutdown (si nécessaire)
+    
+    # Arrêter le planificateur avant le worker : les tâches en cours peuvent encore publier
+    await planificateur.arreter()
+    
+    # Traiter les notifications encore en file avant l'arrêt
+    await notification_worker.arreter()
+    
+    # Laisser finir les attestations en cours de génération
+    await generateur_attestations.arreter()
 
 # Création de l'application FastAPI
 app = FastAPI(
@@ -58,9 +92,11 @@ app.include_router(users_router, prefix="/api")
 app.include_router(departements_router, prefix="/api")
 app.include_router(demandes_conges_router, prefix="/api")
 app.include_router(notifications_router, prefix="/api")
+app.include_router(jours_feries_router, prefix="/api")
+app.include_router(taches_router, prefix="/api")
 
-# Configuration des fichiers statiques pour les attestations
-app.mount("/attestations", StaticFiles(directory="attestations"), name="attestations")
+# Téléchargement des attestations depuis leur stockage (sans préfixe /api, comme les URL déjà enregistrées)
+app.include_router(attestations_router)
 
 @app.get("/")
 async def root():
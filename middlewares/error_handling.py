@@ -17,7 +17,8 @@ async def error_handler(request: Request, exc: Exception):
                 "error": True,
                 "message": exc.detail,
                 "status_code": exc.status_code
-            }
+            },
+            headers=exc.headers
         )
     
     elif isinstance(exc, RequestValidationError):
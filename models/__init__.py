@@ -1,11 +1,16 @@
 from .user import User, UserRead, UserCreate, UserUpdate
 from .departement import Departement, DepartementRead, DepartementCreate, DepartementUpdate
 from .demande_conge import DemandeConge, DemandeCongeRead, DemandeCongeCreate, DemandeCongeUpdate
+from .dashboard_snapshot import DashboardSnapshot
+from .solde_ledger import SoldeLedger
+from .absence_jour import AbsenceJour
+from .tache_planifiee import VerrouTache, ExecutionTache
 from .database import Base, engine, get_database
 
 __all__ = [
     "User", "UserRead", "UserCreate", "UserUpdate",
     "Departement", "DepartementRead", "DepartementCreate", "DepartementUpdate", 
     "DemandeConge", "DemandeCongeRead", "DemandeCongeCreate", "DemandeCongeUpdate",
+    "DashboardSnapshot", "SoldeLedger", "AbsenceJour", "VerrouTache", "ExecutionTache",
     "Base", "engine", "get_database"
 ] 
\ No newline at end of file
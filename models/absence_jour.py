@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from .database import Base
+
+class AbsenceJour(Base):
+    """Jours d'absence dépliés depuis les demandes approuvées (une ligne par jour et par demande)"""
+    __tablename__ = "absence_jour"
+    __table_args__ = (
+        # Absents d'un jour ou d'une période, toutes équipes confondues
+        Index("ix_absence_jour_jour_user", "jour", "user_id"),
+        # Effectif absent d'un département par jour
+        Index("ix_absence_jour_departement_jour", "departement_id", "jour"),
+    )
+
+    demande_id = Column(UUID(as_uuid=True), ForeignKey("demandes_conges.id"), primary_key=True)
+    jour = Column(Date, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    departement_id = Column(UUID(as_uuid=True), ForeignKey("departements.id"), nullable=True)  # Département du demandeur
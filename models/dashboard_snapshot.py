@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Date, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from .database import Base
+
+class DashboardSnapshot(Base):
+    """Compteurs précalculés du dashboard DRH (une ligne par département)"""
+    __tablename__ = "dashboard_snapshot"
+
+    departement_id = Column(UUID(as_uuid=True), ForeignKey("departements.id"), primary_key=True)
+    # Compteurs de demandes par statut (un attribut par valeur de StatutDemandeEnum)
+    en_attente = Column(Integer, nullable=False, default=0)
+    approuvee = Column(Integer, nullable=False, default=0)
+    refusee = Column(Integer, nullable=False, default=0)
+    annulee = Column(Integer, nullable=False, default=0)
+    demande_annulation = Column(Integer, nullable=False, default=0)
+    annulation_refusee = Column(Integer, nullable=False, default=0)
+    # Totaux dépendant de la date du jour (recalculés quand date_reference est dépassée)
+    nombre_employes = Column(Integer, nullable=False, default=0)
+    employes_en_conge = Column(Integer, nullable=False, default=0)
+    solde_total = Column(Integer, nullable=False, default=0)
+    date_reference = Column(Date, nullable=True)  # Jour pour lequel absences et soldes ont été calculés
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -4,7 +4,7 @@ from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel
-from sqlalchemy import Column, String, DateTime, Date, Enum as SQLEnum, ForeignKey, Text, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, Date, Enum as SQLEnum, ForeignKey, Text, Integer, Boolean, Index, and_
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -29,6 +29,15 @@ class TypeCongeEnum(str, Enum):
 
 class DemandeConge(Base):
     __tablename__ = "demandes_conges"
+    __table_args__ = (
+        # Demandes d'un employé par statut et période (soldes, chevauchements, dashboards) ;
+        # couvre la vérification de chevauchement (id compris) sans lecture de la table
+        Index("ix_demandes_conges_demandeur_statut_dates", "demandeur_id", "statut", "date_debut", "date_fin", "id"),
+        # Demandes à traiter par un valideur
+        Index("ix_demandes_conges_valideur_statut", "valideur_id", "statut"),
+        # Congés d'un statut sur une période (calendrier, absences du jour, rappels)
+        Index("ix_demandes_conges_statut_dates", "statut", "date_debut", "date_fin"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     demandeur_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -58,6 +67,11 @@ class DemandeConge(Base):
     # Relations
     demandeur = relationship("User", foreign_keys=[demandeur_id], overlaps="demandes_conges")
     valideur = relationship("User", foreign_keys=[valideur_id])
+    
+    @classmethod
+    def chevauche(cls, date_debut: date, date_fin: date):
+        """Condition SQL : la demande chevauche la période [date_debut, date_fin] (bornes incluses)"""
+        return and_(cls.date_debut <= date_fin, cls.date_fin >= date_debut)
 
 # Schéma pour les informations utilisateur de base
 class UserBasicInfo(BaseModel):
@@ -142,4 +156,23 @@ class ActionDynamique(BaseModel):
 
 # Schéma enrichi avec les actions dynamiques
 class DemandeCongeWithActions(DemandeCongeRead):
-    actions: list[ActionDynamique] = [] 
\ No newline at end of file
+    actions: list[ActionDynamique] = [] 
+
+# Schéma d'un congé d'équipe qui chevauche une période
+class ConflitEquipe(BaseModel):
+    demande_id: uuid.UUID
+    date_debut: date
+    date_fin: date
+    statut: StatutDemandeEnum
+    user: Optional[UserBasicInfo] = None
+
+# Schéma de création enrichi avec les conflits d'équipe détectés
+class DemandeCongeWithConflits(DemandeCongeRead):
+    conflits: list[ConflitEquipe] = []
+
+# Critères de sélection des demandes approuvées pour l'export groupé des attestations
+class AttestationsBatchRequest(BaseModel):
+    date_debut: Optional[date] = None  # Congés qui chevauchent la période
+    date_fin: Optional[date] = None
+    departement_id: Optional[uuid.UUID] = None
+    demande_ids: Optional[list[uuid.UUID]] = None
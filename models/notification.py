@@ -4,7 +4,7 @@ from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -23,6 +23,10 @@ class TypeNotificationEnum(str, Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Notifications (non lues) d'un utilisateur, les plus récentes d'abord
+        Index("ix_notifications_destinataire_lue_date", "destinataire_id", "lue", "date_creation"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     destinataire_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from .database import Base
+
+class SoldeLedger(Base):
+    """Jours de congés agrégés par utilisateur et par année (année de la date de début)"""
+    __tablename__ = "solde_ledger"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    annee = Column(Integer, primary_key=True)
+    jours_pris = Column(Integer, nullable=False, default=0)  # Demandes approuvées
+    jours_en_attente = Column(Integer, nullable=False, default=0)  # Demandes en attente
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
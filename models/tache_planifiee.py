@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from .database import Base
+
+class VerrouTache(Base):
+    """Bail d'exécution d'une tâche planifiée, pour qu'un seul worker l'exécute à chaque échéance"""
+    __tablename__ = "taches_verrous"
+
+    nom = Column(String(100), primary_key=True)
+    detenteur = Column(String(200), nullable=True)  # Worker qui détient (ou a détenu) le bail
+    echeance = Column(DateTime, nullable=False)  # Dernière échéance prise en charge
+    expire_le = Column(DateTime, nullable=False)  # Fin du bail (UTC)
+
+class ExecutionTache(Base):
+    """Historique des exécutions des tâches planifiées"""
+    __tablename__ = "taches_executions"
+    __table_args__ = (
+        # Dernières exécutions d'une tâche
+        Index("ix_taches_executions_nom_debut", "nom", "debut"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    nom = Column(String(100), nullable=False)
+    detenteur = Column(String(200), nullable=False)
+    echeance = Column(DateTime, nullable=True)  # Échéance planifiée (None pour une exécution manuelle)
+    debut = Column(DateTime, default=datetime.utcnow)
+    fin = Column(DateTime, nullable=True)
+    duree_ms = Column(Integer, nullable=True)
+    succes = Column(Boolean, nullable=True)  # None tant que l'exécution est en cours
+    resultat = Column(Text, nullable=True)
+    erreur = Column(Text, nullable=True)
+
+class ExecutionTacheRead(BaseModel):
+    id: uuid.UUID
+    nom: str
+    detenteur: str
+    echeance: Optional[datetime] = None
+    debut: datetime
+    fin: Optional[datetime] = None
+    duree_ms: Optional[int] = None
+    succes: Optional[bool] = None
+    resultat: Optional[str] = None
+    erreur: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class TachePlanifieeRead(BaseModel):
+    nom: str
+    description: str
+    cron: str
+    prochaine_echeance: Optional[datetime] = None
+    executions_recentes: List[ExecutionTacheRead] = []
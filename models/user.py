@@ -144,8 +144,6 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
         """Calcule le solde de congés restant avec une liste de demandes fournie"""
         from .demande_conge import StatutDemandeEnum
         
-        solde_total = self.solde_conges
-        
         # Calculer les jours pris (demandes approuvées uniquement)
         jours_pris = 0
         if demandes_conges:
@@ -153,7 +151,11 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
                 if demande.statut == StatutDemandeEnum.APPROUVEE:
                     jours_pris += demande.working_time or 0
         
-        return max(0, solde_total - jours_pris)  # Ne pas retourner une valeur négative
+        return self.calculate_solde_conges_restant_from_jours_pris(jours_pris)
+
+    def calculate_solde_conges_restant_from_jours_pris(self, jours_pris: int) -> int:
+        """Calcule le solde de congés restant à partir du total de jours pris (déjà agrégé)"""
+        return max(0, self.solde_conges - (jours_pris or 0))  # Ne pas retourner une valeur négative
 
     
     @property
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script pour réconcilier le registre des soldes de congés avec les demandes
+À exécuter quotidiennement (par exemple via cron ou tâche planifiée)
+"""
+
+import asyncio
+from datetime import datetime
+
+from models.database import get_database
+from services.solde_ledger_service import SoldeLedgerService
+
+async def reconcilier_solde_ledger():
+    """Recalcule le registre des soldes et corrige les écarts"""
+    print(f"=== RÉCONCILIATION DES SOLDES DE CONGÉS - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} ===")
+    
+    async for db in get_database():
+        try:
+            ecarts = await SoldeLedgerService(db).reconcilier()
+            await db.commit()
+            
+            print(f"✅ Registre réconcilié, {len(ecarts)} écart(s) corrigé(s)")
+            
+            # Log des écarts corrigés (ancienne valeur -> valeur recalculée)
+            for ecart in ecarts:
+                print(f"   - {ecart['user_id']} ({ecart['annee']}): "
+                      f"jours pris {ecart['jours_pris'][0]} -> {ecart['jours_pris'][1]}, "
+                      f"en attente {ecart['jours_en_attente'][0]} -> {ecart['jours_en_attente'][1]}")
+            
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Erreur lors de la réconciliation des soldes: {e}")
+        
+        # On ne traite qu'une seule session DB
+        break
+    
+    print("=== FIN DE LA RÉCONCILIATION ===")
+
+if __name__ == "__main__":
+    asyncio.run(reconcilier_solde_ledger())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Script pour (re)construire la table d'occupation journalière absence_jour
+À exécuter après la création de la table, un import de données ou une modification directe de la base
+"""
+
+import asyncio
+from datetime import datetime
+
+from models.database import engine, Base, get_database
+from services.absence_jour_service import AbsenceJourService
+
+async def reconstruire_absence_jour():
+    """Déplie toutes les demandes approuvées en jours d'absence"""
+    print(f"=== RECONSTRUCTION DES JOURS D'ABSENCE - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} ===")
+    
+    # Créer la table si elle n'existe pas encore
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async for db in get_database():
+        try:
+            nombre_jours = await AbsenceJourService(db).reconstruire()
+            await db.commit()
+            
+            print(f"✅ {nombre_jours} jours d'absence insérés")
+            
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Erreur lors de la reconstruction des jours d'absence: {e}")
+        
+        # On ne traite qu'une seule session DB
+        break
+    
+    print("=== FIN DE LA RECONSTRUCTION ===")
+
+if __name__ == "__main__":
+    asyncio.run(reconstruire_absence_jour())
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script pour reconstruire les compteurs précalculés du dashboard DRH
+À exécuter après un import de données ou une modification directe de la base
+"""
+
+import asyncio
+from datetime import datetime
+
+from models.database import get_database
+from services.dashboard_snapshot_service import DashboardSnapshotService
+
+async def reconstruire_dashboard_snapshot():
+    """Recalcule la table dashboard_snapshot pour tous les départements"""
+    print(f"=== RECONSTRUCTION DU DASHBOARD DRH - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} ===")
+    
+    async for db in get_database():
+        try:
+            snapshots = await DashboardSnapshotService(db).reconstruire()
+            await db.commit()
+            
+            print(f"✅ {len(snapshots)} départements recalculés")
+            for snapshot in snapshots.values():
+                print(f"   - {snapshot.departement_id}: {snapshot.nombre_employes} employés, "
+                      f"{snapshot.en_attente} demandes en attente")
+            
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Erreur lors de la reconstruction du dashboard: {e}")
+        
+        # On ne traite qu'une seule session DB
+        break
+    
+    print("=== FIN DE LA RECONSTRUCTION ===")
+
+if __name__ == "__main__":
+    asyncio.run(reconstruire_dashboard_snapshot())
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script de migration pour supprimer la colonne droits (jamais lue) de la table solde_ledger
+"""
+
+import asyncio
+from sqlalchemy import text
+from models.database import engine
+
+async def remove_solde_ledger_droits_field():
+    """Supprime la colonne droits de la table solde_ledger"""
+    async with engine.begin() as conn:
+        # Vérifier si la colonne existe encore (SQLite)
+        result = await conn.execute(text("""
+            PRAGMA table_info(solde_ledger)
+        """))
+        
+        existing_columns = [row[1] for row in result]  # row[1] contient le nom de la colonne
+        
+        # Supprimer droits si elle existe (DROP COLUMN : SQLite 3.35 ou plus récent)
+        if 'droits' in existing_columns:
+            await conn.execute(text("""
+                ALTER TABLE solde_ledger 
+                DROP COLUMN droits
+            """))
+            print("✓ Colonne droits supprimée")
+        else:
+            print("✓ Colonne droits déjà supprimée")
+
+if __name__ == "__main__":
+    print("Migration: Suppression du champ droits du registre des soldes")
+    asyncio.run(remove_solde_ledger_droits_field())
+    print("✓ Migration terminée")
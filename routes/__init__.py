@@ -2,10 +2,14 @@ from .auth import router as auth_router
 from .users import router as users_router
 from .departements import router as departements_router
 from .demandes_conges import router as demandes_conges_router
+from .jours_feries import router as jours_feries_router
+from .taches import router as taches_router
 
 __all__ = [
     "auth_router",
     "users_router", 
     "departements_router",
-    "demandes_conges_router"
+    "demandes_conges_router",
+    "jours_feries_router",
+    "taches_router"
 ] 
\ No newline at end of file
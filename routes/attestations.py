@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Téléchargement des attestations PDF depuis le stockage des attestations
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+
+from services.stockage_attestations import InfosFichier, stockage_attestations
+
+# Monté sans préfixe /api : les URL déjà enregistrées dans les demandes (/attestations/{nom}) restent valides
+router = APIRouter(prefix="/attestations", tags=["attestations"])
+
+# Le nom d'une attestation change avec son contenu : le navigateur peut la garder en cache
+CACHE_CONTROL = "private, max-age=86400"
+
+def est_non_modifie(request: Request, infos: InfosFichier) -> bool:
+    """Évalue If-None-Match (prioritaire) puis If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or infos.etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return infos.modifie_le.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def lire_plage(request: Request, infos: InfosFichier) -> Optional[Tuple[int, int]]:
+    """
+    Plage d'octets demandée par l'en-tête Range, bornes incluses (None pour le fichier entier)
+
+    Seules les plages uniques sont prises en charge : une demande de plusieurs plages,
+    invalide (par exemple bytes=5-3) ou conditionnée par un If-Range périmé reçoit le
+    fichier entier (RFC 9110). Lève une HTTPException 416 si la plage commence après
+    la fin du fichier.
+    """
+    range_header = request.headers.get("range")
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != infos.etag and if_range.strip() != formatdate(infos.modifie_le.timestamp(), usegmt=True):
+        return None
+
+    plage = range_header[len("bytes="):].strip()
+    if "," in plage:
+        return None
+    debut_texte, _, fin_texte = plage.partition("-")
+    try:
+        if debut_texte:
+            debut = int(debut_texte)
+            fin = infos.taille - 1
+            if fin_texte:
+                # bytes=5-3 : plage invalide (ignorée), et non hors du fichier
+                if int(fin_texte) < debut:
+                    raise ValueError(plage)
+                fin = min(int(fin_texte), fin)
+        else:
+            # bytes=-N : les N derniers octets
+            longueur = int(fin_texte)
+            if longueur <= 0:
+                raise ValueError(plage)
+            debut = max(infos.taille - longueur, 0)
+            fin = infos.taille - 1
+    except ValueError:
+        return None
+
+    if debut >= infos.taille:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Plage d'octets hors du fichier",
+            headers={"Content-Range": f"bytes */{infos.taille}"}
+        )
+    return debut, fin
+
+@router.api_route("/{nom}", methods=["GET", "HEAD"])
+async def telecharger_attestation(nom: str, request: Request):
+    """
+    Télécharge une attestation (réponse en flux, avec ETag, Last-Modified et requêtes partielles Range)
+    """
+    infos = await stockage_attestations.infos(nom)
+    if infos is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attestation non trouvée"
+        )
+
+    headers = {
+        "ETag": infos.etag,
+        "Last-Modified": formatdate(infos.modifie_le.timestamp(), usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_CONTROL
+    }
+
+    if est_non_modifie(request, infos):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    plage = lire_plage(request, infos)
+    if plage is None:
+        debut, fin = 0, infos.taille - 1
+        status_code = status.HTTP_200_OK
+    else:
+        debut, fin = plage
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {debut}-{fin}/{infos.taille}"
+    headers["Content-Length"] = str(fin - debut + 1)
+    headers["Content-Disposition"] = f'inline; filename="{nom}"'
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type="application/pdf")
+
+    # Ouvrir le fichier avant d'envoyer les en-têtes : le nettoyage nocturne a pu le supprimer
+    try:
+        contenu = await stockage_attestations.lire(nom, debut, fin)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attestation non trouvée"
+        )
+
+    return StreamingResponse(
+        contenu,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/pdf"
+    )
@@ -65,22 +65,14 @@ async def login(
         strategy = auth_backend.get_strategy()
         token = await strategy.write_token(user)
         
-        # Calculer le solde de congés restant de manière asynchrone
-        from models.demande_conge import DemandeConge
+        # Calculer le solde de congés restant depuis le registre des soldes
         from models.database import get_database
-        from sqlalchemy import select
+        from services.solde_ledger_service import SoldeLedgerService
         
-        # Récupérer les demandes de l'utilisateur de manière asynchrone
         async for db in get_database():
-            demandes_result = await db.execute(
-                select(DemandeConge).where(DemandeConge.demandeur_id == user.id)
-            )
-            demandes = demandes_result.scalars().all()
+            solde_restant = await SoldeLedgerService(db).get_solde_restant(user)
             break
         
-        # Calculer le solde restant avec la méthode safe
-        solde_restant = user.calculate_solde_conges_restant(demandes)
-        
         # Créer la réponse utilisateur avec tous les champs calculés
         user_response = UserRead(
             id=user.id,
@@ -141,22 +133,14 @@ async def get_current_user_info(
     """
     Récupère les informations de l'utilisateur actuellement connecté
     """
-    # Calculer le solde de congés restant de manière asynchrone
-    from models.demande_conge import DemandeConge
+    # Calculer le solde de congés restant depuis le registre des soldes
     from models.database import get_database
-    from sqlalchemy import select
+    from services.solde_ledger_service import SoldeLedgerService
     
-    # Récupérer les demandes de l'utilisateur de manière asynchrone
     async for db in get_database():
-        demandes_result = await db.execute(
-            select(DemandeConge).where(DemandeConge.demandeur_id == current_user.id)
-        )
-        demandes = demandes_result.scalars().all()
+        solde_restant = await SoldeLedgerService(db).get_solde_restant(current_user)
         break
     
-    # Calculer le solde restant avec la méthode safe
-    solde_restant = current_user.calculate_solde_conges_restant(demandes)
-    
     return UserRead(
         id=current_user.id,
         email=current_user.email,
@@ -1,60 +1,47 @@
+import asyncio
 import uuid
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, func
 from sqlalchemy.orm import selectinload
 
 from models.database import get_database
 from models.demande_conge import (
     DemandeConge, DemandeCongeRead, DemandeCongeCreate, DemandeCongeUpdate, 
     DemandeCongeValidation, StatutDemandeEnum, TypeCongeEnum, UserBasicInfo,
-    DemandeAnnulation, ActionDynamique, DemandeCongeWithActions
+    DemandeAnnulation, ActionDynamique, DemandeCongeWithActions,
+    ConflitEquipe, DemandeCongeWithConflits, AttestationsBatchRequest
 )
 from models.user import User, RoleEnum
 from models.departement import Departement
-from utils.dependencies import get_current_user, require_manager
+from models.absence_jour import AbsenceJour
+from utils.dependencies import get_current_user, get_user_loader, require_manager
+from utils.user_loader import UserLoader
 from utils.date_calculator import calculate_days_details
-from services.notification_service import NotificationService
+from services.notification_worker import EvenementDemande, TypeEvenementEnum, notification_worker
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from services.solde_ledger_service import SoldeLedgerService
+from services.absence_jour_service import AbsenceJourService, select_demandes_absentes
+from services.conflit_service import CongeEquipe, moteur_conflits
+from services.attestation_service import (
+    DonneesAttestation, FileAttestationsPleine, DelaiGenerationDepasse, generateur_attestations
+)
 
 router = APIRouter(prefix="/demandes-conges", tags=["demandes-conges"])
 
-async def create_user_basic_info_from_db(db: AsyncSession, user_id: uuid.UUID) -> Optional[UserBasicInfo]:
-    """Récupère les informations utilisateur de base depuis la DB"""
-    result = await db.execute(
-        select(User, Departement.nom.label('departement_nom'))
-        .outerjoin(Departement, User.departement_id == Departement.id)
-        .where(User.id == user_id)
-    )
-    row = result.first()
-    
-    if not row:
-        return None
-    
-    user = row[0]
-    departement_nom = row[1]
-    
-    return UserBasicInfo(
-        id=user.id,
-        nom=user.nom,
-        prenom=user.prenom,
-        email=user.email,
-        role=user.role.value if user.role else None,
-        departement=departement_nom
-    )
+# Nombre maximal d'attestations par export groupé
+MAX_ATTESTATIONS_BATCH = 1000
 
-async def enrich_demande_with_user_info(db: AsyncSession, demande: DemandeConge) -> DemandeCongeRead:
-    """Enrichit une demande avec les informations utilisateur et valideur"""
-    # Récupérer les informations du demandeur
-    user_info = await create_user_basic_info_from_db(db, demande.demandeur_id)
-    
-    # Récupérer les informations du valideur si assigné
-    valideur_info = None
-    if demande.valideur_id:
-        valideur_info = await create_user_basic_info_from_db(db, demande.valideur_id)
-    
+def build_demande_read(
+    demande: DemandeConge,
+    user_info: Optional[UserBasicInfo],
+    valideur_info: Optional[UserBasicInfo]
+) -> DemandeCongeRead:
+    """Construit le schéma de lecture d'une demande avec les informations utilisateur fournies"""
     demande_dict = {
         'id': demande.id,
         'demandeur_id': demande.demandeur_id,
@@ -85,9 +72,104 @@ async def enrich_demande_with_user_info(db: AsyncSession, demande: DemandeConge)
     }
     return DemandeCongeRead(**demande_dict)
 
+async def enrich_demandes_with_user_info(user_loader: UserLoader, demandes: Sequence[DemandeConge]) -> List[DemandeCongeRead]:
+    """Enrichit une liste de demandes avec les informations demandeur/valideur en une seule requête"""
+    users_info = await user_loader.load_basic_infos(
+        [demande.demandeur_id for demande in demandes] + [demande.valideur_id for demande in demandes]
+    )
+    
+    return [
+        build_demande_read(
+            demande,
+            users_info.get(demande.demandeur_id),
+            users_info.get(demande.valideur_id) if demande.valideur_id else None
+        )
+        for demande in demandes
+    ]
+
+async def enrich_demande_with_user_info(user_loader: UserLoader, demande: DemandeConge) -> DemandeCongeRead:
+    """Enrichit une demande avec les informations utilisateur et valideur"""
+    enriched_demandes = await enrich_demandes_with_user_info(user_loader, [demande])
+    return enriched_demandes[0]
+
+def select_demande_chevauchante(
+    demandeur_id: uuid.UUID,
+    date_debut: date,
+    date_fin: date,
+    exclure_demande_id: Optional[uuid.UUID] = None
+):
+    """
+    Période d'une demande en attente ou approuvée du demandeur qui chevauche [date_debut, date_fin]
+
+    Seules des colonnes de l'index (demandeur_id, statut, date_debut, date_fin, id) sont lues :
+    la vérification ne lit pas la table.
+    """
+    conditions = [
+        DemandeConge.demandeur_id == demandeur_id,
+        # Exclure les demandes refusées et annulées
+        DemandeConge.statut.in_([StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE]),
+        DemandeConge.chevauche(date_debut, date_fin)
+    ]
+    if exclure_demande_id is not None:
+        conditions.append(DemandeConge.id != exclure_demande_id)
+    return select(DemandeConge.date_debut, DemandeConge.date_fin).where(*conditions).limit(1)
+
+async def count_demandes_par_statut(db: AsyncSession, *conditions) -> Dict[str, int]:
+    """Compte les demandes par statut en une seule requête COUNT(*) ... GROUP BY statut"""
+    result = await db.execute(
+        select(DemandeConge.statut, func.count(DemandeConge.id))
+        .where(*conditions)
+        .group_by(DemandeConge.statut)
+    )
+    
+    stats = {statut.value: 0 for statut in StatutDemandeEnum}
+    for statut, nombre in result.all():
+        stats[statut.value] = nombre
+    return stats
+
+async def enregistrer_transition_demande(
+    db: AsyncSession,
+    user_loader: UserLoader,
+    demande: DemandeConge,
+    ancien_statut: Optional[StatutDemandeEnum],
+    nouveau_statut: Optional[StatutDemandeEnum],
+    ancienne_date_debut: Optional[date] = None,
+    ancien_working_time: Optional[int] = None
+) -> None:
+    """
+    Répercute un changement de statut sur les données dérivées, dans la transaction en cours
+    
+    ancienne_date_debut et ancien_working_time ne sont à fournir que si la période a été modifiée.
+    """
+    demandeur = await user_loader.load(demande.demandeur_id)
+    await SoldeLedgerService(db).enregistrer_transition(
+        demandeur, demande, ancien_statut, nouveau_statut,
+        ancienne_date_debut=ancienne_date_debut,
+        ancien_working_time=ancien_working_time
+    )
+    await AbsenceJourService(db).enregistrer_transition(demandeur, demande, ancien_statut, nouveau_statut)
+    # Après absence_jour : les absences du jour du dashboard en sont relues
+    await DashboardSnapshotService(db).enregistrer_transition(demandeur, demande, ancien_statut, nouveau_statut)
+    await moteur_conflits.enregistrer_transition(db, demandeur, demande, nouveau_statut)
+
+async def build_conflits_equipe(user_loader: UserLoader, conges: Sequence[CongeEquipe]) -> List[ConflitEquipe]:
+    """Construit les conflits d'équipe avec les informations des personnes concernées"""
+    users_info = await user_loader.load_basic_infos([conge.user_id for conge in conges])
+    return [
+        ConflitEquipe(
+            demande_id=conge.demande_id,
+            date_debut=conge.date_debut,
+            date_fin=conge.date_fin,
+            statut=conge.statut,
+            user=users_info.get(conge.user_id)
+        )
+        for conge in conges
+    ]
+
 @router.get("/", response_model=List[DemandeCongeWithActions])
 async def get_demandes_conges(
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user),
     statut: Optional[StatutDemandeEnum] = Query(None),
     type_conge: Optional[TypeCongeEnum] = Query(None),
@@ -120,16 +202,12 @@ async def get_demandes_conges(
     demandes = result.scalars().all()
     
     # Enrichir avec les informations utilisateur et les actions
-    enriched_demandes = []
-    for demande in demandes:
-        enriched = await enrich_demande_with_actions(db, demande, current_user)
-        enriched_demandes.append(enriched)
-    
-    return enriched_demandes
+    return await enrich_demandes_with_actions(user_loader, demandes, current_user)
 
 @router.get("/mes-demandes", response_model=List[DemandeCongeRead])
 async def get_my_demandes(
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère les demandes de l'utilisateur connecté"""
@@ -141,16 +219,12 @@ async def get_my_demandes(
     demandes = result.scalars().all()
     
     # Enrichir avec les informations utilisateur
-    enriched_demandes = []
-    for demande in demandes:
-        enriched = await enrich_demande_with_user_info(db, demande)
-        enriched_demandes.append(enriched)
-    
-    return enriched_demandes
+    return await enrich_demandes_with_user_info(user_loader, demandes)
 
 @router.get("/en-attente", response_model=List[DemandeCongeRead])
 async def get_pending_demandes(
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(require_manager())
 ):
     """Récupère les demandes en attente de validation (Manager/DRH uniquement)"""
@@ -175,12 +249,55 @@ async def get_pending_demandes(
     demandes = result.scalars().all()
     
     # Enrichir avec les informations utilisateur
-    enriched_demandes = []
-    for demande in demandes:
-        enriched = await enrich_demande_with_user_info(db, demande)
-        enriched_demandes.append(enriched)
+    return await enrich_demandes_with_user_info(user_loader, demandes)
+
+@router.get("/absences/{jour}", response_model=List[UserBasicInfo])
+async def get_absents_du_jour(
+    jour: date,
+    db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
+    current_user: User = Depends(require_manager())
+):
+    """Récupère les personnes en congé approuvé à une date donnée (Manager/DRH uniquement)"""
+    user_ids = None
+    if current_user.role == RoleEnum.CHEF_SERVICE:
+        # Chef de service : seulement les employés de son département
+        employes_result = await db.execute(
+            select(User.id).where(
+                and_(
+                    User.departement_id == current_user.departement_id,
+                    User.role == RoleEnum.EMPLOYE
+                )
+            )
+        )
+        user_ids = employes_result.scalars().all()
     
-    return enriched_demandes
+    absents = await AbsenceJourService(db).get_absents(jour, user_ids)
+    users_info = await user_loader.load_basic_infos(absents)
+    return sorted(users_info.values(), key=lambda info: (info.nom, info.prenom))
+
+@router.get("/conflits", response_model=List[ConflitEquipe])
+async def get_conflits_equipe(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
+    current_user: User = Depends(get_current_user)
+):
+    """Prévisualise les congés des membres de l'équipe qui chevauchent une période, avant soumission"""
+    if date_fin < date_debut:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La date de fin doit être postérieure ou égale à la date de début"
+        )
+    
+    if not current_user.departement_id:
+        return []
+    
+    conges = await moteur_conflits.trouver_conflits(
+        db, current_user.departement_id, date_debut, date_fin, exclure_user_id=current_user.id
+    )
+    return await build_conflits_equipe(user_loader, conges)
 
 @router.get("/can-create-new")
 async def can_create_new_demande(
@@ -201,6 +318,7 @@ async def can_create_new_demande(
 async def get_demande_conge(
     demande_id: uuid.UUID,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère une demande de congé par son ID"""
@@ -222,44 +340,22 @@ async def get_demande_conge(
             detail="Vous ne pouvez voir que vos propres demandes"
         )
     
-    return await enrich_demande_with_user_info(db, demande)
+    return await enrich_demande_with_user_info(user_loader, demande)
 
-@router.post("/", response_model=DemandeCongeRead)
+@router.post("/", response_model=DemandeCongeWithConflits)
 async def create_demande_conge(
     demande_data: DemandeCongeCreate,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Crée une nouvelle demande de congé"""
     
     # Vérifier les chevauchements avec les demandes existantes
-    chevauchement_query = select(DemandeConge).where(
-        and_(
-            DemandeConge.demandeur_id == current_user.id,
-            or_(
-                # Cas 1: La nouvelle demande commence pendant une période existante
-                and_(
-                    DemandeConge.date_debut <= demande_data.date_debut,
-                    DemandeConge.date_fin >= demande_data.date_debut
-                ),
-                # Cas 2: La nouvelle demande se termine pendant une période existante
-                and_(
-                    DemandeConge.date_debut <= demande_data.date_fin,
-                    DemandeConge.date_fin >= demande_data.date_fin
-                ),
-                # Cas 3: La nouvelle demande englobe une période existante
-                and_(
-                    DemandeConge.date_debut >= demande_data.date_debut,
-                    DemandeConge.date_fin <= demande_data.date_fin
-                )
-            ),
-            # Exclure les demandes refusées et annulées
-            DemandeConge.statut.in_([StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE])
-        )
+    result = await db.execute(
+        select_demande_chevauchante(current_user.id, demande_data.date_debut, demande_data.date_fin)
     )
-    
-    result = await db.execute(chevauchement_query)
-    demande_chevauchement = result.scalars().first()
+    demande_chevauchement = result.first()
     
     if demande_chevauchement:
         raise HTTPException(
@@ -276,13 +372,8 @@ async def create_demande_conge(
     # Vérifier si l'utilisateur a suffisamment de congés restants
     # (seulement pour les congés payés, pas pour les autres types)
     if demande_data.type_conge == TypeCongeEnum.CONGES_PAYES:
-        # Récupérer les demandes de l'utilisateur pour calculer le solde
-        demandes_result = await db.execute(
-            select(DemandeConge).where(DemandeConge.demandeur_id == current_user.id)
-        )
-        demandes_existantes = demandes_result.scalars().all()
-        
-        solde_restant = current_user.calculate_solde_conges_restant(demandes_existantes)
+        # Lire le solde depuis le registre des soldes
+        solde_restant = await SoldeLedgerService(db).get_solde_restant(current_user)
         if working_days > solde_restant:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -384,53 +475,40 @@ async def create_demande_conge(
         demande.commentaire_validation = "Approbation automatique (DRH)"
     
     db.add(demande)
+    await enregistrer_transition_demande(db, user_loader, demande, None, statut_initial)
     await db.commit()
     await db.refresh(demande)
     
-    # Envoyer les notifications pour nouvelle demande (seulement si EN_ATTENTE)
-    if statut_initial == StatutDemandeEnum.EN_ATTENTE:
-        try:
-            notification_service = NotificationService(db)
-            await notification_service.notifier_nouvelle_demande(demande)
-
-            # Vérifier les conflits d'équipe et notifier le chef de service
-            if current_user.departement_id and valideur_id:
-                # Récupérer les autres demandes du même département
-                conflit_query = select(DemandeConge).where(
-                    and_(
-                        DemandeConge.valideur_id == demande.valideur_id,
-                        DemandeConge.demandeur_id != current_user.id, # Exclure les demandes du demandeur actuel
-                        # DemandeConge.id != demande.id, # Exclure la demande qu'on vient de créer
-                        or_(
-                           and_(
-                                DemandeConge.date_fin >= demande.date_debut,
-                                DemandeConge.date_debut <= demande.date_fin
-                            )
-                        ),
-                        # DemandeConge.statut.in_([StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE, StatutDemandeEnum.DEMANDE_ANNULATION, StatutDemandeEnum.ANNULATION_REFUSEE])
-                    )
-                )
-                result = await db.execute(conflit_query)
-                demandes_en_conflit = result.scalars().all()
-                if demandes_en_conflit:
-                    # Le valideur est le chef de service dans ce cas
-                    await notification_service.notifier_conflit_demande_equipe(
-                        nouvelle_demande=demande,
-                        demandes_en_conflit=demandes_en_conflit,
-                        chef_service_id=valideur_id
-                    )
-
-        except Exception as e:
-            # Ne pas faire échouer la création de demande si les notifications échouent
-            print(f"Erreur lors de l'envoi des notifications: {e}")
+    # Congés des autres membres du département qui chevauchent la nouvelle demande
+    conges_en_conflit = []
+    if current_user.departement_id:
+        conges_en_conflit = await moteur_conflits.trouver_conflits(
+            db, current_user.departement_id, demande.date_debut, demande.date_fin,
+            exclure_user_id=current_user.id
+        )
     
-    return await enrich_demande_with_user_info(db, demande)
+    # Envoyer les notifications pour nouvelle demande (seulement si EN_ATTENTE), en tâche de fond
+    if statut_initial == StatutDemandeEnum.EN_ATTENTE:
+        await notification_worker.publier(EvenementDemande(
+            type_evenement=TypeEvenementEnum.DEMANDE_CREEE,
+            demande_id=demande.id,
+            conflits=tuple(conges_en_conflit),
+            # Le valideur est le chef de service à alerter des conflits d'équipe
+            chef_service_id=valideur_id
+        ))
+    
+    demande_read = await enrich_demande_with_user_info(user_loader, demande)
+    return DemandeCongeWithConflits(
+        **demande_read.dict(),
+        conflits=await build_conflits_equipe(user_loader, conges_en_conflit)
+    )
 
 @router.put("/{demande_id}", response_model=DemandeCongeRead)
 async def update_demande_conge(
     demande_id: uuid.UUID,
     demande_data: DemandeCongeUpdate,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Met à jour une demande de congé (seulement si en attente et par le demandeur)"""
@@ -466,34 +544,10 @@ async def update_demande_conge(
         new_date_fin = update_data.get('date_fin', demande.date_fin)
         
         # Vérifier les chevauchements avec les autres demandes (exclure la demande en cours de modification)
-        chevauchement_query = select(DemandeConge).where(
-            and_(
-                DemandeConge.demandeur_id == current_user.id,
-                DemandeConge.id != demande.id,  # Exclure la demande actuelle
-                or_(
-                    # Cas 1: La demande modifiée commence pendant une période existante
-                    and_(
-                        DemandeConge.date_debut <= new_date_debut,
-                        DemandeConge.date_fin >= new_date_debut
-                    ),
-                    # Cas 2: La demande modifiée se termine pendant une période existante
-                    and_(
-                        DemandeConge.date_debut <= new_date_fin,
-                        DemandeConge.date_fin >= new_date_fin
-                    ),
-                    # Cas 3: La demande modifiée englobe une période existante
-                    and_(
-                        DemandeConge.date_debut >= new_date_debut,
-                        DemandeConge.date_fin <= new_date_fin
-                    )
-                ),
-                # Exclure les demandes refusées et annulées
-                DemandeConge.statut.in_([StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE])
-            )
+        result = await db.execute(
+            select_demande_chevauchante(current_user.id, new_date_debut, new_date_fin, exclure_demande_id=demande.id)
         )
-        
-        result = await db.execute(chevauchement_query)
-        demande_chevauchement = result.scalars().first()
+        demande_chevauchement = result.first()
         
         if demande_chevauchement:
             raise HTTPException(
@@ -509,19 +563,8 @@ async def update_demande_conge(
         # Vérifier si l'utilisateur a suffisamment de congés restants pour la modification
         # (seulement pour les congés payés, pas pour les autres types)
         if demande.type_conge == TypeCongeEnum.CONGES_PAYES:
-            # Récupérer les demandes de l'utilisateur (excluant la demande en cours de modification)
-            demandes_result = await db.execute(
-                select(DemandeConge).where(
-                    and_(
-                        DemandeConge.demandeur_id == current_user.id,
-                        DemandeConge.id != demande.id
-                    )
-                )
-            )
-            demandes_autres = demandes_result.scalars().all()
-            
-            # Calculer le solde en excluant la demande actuelle
-            solde_avec_demande_actuelle = current_user.calculate_solde_conges_restant(demandes_autres)
+            # La demande modifiée est en attente : elle n'entre pas dans les jours pris du registre
+            solde_avec_demande_actuelle = await SoldeLedgerService(db).get_solde_restant(current_user)
             if working_days > solde_avec_demande_actuelle:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -533,21 +576,30 @@ async def update_demande_conge(
         update_data['real_time'] = total_days
     
     # Appliquer les modifications
+    ancien_statut = demande.statut
+    ancienne_date_debut = demande.date_debut
+    ancien_working_time = demande.working_time
     for field, value in update_data.items():
         setattr(demande, field, value)
     
     demande.updated_at = datetime.utcnow()
     
+    await enregistrer_transition_demande(
+        db, user_loader, demande, ancien_statut, demande.statut,
+        ancienne_date_debut=ancienne_date_debut,
+        ancien_working_time=ancien_working_time
+    )
     await db.commit()
     await db.refresh(demande)
     
-    return await enrich_demande_with_user_info(db, demande)
+    return await enrich_demande_with_user_info(user_loader, demande)
 
 @router.post("/{demande_id}/valider", response_model=DemandeCongeRead)
 async def valider_demande_conge(
     demande_id: uuid.UUID,
     validation_data: DemandeCongeValidation,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(require_manager())
 ):
     """Valide ou refuse une demande de congé (Manager/DRH uniquement)"""
@@ -571,10 +623,7 @@ async def valider_demande_conge(
     # Vérifier les permissions de validation
     if current_user.role == RoleEnum.CHEF_SERVICE:
         # Chef de service : seulement les demandes des employés de son département
-        demandeur_result = await db.execute(
-            select(User).where(User.id == demande.demandeur_id)
-        )
-        demandeur = demandeur_result.scalar_one_or_none()
+        demandeur = await user_loader.load(demande.demandeur_id)
         
         if not demandeur or demandeur.departement_id != current_user.departement_id or demandeur.role != RoleEnum.EMPLOYE:
             raise HTTPException(
@@ -587,10 +636,7 @@ async def valider_demande_conge(
         # 1. Demandes des chefs de service (directement)
         # 2. Seulement REFUSER les demandes des employés de son département
         # 3. Les demandes d'employés d'autres départements doivent d'abord être approuvées par leur chef de service
-        demandeur_result = await db.execute(
-            select(User).where(User.id == demande.demandeur_id)
-        )
-        demandeur = demandeur_result.scalar_one_or_none()
+        demandeur = await user_loader.load(demande.demandeur_id)
         
         if not demandeur:
             raise HTTPException(
@@ -633,33 +679,31 @@ async def valider_demande_conge(
                 detail="Vous ne pouvez valider cette demande selon votre périmètre de responsabilité"
             )
     
+    ancien_statut = demande.statut
     demande.statut = validation_data.statut
     demande.commentaire_validation = validation_data.commentaire_validation
     demande.valideur_id = current_user.id
     demande.date_reponse = datetime.utcnow()
     
+    await enregistrer_transition_demande(db, user_loader, demande, ancien_statut, demande.statut)
     await db.commit()
     await db.refresh(demande)
     
-    # Envoyer les notifications de validation
-    try:
-        notification_service = NotificationService(db)
-        approuvee = validation_data.statut == StatutDemandeEnum.APPROUVEE
-        await notification_service.notifier_validation_demande(
-            demande, 
-            approuvee, 
-            validation_data.commentaire_validation
-        )
-    except Exception as e:
-        # Ne pas faire échouer la validation si les notifications échouent
-        print(f"Erreur lors de l'envoi des notifications: {e}")
+    # Envoyer les notifications de validation, en tâche de fond
+    await notification_worker.publier(EvenementDemande(
+        type_evenement=TypeEvenementEnum.DEMANDE_VALIDEE,
+        demande_id=demande.id,
+        approuvee=validation_data.statut == StatutDemandeEnum.APPROUVEE,
+        commentaire=validation_data.commentaire_validation
+    ))
     
-    return await enrich_demande_with_user_info(db, demande)
+    return await enrich_demande_with_user_info(user_loader, demande)
 
 @router.delete("/{demande_id}")
 async def delete_demande_conge(
     demande_id: uuid.UUID,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Supprime définitivement une demande de congé"""
@@ -684,10 +728,7 @@ async def delete_demande_conge(
         # Chef de service peut supprimer les demandes de son équipe
         if demande.demandeur_id != current_user.id:
             # Vérifier si le demandeur est dans son département
-            demandeur_result = await db.execute(
-                select(User).where(User.id == demande.demandeur_id)
-            )
-            demandeur = demandeur_result.scalar_one_or_none()
+            demandeur = await user_loader.load(demande.demandeur_id)
             if not demandeur or demandeur.departement_id != current_user.departement_id:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
@@ -703,6 +744,7 @@ async def delete_demande_conge(
         )
     
     # Suppression définitive de la base de données
+    await enregistrer_transition_demande(db, user_loader, demande, demande.statut, None)
     await db.delete(demande)
     await db.commit()
     return {"message": "Demande supprimée définitivement avec succès"}
@@ -711,17 +753,18 @@ async def delete_demande_conge(
 @router.get("/stats/dashboard")
 async def get_dashboard_stats(
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère les statistiques pour le dashboard selon le rôle"""
-    base_query = select(DemandeConge)
+    filtres = []
     
     # Filtrer selon le rôle
     if current_user.role == RoleEnum.EMPLOYE:
-        base_query = base_query.where(DemandeConge.demandeur_id == current_user.id)
+        filtres.append(DemandeConge.demandeur_id == current_user.id)
     elif current_user.role == RoleEnum.CHEF_SERVICE:
         # Chef de service : demandes des employés de son département
-        base_query = base_query.where(
+        filtres.append(
             DemandeConge.demandeur_id.in_(
                 select(User.id).where(
                     and_(
@@ -733,43 +776,22 @@ async def get_dashboard_stats(
         )
     # DRH : garder toutes les demandes pour les stats globales
     
-    # Statistiques par statut
-    stats = {}
-    for statut in StatutDemandeEnum:
-        result = await db.execute(
-            base_query.where(DemandeConge.statut == statut)
-        )
-        stats[statut.value] = len(result.scalars().all())
+    # Statistiques par statut (une seule requête agrégée)
+    stats = await count_demandes_par_statut(db, *filtres)
     
     # KPI spécifiques aux employés
     if current_user.role == RoleEnum.EMPLOYE:
-        # Récupérer toutes les demandes de l'utilisateur pour calculer le solde restant
+        # Récupérer toutes les demandes de l'utilisateur (congé en cours et activité récente)
         demandes_user_result = await db.execute(
             select(DemandeConge).where(DemandeConge.demandeur_id == current_user.id)
         )
         demandes_user = demandes_user_result.scalars().all()
         
-        # Calculer le solde restant avec la méthode officielle
-        solde_restant = current_user.calculate_solde_conges_restant(demandes_user)
-        
-        # Calculer les statistiques pour l'année en cours
+        # Solde restant et jours de l'année en cours depuis le registre des soldes
         annee_courante = date.today().year
-        debut_annee = date(annee_courante, 1, 1)
-        fin_annee = date(annee_courante, 12, 31)
-        
-        # Jours déjà pris (demandes approuvées cette année)
-        demandes_approuvees_annee = [d for d in demandes_user 
-                                   if d.statut == StatutDemandeEnum.APPROUVEE 
-                                   and d.date_debut >= debut_annee 
-                                   and d.date_debut <= fin_annee]
-        jours_pris = sum(demande.working_time or 0 for demande in demandes_approuvees_annee)
-        
-        # Jours en attente (demandes en attente cette année)
-        demandes_attente_annee = [d for d in demandes_user 
-                                if d.statut == StatutDemandeEnum.EN_ATTENTE 
-                                and d.date_debut >= debut_annee 
-                                and d.date_debut <= fin_annee]
-        jours_attente = sum(demande.working_time or 0 for demande in demandes_attente_annee)
+        solde_ledger_service = SoldeLedgerService(db)
+        solde_restant = await solde_ledger_service.get_solde_restant(current_user)
+        jours_pris, jours_attente = await solde_ledger_service.get_annee(current_user, annee_courante)
         
         # Jours restants (en utilisant le solde restant global, pas seulement pour l'année)
         jours_restants = solde_restant
@@ -833,8 +855,6 @@ async def get_dashboard_stats(
     # KPI spécifiques aux chefs de service
     elif current_user.role == RoleEnum.CHEF_SERVICE:
         annee_courante = date.today().year
-        debut_annee = date(annee_courante, 1, 1)
-        fin_annee = date(annee_courante, 12, 31)
         aujourd_hui = date.today()
         
         # Récupérer tous les employés du département
@@ -858,25 +878,20 @@ async def get_dashboard_stats(
         }
         
         # Compter toutes les demandes de l'équipe
-        for statut in StatutDemandeEnum:
-            result = await db.execute(
-                select(DemandeConge).where(
-                    and_(
-                        DemandeConge.demandeur_id.in_([emp.id for emp in employes]),
-                        DemandeConge.statut == statut
-                    )
-                )
-            )
-            stats_equipe[statut.value] = len(result.scalars().all())
+        stats_equipe.update(await count_demandes_par_statut(
+            db, DemandeConge.demandeur_id.in_([emp.id for emp in employes])
+        ))
         
-        # Employés actuellement en congé
+        # Employés actuellement en congé (lus depuis la table d'occupation journalière)
         conges_en_cours = await db.execute(
             select(DemandeConge).where(
-                and_(
-                    DemandeConge.demandeur_id.in_([emp.id for emp in employes]),
-                    DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    DemandeConge.date_debut <= aujourd_hui,
-                    DemandeConge.date_fin >= aujourd_hui
+                DemandeConge.id.in_(
+                    select(AbsenceJour.demande_id).where(
+                        and_(
+                            AbsenceJour.jour == aujourd_hui,
+                            AbsenceJour.user_id.in_([emp.id for emp in employes])
+                        )
+                    )
                 )
             )
         )
@@ -927,30 +942,8 @@ async def get_dashboard_stats(
                     "working_time": conge.working_time
                 })
         
-        # Ses propres infos de congés (comme employé)
-        mes_demandes_approuvees = await db.execute(
-            select(DemandeConge).where(
-                and_(
-                    DemandeConge.demandeur_id == current_user.id,
-                    DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    DemandeConge.date_debut >= debut_annee,
-                    DemandeConge.date_debut <= fin_annee
-                )
-            )
-        )
-        mes_jours_pris = sum(demande.working_time or 0 for demande in mes_demandes_approuvees.scalars().all())
-        
-        mes_demandes_attente = await db.execute(
-            select(DemandeConge).where(
-                and_(
-                    DemandeConge.demandeur_id == current_user.id,
-                    DemandeConge.statut == StatutDemandeEnum.EN_ATTENTE,
-                    DemandeConge.date_debut >= debut_annee,
-                    DemandeConge.date_debut <= fin_annee
-                )
-            )
-        )
-        mes_jours_attente = sum(demande.working_time or 0 for demande in mes_demandes_attente.scalars().all())
+        # Ses propres infos de congés (comme employé), lues depuis le registre des soldes
+        mes_jours_pris, mes_jours_attente = await SoldeLedgerService(db).get_annee(current_user, annee_courante)
         
         mes_jours_restants = max(0, current_user.solde_conges - mes_jours_pris - mes_jours_attente)
         
@@ -1048,75 +1041,38 @@ async def get_dashboard_stats(
     # KPI spécifiques aux DRH
     elif current_user.role == RoleEnum.DRH:
         annee_courante = date.today().year
-        debut_annee = date(annee_courante, 1, 1)
-        fin_annee = date(annee_courante, 12, 31)
         aujourd_hui = date.today()
         
         # Récupérer tous les départements
         departements_result = await db.execute(select(Departement))
         departements = departements_result.scalars().all()
         
+        # Compteurs précalculés : une ligne par département
+        snapshots = await DashboardSnapshotService(db).get_snapshots(departements)
+        
         # Statistiques par département
         stats_departements = []
         for dept in departements:
-            # Récupérer les employés du département
-            employes_dept = await db.execute(
-                select(User).where(
-                    and_(
-                        User.departement_id == dept.id,
-                        User.role.in_([RoleEnum.EMPLOYE, RoleEnum.CHEF_SERVICE])
-                    )
-                )
-            )
-            employes_list = employes_dept.scalars().all()
+            snapshot = snapshots[dept.id]
+            nombre_employes = snapshot.nombre_employes
+            employes_en_conge = snapshot.employes_en_conge
             
             # Statistiques des demandes du département
-            stats_dept = {
-                "approuvee": 0,
-                "refusee": 0,
-                "en_attente": 0,
-                "demande_annulation": 0,
-                "annulee": 0
-            }
-            
-            if employes_list:
-                for statut in StatutDemandeEnum:
-                    result = await db.execute(
-                        select(DemandeConge).where(
-                            and_(
-                                DemandeConge.demandeur_id.in_([emp.id for emp in employes_list]),
-                                DemandeConge.statut == statut
-                            )
-                        )
-                    )
-                    stats_dept[statut.value] = len(result.scalars().all())
-            
-            # Employés actuellement en congé
-            conges_en_cours = await db.execute(
-                select(DemandeConge).where(
-                    and_(
-                        DemandeConge.demandeur_id.in_([emp.id for emp in employes_list]),
-                        DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                        DemandeConge.date_debut <= aujourd_hui,
-                        DemandeConge.date_fin >= aujourd_hui
-                    )
-                )
-            )
-            employes_en_conge = len(conges_en_cours.scalars().all())
+            stats_dept = {statut.value: getattr(snapshot, statut.value) for statut in StatutDemandeEnum}
             
             stats_departements.append({
                 "id": str(dept.id),
                 "nom": dept.nom,
-                "nombre_employes": len(employes_list),
-                "employes_presents": len(employes_list) - employes_en_conge,
+                "nombre_employes": nombre_employes,
+                "employes_presents": nombre_employes - employes_en_conge,
                 "employes_en_conge": employes_en_conge,
                 "demandes_approuvees": stats_dept.get("approuvee", 0),
                 "demandes_refusees": stats_dept.get("refusee", 0),
                 "demandes_en_attente": stats_dept.get("en_attente", 0),
                 "demandes_annulation": stats_dept.get("demande_annulation", 0),
                 "total_demandes": sum(stats_dept.values()),
-                "solde_total": sum(emp.solde_conges or 0 for emp in employes_list),
-                "taux_presence": round((len(employes_list) - employes_en_conge) / len(employes_list) * 100, 1) if employes_list else 0
+                "solde_total": snapshot.solde_total,
+                "taux_presence": round((nombre_employes - employes_en_conge) / nombre_employes * 100, 1) if nombre_employes else 0
             })
         
         # Calculer les stats globales
@@ -1137,77 +1093,22 @@ async def get_dashboard_stats(
         fin_mois = debut_mois.replace(month=debut_mois.month + 1) if debut_mois.month < 12 else debut_mois.replace(year=debut_mois.year + 1, month=1)
         fin_mois = fin_mois.replace(day=1) - timedelta(days=1)
         
-        # Récupérer tous les employés
-        tous_employes = []
-        for dept in departements:
-            employes_dept = await db.execute(
-                select(User).where(
-                    and_(
-                        User.departement_id == dept.id,
-                        User.role.in_([RoleEnum.EMPLOYE, RoleEnum.CHEF_SERVICE])
-                    )
-                )
-            )
-            tous_employes.extend(employes_dept.scalars().all())
-        
-        # Congés approuvés qui touchent le mois courant
-        conges_mois_courant = await db.execute(
-            select(DemandeConge).where(
+        # Identifiants des employés et chefs de service des départements
+        ids_employes_result = await db.execute(
+            select(User.id).where(
                 and_(
-                    DemandeConge.demandeur_id.in_([emp.id for emp in tous_employes]),
-                    DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    or_(
-                        # Congés qui commencent dans le mois
-                        and_(
-                            DemandeConge.date_debut >= debut_mois,
-                            DemandeConge.date_debut <= fin_mois
-                        ),
-                        # Congés qui se terminent dans le mois
-                        and_(
-                            DemandeConge.date_fin >= debut_mois,
-                            DemandeConge.date_fin <= fin_mois
-                        ),
-                        # Congés qui englobent le mois
-                        and_(
-                            DemandeConge.date_debut <= debut_mois,
-                            DemandeConge.date_fin >= fin_mois
-                        )
-                    )
+                    User.departement_id.in_([dept.id for dept in departements]),
+                    User.role.in_([RoleEnum.EMPLOYE, RoleEnum.CHEF_SERVICE])
                 )
             )
         )
+        ids_employes = list(ids_employes_result.scalars().all())
         
-        # Compter les employés uniques qui seront absents ce mois
-        employes_absents_mois = set()
-        for conge in conges_mois_courant.scalars().all():
-            employes_absents_mois.add(conge.demandeur_id)
+        # Compter les employés uniques dont un congé approuvé touche le mois courant
+        total_absents_mois_courant = await AbsenceJourService(db).compter_absents(debut_mois, fin_mois, ids_employes)
         
-        total_absents_mois_courant = len(employes_absents_mois)
-        
-        # Ses propres infos de congés (comme employé)
-        mes_demandes_approuvees = await db.execute(
-            select(DemandeConge).where(
-                and_(
-                    DemandeConge.demandeur_id == current_user.id,
-                    DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    DemandeConge.date_debut >= debut_annee,
-                    DemandeConge.date_debut <= fin_annee
-                )
-            )
-        )
-        mes_jours_pris = sum(demande.working_time or 0 for demande in mes_demandes_approuvees.scalars().all())
-        
-        mes_demandes_attente = await db.execute(
-            select(DemandeConge).where(
-                and_(
-                    DemandeConge.demandeur_id == current_user.id,
-                    DemandeConge.statut == StatutDemandeEnum.EN_ATTENTE,
-                    DemandeConge.date_debut >= debut_annee,
-                    DemandeConge.date_debut <= fin_annee
-                )
-            )
-        )
-        mes_jours_attente = sum(demande.working_time or 0 for demande in mes_demandes_attente.scalars().all())
+        # Ses propres infos de congés (comme employé), lues depuis le registre des soldes
+        mes_jours_pris, mes_jours_attente = await SoldeLedgerService(db).get_annee(current_user, annee_courante)
         
         mes_jours_restants = max(0, current_user.solde_conges - mes_jours_pris - mes_jours_attente)
         
@@ -1233,16 +1134,17 @@ async def get_dashboard_stats(
             .limit(5)
         )
         
+        activites = activite_generale.scalars().all()
+        
+        # Récupérer les employés concernés en une seule requête
+        employes_info = await user_loader.load_basic_infos([demande.demandeur_id for demande in activites])
+        
         activite_list = []
-        for demande in activite_generale.scalars().all():
-            # Récupérer l'utilisateur
-            result_user = await db.execute(
-                select(User).where(User.id == demande.demandeur_id)
-            )
-            employe = result_user.scalar_one_or_none()
+        for demande in activites:
+            employe = employes_info.get(demande.demandeur_id)
             if employe:
                 nom_employe = f"{employe.prenom} {employe.nom}"
-                nom_dept = employe.departement.nom if employe.departement else "Département non défini"
+                nom_dept = employe.departement or "Département non défini"
                 
                 # Définir le message selon le statut
                 if demande.statut == StatutDemandeEnum.APPROUVEE:
@@ -1325,7 +1227,7 @@ async def get_dashboard_stats(
         "total_demandes": sum(stats.values())
     }
 
-async def get_actions_for_demande(demande: DemandeConge, current_user: User, db: AsyncSession = None) -> list[ActionDynamique]:
+async def get_actions_for_demande(demande: DemandeConge, current_user: User, user_loader: Optional[UserLoader] = None) -> list[ActionDynamique]:
     """Détermine les actions disponibles pour une demande selon le rôle de l'utilisateur"""
     actions = []
     
@@ -1377,12 +1279,9 @@ async def get_actions_for_demande(demande: DemandeConge, current_user: User, db:
                     ActionDynamique(action="generer_attestation", label="Générer attestation", icon="document", color="blue")
                 )
         else:  # Demandes des autres
-            if demande.statut == StatutDemandeEnum.EN_ATTENTE and db:
+            if demande.statut == StatutDemandeEnum.EN_ATTENTE and user_loader:
                 # Récupérer les informations du demandeur pour appliquer la bonne logique
-                demandeur_result = await db.execute(
-                    select(User).where(User.id == demande.demandeur_id)
-                )
-                demandeur = demandeur_result.scalar_one_or_none()
+                demandeur = await user_loader.load(demande.demandeur_id)
                 
                 if demandeur:
                     # 1. Demandes des chefs de service : peut approuver et refuser
@@ -1417,27 +1316,35 @@ async def get_actions_for_demande(demande: DemandeConge, current_user: User, db:
     
     return actions
 
-async def enrich_demande_with_actions(db: AsyncSession, demande: DemandeConge, current_user: User) -> DemandeCongeWithActions:
+async def enrich_demande_with_actions(user_loader: UserLoader, demande: DemandeConge, current_user: User) -> DemandeCongeWithActions:
     """Enrichit une demande avec les informations utilisateur et les actions disponibles"""
-    # D'abord enrichir avec les informations utilisateur
-    enriched_demande = await enrich_demande_with_user_info(db, demande)
-    
-    # Calculer les actions disponibles
-    actions = await get_actions_for_demande(demande, current_user, db)
-    
-    # Créer l'objet enrichi avec actions
-    demande_with_actions = DemandeCongeWithActions(
-        **enriched_demande.dict(),
-        actions=actions
-    )
-    
-    return demande_with_actions
+    enriched_demandes = await enrich_demandes_with_actions(user_loader, [demande], current_user)
+    return enriched_demandes[0]
+
+async def enrich_demandes_with_actions(user_loader: UserLoader, demandes: Sequence[DemandeConge], current_user: User) -> List[DemandeCongeWithActions]:
+    """Enrichit une liste de demandes avec les informations utilisateur et les actions disponibles"""
+    # D'abord enrichir avec les informations utilisateur (requête groupée)
+    enriched_demandes = await enrich_demandes_with_user_info(user_loader, demandes)
+    
+    demandes_with_actions = []
+    for demande, enriched_demande in zip(demandes, enriched_demandes):
+        # Calculer les actions disponibles
+        actions = await get_actions_for_demande(demande, current_user, user_loader)
+        
+        # Créer l'objet enrichi avec actions
+        demandes_with_actions.append(DemandeCongeWithActions(
+            **enriched_demande.dict(),
+            actions=actions
+        ))
+    
+    return demandes_with_actions
 
 @router.post("/{demande_id}/demander-annulation", response_model=DemandeCongeRead)
 async def demander_annulation(
     demande_id: uuid.UUID,
     annulation_data: DemandeAnnulation,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Demande l'annulation d'une demande de congé approuvée"""
@@ -1467,22 +1374,25 @@ async def demander_annulation(
         )
     
     # Marquer la demande comme ayant une demande d'annulation
+    ancien_statut = demande.statut
     demande.statut = StatutDemandeEnum.DEMANDE_ANNULATION
     demande.demande_annulation = True
     demande.motif_annulation = annulation_data.motif_annulation
     demande.date_demande_annulation = datetime.utcnow()
     demande.updated_at = datetime.utcnow()
     
+    await enregistrer_transition_demande(db, user_loader, demande, ancien_statut, demande.statut)
     await db.commit()
     await db.refresh(demande)
     
-    return await enrich_demande_with_user_info(db, demande)
+    return await enrich_demande_with_user_info(user_loader, demande)
 
 @router.post("/{demande_id}/traiter-annulation", response_model=DemandeCongeRead)
 async def traiter_annulation(
     demande_id: uuid.UUID,
     validation_data: DemandeCongeValidation,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Traite une demande d'annulation (DRH uniquement)"""
@@ -1510,6 +1420,7 @@ async def traiter_annulation(
         )
     
     # Traiter selon la décision du DRH
+    ancien_statut = demande.statut
     if validation_data.statut == StatutDemandeEnum.APPROUVEE:
         # Annulation approuvée → La demande devient annulée
         demande.statut = StatutDemandeEnum.ANNULEE
@@ -1522,16 +1433,91 @@ async def traiter_annulation(
     demande.date_reponse = datetime.utcnow()
     demande.updated_at = datetime.utcnow()
     
+    await enregistrer_transition_demande(db, user_loader, demande, ancien_statut, demande.statut)
     await db.commit()
     await db.refresh(demande)
     
-    return await enrich_demande_with_user_info(db, demande)
+    return await enrich_demande_with_user_info(user_loader, demande)
+
+@router.post("/attestations/batch")
+async def exporter_attestations(
+    criteres: AttestationsBatchRequest,
+    db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporte dans une archive ZIP les attestations des demandes approuvées correspondant
+    aux critères : période, département et/ou liste de demandes (DRH uniquement)
+    
+    L'archive est envoyée au fur et à mesure de la génération des attestations.
+    """
+    if current_user.role != RoleEnum.DRH:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seul le DRH peut générer les attestations"
+        )
+    
+    if not (criteres.date_debut or criteres.date_fin or criteres.departement_id or criteres.demande_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Au moins un critère (période, département ou demandes) est requis"
+        )
+    
+    if criteres.date_debut and criteres.date_fin and criteres.date_debut > criteres.date_fin:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La date de début doit être antérieure à la date de fin"
+        )
+    
+    conditions = [DemandeConge.statut == StatutDemandeEnum.APPROUVEE]
+    if criteres.demande_ids:
+        conditions.append(DemandeConge.id.in_(criteres.demande_ids))
+    if criteres.date_debut or criteres.date_fin:
+        conditions.append(DemandeConge.chevauche(criteres.date_debut or date.min, criteres.date_fin or date.max))
+    if criteres.departement_id:
+        membres_result = await db.execute(
+            select(User.id).where(User.departement_id == criteres.departement_id)
+        )
+        # Les identifiants sont passés via IN car users.id et les clés étrangères n'ont pas le même format en base
+        conditions.append(DemandeConge.demandeur_id.in_(list(membres_result.scalars().all())))
+    
+    result = await db.execute(
+        select(DemandeConge)
+        .where(and_(*conditions))
+        .order_by(DemandeConge.date_debut)
+        .limit(MAX_ATTESTATIONS_BATCH + 1)
+    )
+    demandes = result.scalars().all()
+    
+    if not demandes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aucune demande approuvée ne correspond aux critères"
+        )
+    
+    if len(demandes) > MAX_ATTESTATIONS_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Plus de {MAX_ATTESTATIONS_BATCH} attestations correspondent aux critères, veuillez les restreindre"
+        )
+    
+    enriched_demandes = await enrich_demandes_with_user_info(user_loader, demandes)
+    lot = [build_donnees_attestation(demande) for demande in enriched_demandes if demande.user]
+    
+    nom_archive = f"attestations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        generateur_attestations.flux_zip(lot),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{nom_archive}"'}
+    )
 
 @router.get("/{demande_id}/attestation")
 async def generer_attestation(
     demande_id: uuid.UUID,
     request: Request,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Génère une attestation de congé (DRH uniquement)"""
@@ -1559,20 +1545,22 @@ async def generer_attestation(
         )
     
     # Récupérer les informations de l'employé
-    enriched_demande = await enrich_demande_with_user_info(db, demande)
+    enriched_demande = await enrich_demande_with_user_info(user_loader, demande)
     
-    # Générer le PDF de l'attestation
+    # Récupérer (ou générer) le PDF de l'attestation
     pdf_filename = await generate_attestation_pdf(enriched_demande)
     
     # Construire l'URL complète de l'attestation
     base_url = f"{request.url.scheme}://{request.url.netloc}"
     attestation_url = f"{base_url}/attestations/{pdf_filename}"
     
-    # Mettre à jour la demande avec le nom du fichier PDF et l'URL
-    demande.attestation_pdf = pdf_filename
-    demande.attestation_url = attestation_url
-    demande.date_generation_attestation = datetime.utcnow()
-    await db.commit()
+    # Mettre à jour la demande si l'attestation a changé (première génération ou contenu modifié)
+    if demande.attestation_pdf != pdf_filename or demande.attestation_url != attestation_url:
+        if demande.attestation_pdf != pdf_filename:
+            demande.date_generation_attestation = datetime.utcnow()
+        demande.attestation_pdf = pdf_filename
+        demande.attestation_url = attestation_url
+        await db.commit()
     
     return {
         "message": "Attestation générée avec succès",
@@ -1580,118 +1568,38 @@ async def generer_attestation(
         "url": attestation_url
     }
 
+def build_donnees_attestation(demande: DemandeCongeRead) -> DonneesAttestation:
+    """Extrait d'une demande enrichie le contenu de son attestation"""
+    return DonneesAttestation(
+        demande_id=demande.id,
+        user_id=demande.demandeur_id,
+        nom=demande.user.nom,
+        prenom=demande.user.prenom,
+        role=demande.user.role,
+        date_debut=demande.date_debut,
+        date_fin=demande.date_fin,
+        date_generation=date.today()
+    )
+
 async def generate_attestation_pdf(demande: DemandeCongeRead) -> str:
-    """Génère une attestation de congé au format PDF"""
-    import os
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    
-    # Créer le nom du fichier PDF (sans caractères spéciaux)
-    nom_clean = ''.join(c for c in demande.user.nom if c.isalnum())
-    prenom_clean = ''.join(c for c in demande.user.prenom if c.isalnum())
-    pdf_filename = f"attestation_{nom_clean}_{prenom_clean}_{demande.date_debut.strftime('%Y%m%d')}.pdf"
-    pdf_path = os.path.join("attestations", pdf_filename)
+    """
+    Retourne le fichier PDF de l'attestation de congé (généré dans le pool de processus
+    s'il n'existe pas déjà pour ce contenu)
+    """
+    donnees = build_donnees_attestation(demande)
     
     try:
-        # Créer le canvas
-        c = canvas.Canvas(pdf_path, pagesize=A4)
-        width, height = A4
-        
-        # Variables pour simplifier
-        left_margin = 50
-        y_pos = height - 100
-        
-        # En-tête centré
-        c.setFont("Helvetica-Bold", 14)
-        title1 = "RÉPUBLIQUE DE CÔTE D'IVOIRE"
-        text_width = c.stringWidth(title1, "Helvetica-Bold", 14)
-        c.drawString((width - text_width) / 2, y_pos, title1)
-        y_pos -= 20
-        
-        c.setFont("Helvetica", 12)
-        title2 = "Union - Discipline - Travail"
-        text_width = c.stringWidth(title2, "Helvetica", 12)
-        c.drawString((width - text_width) / 2, y_pos, title2)
-        y_pos -= 40
-        
-        c.setFont("Helvetica-Bold", 12)
-        title3 = "ENTREPRISE"
-        text_width = c.stringWidth(title3, "Helvetica-Bold", 12)
-        c.drawString((width - text_width) / 2, y_pos, title3)
-        y_pos -= 40
-        
-        # Ligne de séparation
-        c.line(left_margin, y_pos, width - left_margin, y_pos)
-        y_pos -= 40
-        
-        # Titre principal
-        c.setFont("Helvetica-Bold", 16)
-        main_title = "ATTESTATION DE CONGÉ"
-        text_width = c.stringWidth(main_title, "Helvetica-Bold", 16)
-        c.drawString((width - text_width) / 2, y_pos, main_title)
-        y_pos -= 60
-        
-        # Contenu
-        c.setFont("Helvetica", 12)
-        
-        # Données
-        nom_complet = f"{demande.user.nom} {demande.user.prenom}"
-        role_text = demande.user.role or "employe"
-        date_debut = demande.date_debut.strftime('%d/%m/%Y')
-        date_fin = demande.date_fin.strftime('%d/%m/%Y')
-        date_today = datetime.now().strftime('%d/%m/%Y')
-        
-        # Paragraphe 1
-        text1 = "Nous soussignés entreprise, attestons que"
-        c.drawString(left_margin, y_pos, text1)
-        y_pos -= 15
-        
-        text2 = f"Monsieur/Madame {nom_complet}, fait partie de notre personnel"
-        c.drawString(left_margin, y_pos, text2)
-        y_pos -= 15
-        
-        text3 = f"en qualité de {role_text} depuis sa date d'embauche."
-        c.drawString(left_margin, y_pos, text3)
-        y_pos -= 30
-        
-        # Paragraphe 2
-        text4 = f"Il bénéficie d'un congé allant du {date_debut} au {date_fin} inclus."
-        c.drawString(left_margin, y_pos, text4)
-        y_pos -= 30
-        
-        # Paragraphe 3
-        text5 = "En foi de quoi, cette attestation lui est délivrée pour servir"
-        c.drawString(left_margin, y_pos, text5)
-        y_pos -= 15
-        
-        text6 = "et valoir ce que de droit."
-        c.drawString(left_margin, y_pos, text6)
-        y_pos -= 60
-        
-        # Date (alignée à droite)
-        date_text = f"Fait à Abidjan, le {date_today}"
-        text_width = c.stringWidth(date_text, "Helvetica", 12)
-        c.drawString(width - left_margin - text_width, y_pos, date_text)
-        y_pos -= 80
-        
-        # Signature centrée
-        signature_text = "Nom et signature du DRH"
-        text_width = c.stringWidth(signature_text, "Helvetica", 12)
-        c.drawString((width - text_width) / 2, y_pos, signature_text)
-        y_pos -= 30
-        
-        # Ligne de signature
-        line_length = 150
-        start_x = (width - line_length) / 2
-        end_x = start_x + line_length
-        c.line(start_x, y_pos, end_x, y_pos)
-        
-        # Sauvegarder
-        c.save()
-        
-        print(f"PDF généré avec succès: {pdf_path}")
-        return pdf_filename
-        
+        pdf_filename = await generateur_attestations.obtenir(donnees)
+    except FileAttestationsPleine:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Trop d'attestations en cours de génération, veuillez réessayer dans quelques instants"
+        )
+    except DelaiGenerationDepasse:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="La génération de l'attestation a pris trop de temps"
+        )
     except Exception as e:
         print(f"Erreur lors de la génération du PDF: {e}")
         import traceback
@@ -1700,12 +1608,15 @@ async def generate_attestation_pdf(demande: DemandeCongeRead) -> str:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la génération du PDF: {str(e)}"
         )
+    
+    return pdf_filename
 
 @router.get("/calendrier/{year}/{month}")
 async def get_calendrier_conges(
     year: int,
     month: int,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère les congés approuvés pour un mois donné pour l'affichage du calendrier"""
@@ -1724,24 +1635,7 @@ async def get_calendrier_conges(
         query = select(DemandeConge).where(
             and_(
                 DemandeConge.demandeur_id == current_user.id,
-                DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                or_(
-                    # Congés qui commencent dans le mois
-                    and_(
-                        DemandeConge.date_debut >= debut_mois,
-                        DemandeConge.date_debut <= fin_mois
-                    ),
-                    # Congés qui se terminent dans le mois
-                    and_(
-                        DemandeConge.date_fin >= debut_mois,
-                        DemandeConge.date_fin <= fin_mois
-                    ),
-                    # Congés qui englobent le mois
-                    and_(
-                        DemandeConge.date_debut <= debut_mois,
-                        DemandeConge.date_fin >= fin_mois
-                    )
-                )
+                DemandeConge.id.in_(select_demandes_absentes(debut_mois, fin_mois))
             )
         )
     
@@ -1749,45 +1643,15 @@ async def get_calendrier_conges(
         # Chef de service : congés de son département
         query = select(DemandeConge).where(
             and_(
-                DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
                 DemandeConge.valideur_id == current_user.id,
-                or_(
-                    and_(
-                        DemandeConge.date_debut >= debut_mois,
-                        DemandeConge.date_debut <= fin_mois
-                    ),
-                    and_(
-                        DemandeConge.date_fin >= debut_mois,
-                        DemandeConge.date_fin <= fin_mois
-                    ),
-                    and_(
-                        DemandeConge.date_debut <= debut_mois,
-                        DemandeConge.date_fin >= fin_mois
-                    )
-                )
+                DemandeConge.id.in_(select_demandes_absentes(debut_mois, fin_mois))
             )
         )
     
     else:  # DRH
         # DRH : tous les congés de l'organisation
         query = select(DemandeConge).where(
-            and_(
-                DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                or_(
-                    and_(
-                        DemandeConge.date_debut >= debut_mois,
-                        DemandeConge.date_debut <= fin_mois
-                    ),
-                    and_(
-                        DemandeConge.date_fin >= debut_mois,
-                        DemandeConge.date_fin <= fin_mois
-                    ),
-                    and_(
-                        DemandeConge.date_debut <= debut_mois,
-                        DemandeConge.date_fin >= fin_mois
-                    )
-                )
-            )
+            DemandeConge.id.in_(select_demandes_absentes(debut_mois, fin_mois))
         )
     
     result = await db.execute(query.order_by(DemandeConge.date_debut))
@@ -1795,10 +1659,7 @@ async def get_calendrier_conges(
     
     print(demandes)
     # Enrichir avec les informations utilisateur
-    enriched_demandes = []
-    for demande in demandes:
-        enriched = await enrich_demande_with_user_info(db, demande)
-        enriched_demandes.append(enriched)
+    enriched_demandes = await enrich_demandes_with_user_info(user_loader, demandes)
     
     return {
         "month": month,
@@ -1810,6 +1671,7 @@ async def get_calendrier_conges(
 async def get_demandes_by_user(
     user_id: uuid.UUID,
     db: AsyncSession = Depends(get_database),
+    user_loader: UserLoader = Depends(get_user_loader),
     current_user: User = Depends(get_current_user)
 ):
     """Récupère les demandes d'un utilisateur spécifique avec contrôles de sécurité"""
@@ -1828,10 +1690,7 @@ async def get_demandes_by_user(
     # 3. Les chefs de service peuvent voir les demandes de leur département
     elif current_user.role == RoleEnum.CHEF_SERVICE:
         # Vérifier si l'utilisateur cible est dans le même département
-        result = await db.execute(
-            select(User).where(User.id == user_id)
-        )
-        target_user = result.scalar_one_or_none()
+        target_user = await user_loader.load(user_id)
         
         if target_user and target_user.departement_id == current_user.departement_id:
             can_view = True
@@ -1851,12 +1710,7 @@ async def get_demandes_by_user(
     demandes = result.scalars().all()
     
     # Enrichir avec les informations utilisateur
-    enriched_demandes = []
-    for demande in demandes:
-        enriched = await enrich_demande_with_user_info(db, demande)
-        enriched_demandes.append(enriched)
-    
-    return enriched_demandes
+    return await enrich_demandes_with_user_info(user_loader, demandes)
 
 
 
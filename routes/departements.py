@@ -1,7 +1,8 @@
 import uuid
+from datetime import date, timedelta
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -10,6 +11,9 @@ from models.database import get_database
 from models.departement import Departement, DepartementRead, DepartementCreate, DepartementUpdate
 from models.user import User, RoleEnum
 from utils.dependencies import get_current_user, require_drh
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from services.absence_jour_service import AbsenceJourService
+from services.conflit_service import moteur_conflits
 
 router = APIRouter(prefix="/departements", tags=["departements"])
 
@@ -118,6 +122,7 @@ async def delete_departement(
             detail="Impossible de supprimer un département contenant des employés"
         )
     
+    await DashboardSnapshotService(db).supprimer([departement_id])
     await db.delete(departement)
     await db.commit()
     return {"message": "Département supprimé avec succès"}
@@ -160,8 +165,13 @@ async def assign_chef_departement(
         )
     
     # Assigner le chef et affecter l'utilisateur au département
+    departements_concernes = [dept_id for dept_id in (chef.departement_id, departement_id) if dept_id]
+    await AbsenceJourService(db).changer_departement(chef.id, departement_id)
+    moteur_conflits.invalider(departements_concernes)
     departement.chef_departement_id = chef_id
     chef.departement_id = departement_id
+    # Les compteurs de l'ancien et du nouveau département sont reconstruits dans la même transaction
+    await DashboardSnapshotService(db).reconstruire(departements_concernes)
     
     await db.commit()
     await db.refresh(departement)
@@ -205,4 +215,45 @@ async def get_departement_stats(
             }
             for emp in departement.employes
         ]
+    }
+
+@router.get("/{departement_id}/absences/{year}/{month}")
+async def get_departement_absences(
+    departement_id: uuid.UUID,
+    year: int = Path(ge=1900, le=2100),
+    month: int = Path(ge=1, le=12),
+    db: AsyncSession = Depends(get_database),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Récupère le nombre de personnes absentes du département pour chaque jour du mois
+    
+    Réservé au DRH (et aux administrateurs) et aux membres du département, chef de service compris.
+    """
+    if (not current_user.is_superuser and current_user.role != RoleEnum.DRH
+            and current_user.departement_id != departement_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé au DRH et aux membres du département"
+        )
+    
+    departement = await db.get(Departement, departement_id)
+    
+    if not departement:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Département non trouvé"
+        )
+    
+    debut_mois = date(year, month, 1)
+    fin_mois = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    fin_mois -= timedelta(days=1)
+    
+    effectifs = await AbsenceJourService(db).compter_par_jour(departement_id, debut_mois, fin_mois)
+    
+    return {
+        "departement_id": departement_id,
+        "year": year,
+        "month": month,
+        "absents_par_jour": {jour.isoformat(): nombre for jour, nombre in effectifs.items()}
     } 
\ No newline at end of file
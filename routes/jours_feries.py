@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Routes API pour la consultation et le rechargement des jours fériés
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+
+from models.user import User
+from utils.dependencies import get_current_user, require_admin
+from utils.date_calculator import get_holidays_for_year, recharger_jours_feries
+
+router = APIRouter(prefix="/jours-feries", tags=["jours-feries"])
+
+@router.post("/recharger")
+async def recharger_definitions_jours_feries(
+    current_user: User = Depends(require_admin())
+):
+    """
+    Recharge le fichier des jours fériés sans redémarrer l'API (Admin uniquement)
+    
+    Ne concerne que le processus qui reçoit la requête : avec plusieurs workers,
+    chacun doit être rechargé (ou redémarré).
+    """
+    try:
+        resultat = recharger_jours_feries()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    print(f"Jours fériés rechargés par {current_user.email} (version {resultat['version']})")
+    return {
+        "message": "Jours fériés rechargés avec succès",
+        **resultat
+    }
+
+@router.get("/{annee}")
+async def get_jours_feries(
+    annee: int = Path(ge=1900, le=2100),
+    current_user: User = Depends(get_current_user)
+):
+    """Liste les jours fériés d'une année"""
+    jours_feries = get_holidays_for_year(annee)
+    return [
+        {"date": jour, "nom": nom}
+        for jour, nom in sorted(jours_feries.items())
+    ]
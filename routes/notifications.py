@@ -3,20 +3,96 @@
 Routes API pour la gestion des notifications
 """
 
+import asyncio
 import uuid
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import get_database
-from models.notification import NotificationRead, NotificationUpdate
+from models.database import get_database, async_session_maker
+from models.notification import Notification, NotificationRead, NotificationUpdate, TypeNotificationEnum
 from models.user import User
 from utils.dependencies import get_current_user
 from services.notification_service import NotificationService
+from services.notification_broker import notification_broker
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+# Intervalle (secondes) des commentaires envoyés pour garder la connexion SSE ouverte
+INTERVALLE_HEARTBEAT = 15
+# Délai (millisecondes) de reconnexion suggéré au client
+DELAI_RECONNEXION = 5000
+
+def formater_evenement_sse(notification: Notification) -> str:
+    """Formate une notification en événement Server-Sent Events (l'id sert au Last-Event-ID)"""
+    donnees = NotificationRead.from_orm(notification).json()
+    return f"id: {notification.id}\nevent: notification\ndata: {donnees}\n\n"
+
+async def rattraper_notifications(user_id: uuid.UUID, derniere_id: uuid.UUID) -> List[Notification]:
+    """Relit depuis la base toutes les notifications postérieures à la dernière envoyée"""
+    notifications = []
+    # Session courte : la connexion SSE ne garde pas de session ouverte
+    async with async_session_maker() as db:
+        service = NotificationService(db)
+        while True:
+            lot = await service.get_notifications_depuis(user_id, derniere_id)
+            notifications.extend(lot)
+            if len(lot) < 100:
+                return notifications
+            derniere_id = lot[-1].id
+
+async def flux_notifications(
+    request: Request,
+    user_id: uuid.UUID,
+    derniere_id: Optional[uuid.UUID]
+) -> AsyncIterator[str]:
+    """Envoie le rattrapage éventuel, puis les notifications publiées au fil de l'eau"""
+    # S'abonner avant le rattrapage pour ne manquer aucune notification
+    abonnement = notification_broker.abonner(user_id)
+    try:
+        yield f"retry: {DELAI_RECONNEXION}\n\n"
+        
+        # Identifiants déjà envoyés par le dernier rattrapage (ils peuvent aussi être dans la file)
+        deja_envoyees = set()
+        if derniere_id:
+            for notification in await rattraper_notifications(abonnement.user_id, derniere_id):
+                deja_envoyees.add(notification.id)
+                derniere_id = notification.id
+                yield formater_evenement_sse(notification)
+        
+        while not await request.is_disconnected():
+            if abonnement.debordement:
+                # Client trop lent : n'envoyer que la première notification en file, puis relire
+                # les suivantes depuis la base
+                premiere = abonnement.file.get_nowait()
+                while not abonnement.file.empty():
+                    abonnement.file.get_nowait()
+                abonnement.debordement = False
+                if premiere.id not in deja_envoyees:
+                    yield formater_evenement_sse(premiere)
+                derniere_id = premiere.id
+                deja_envoyees = set()
+                for notification in await rattraper_notifications(abonnement.user_id, derniere_id):
+                    deja_envoyees.add(notification.id)
+                    derniere_id = notification.id
+                    yield formater_evenement_sse(notification)
+            
+            try:
+                notification = await asyncio.wait_for(abonnement.file.get(), timeout=INTERVALLE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            
+            if notification.id in deja_envoyees:
+                continue
+            derniere_id = notification.id
+            yield formater_evenement_sse(notification)
+    finally:
+        notification_broker.desabonner(abonnement)
+
 @router.get("/", response_model=List[NotificationRead])
 async def get_my_notifications(
     non_lues_seulement: bool = Query(False, description="Ne récupérer que les notifications non lues"),
@@ -34,6 +110,34 @@ async def get_my_notifications(
     
     return [NotificationRead.from_orm(notif) for notif in notifications]
 
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Flux Server-Sent Events des nouvelles notifications de l'utilisateur connecté
+    
+    En cas de reconnexion, l'en-tête Last-Event-ID permet de recevoir les notifications
+    créées depuis la dernière reçue.
+    """
+    derniere_id = None
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            derniere_id = uuid.UUID(last_event_id)
+        except ValueError:
+            pass
+    
+    return StreamingResponse(
+        flux_notifications(request, current_user.id, derniere_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.get("/count")
 async def get_notifications_count(
     db: AsyncSession = Depends(get_database),
@@ -41,13 +145,9 @@ async def get_notifications_count(
 ):
     """Récupère le nombre de notifications non lues"""
     service = NotificationService(db)
-    notifications_non_lues = await service.get_notifications_utilisateur(
-        user_id=current_user.id,
-        non_lues_seulement=True
-    )
     
     return {
-        "total_non_lues": len(notifications_non_lues)
+        "total_non_lues": await service.compter_non_lues(current_user.id)
     }
 
 @router.put("/{notification_id}/marquer-lue")
@@ -70,19 +170,20 @@ async def marquer_notification_lue(
 
 @router.put("/marquer-toutes-lues")
 async def marquer_toutes_notifications_lues(
+    avant: Optional[datetime] = Query(None, description="Ne marquer que les notifications créées avant cette date"),
+    type_notification: Optional[TypeNotificationEnum] = Query(None, description="Ne marquer que les notifications de ce type"),
     db: AsyncSession = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ):
-    """Marque toutes les notifications de l'utilisateur comme lues"""
+    """Marque toutes les notifications non lues de l'utilisateur comme lues (filtrables par date et par type)"""
     service = NotificationService(db)
-    notifications_non_lues = await service.get_notifications_utilisateur(
+    nombre = await service.marquer_toutes_comme_lues(
         user_id=current_user.id,
-        non_lues_seulement=True
+        avant=avant,
+        type_notification=type_notification
     )
     
-    for notification in notifications_non_lues:
-        await service.marquer_comme_lue(notification.id, current_user.id)
-    
     return {
-        "message": f"{len(notifications_non_lues)} notifications marquées comme lues"
+        "message": f"{nombre} notifications marquées comme lues",
+        "nombre": nombre
     } 
\ No newline at end of file
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Routes API de suivi et de déclenchement des tâches planifiées
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import get_database
+from models.tache_planifiee import ExecutionTache, ExecutionTacheRead, TachePlanifieeRead
+from models.user import User
+from utils.dependencies import require_admin
+from services.planificateur import planificateur
+
+router = APIRouter(prefix="/taches", tags=["taches"])
+
+# Nombre d'exécutions récentes retournées par tâche dans la liste des tâches
+NOMBRE_EXECUTIONS_RECENTES = 5
+
+def get_tache_ou_404(nom: str):
+    tache = planificateur.taches.get(nom)
+    if tache is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tâche planifiée non trouvée"
+        )
+    return tache
+
+async def get_executions(db: AsyncSession, nom: str, limit: int) -> List[ExecutionTache]:
+    result = await db.execute(
+        select(ExecutionTache)
+        .where(ExecutionTache.nom == nom)
+        .order_by(ExecutionTache.debut.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+@router.get("/", response_model=List[TachePlanifieeRead])
+async def get_taches(
+    db: AsyncSession = Depends(get_database),
+    current_user: User = Depends(require_admin())
+):
+    """
+    Liste les tâches planifiées avec leur prochaine échéance et leurs dernières exécutions (Admin uniquement)
+    
+    Les exécutions de tous les workers sont listées ; la prochaine échéance est celle
+    calculée par le worker qui reçoit la requête.
+    """
+    taches = []
+    for tache in planificateur.taches.values():
+        executions = await get_executions(db, tache.nom, NOMBRE_EXECUTIONS_RECENTES)
+        taches.append(TachePlanifieeRead(
+            nom=tache.nom,
+            description=tache.description,
+            cron=str(tache.cron),
+            prochaine_echeance=planificateur.prochaines_echeances.get(tache.nom),
+            executions_recentes=[ExecutionTacheRead.from_orm(execution) for execution in executions]
+        ))
+    return taches
+
+@router.get("/{nom}/executions", response_model=List[ExecutionTacheRead])
+async def get_executions_tache(
+    nom: str,
+    echecs_seulement: bool = Query(False, description="Ne récupérer que les exécutions en échec"),
+    limit: int = Query(50, le=200, description="Nombre maximum d'exécutions à récupérer"),
+    db: AsyncSession = Depends(get_database),
+    current_user: User = Depends(require_admin())
+):
+    """Historique des exécutions d'une tâche, des plus récentes aux plus anciennes (Admin uniquement)"""
+    get_tache_ou_404(nom)
+    
+    query = select(ExecutionTache).where(ExecutionTache.nom == nom)
+    if echecs_seulement:
+        query = query.where(ExecutionTache.succes == False)
+    result = await db.execute(query.order_by(ExecutionTache.debut.desc()).limit(limit))
+    
+    return [ExecutionTacheRead.from_orm(execution) for execution in result.scalars().all()]
+
+@router.post("/{nom}/executer", response_model=ExecutionTacheRead)
+async def executer_tache(
+    nom: str,
+    current_user: User = Depends(require_admin())
+):
+    """Exécute immédiatement une tâche planifiée, hors planning (Admin uniquement)"""
+    get_tache_ou_404(nom)
+    
+    execution = await planificateur.executer(nom)
+    if execution is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cette tâche est déjà en cours d'exécution"
+        )
+    
+    print(f"Tâche {nom} exécutée manuellement par {current_user.email} ({execution.duree_ms} ms)")
+    return ExecutionTacheRead.from_orm(execution)
@@ -1,5 +1,5 @@
 import uuid
-from typing import List
+from typing import List, Sequence
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,26 +8,18 @@ from sqlalchemy.orm import selectinload
 
 from models.database import get_database
 from models.user import User, UserRead, UserCreate, UserUpdate, RoleEnum, validate_anciennete_minimum
-from models.demande_conge import DemandeConge
 from utils.auth import fastapi_users, get_user_manager
 from utils.dependencies import get_current_user, require_drh, require_manager
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from services.solde_ledger_service import SoldeLedgerService
+from services.absence_jour_service import AbsenceJourService
+from services.conflit_service import moteur_conflits
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-async def enrich_user_with_solde_restant(db: AsyncSession, user: User) -> UserRead:
-    """Enrichit un utilisateur avec le calcul du solde de congés restant"""
-    
-    # Récupérer les demandes de l'utilisateur
-    demandes_result = await db.execute(
-        select(DemandeConge).where(DemandeConge.demandeur_id == user.id)
-    )
-    demandes = demandes_result.scalars().all()
-    
-    # Calculer le solde restant
-    solde_restant = user.calculate_solde_conges_restant(demandes)
-    
-    # Créer le UserRead avec le solde restant
-    user_data = UserRead(
+def build_user_read(user: User, solde_restant: int) -> UserRead:
+    """Construit le UserRead d'un utilisateur avec son solde restant déjà calculé"""
+    return UserRead(
         id=user.id,
         email=user.email,
         is_active=user.is_active,
@@ -49,16 +41,24 @@ async def enrich_user_with_solde_restant(db: AsyncSession, user: User) -> UserRe
         has_medaille_honneur=user.has_medaille_honneur,
         genre=user.genre
     )
-    
-    return user_data
 
-async def enrich_users_with_solde_restant(db: AsyncSession, users: List[User]) -> List[UserRead]:
+async def enrich_user_with_solde_restant(db: AsyncSession, user: User) -> UserRead:
+    """Enrichit un utilisateur avec le calcul du solde de congés restant"""
+    enriched_users = await enrich_users_with_solde_restant(db, [user])
+    return enriched_users[0]
+
+async def enrich_users_with_solde_restant(db: AsyncSession, users: Sequence[User]) -> List[UserRead]:
     """Enrichit une liste d'utilisateurs avec le calcul du solde de congés restant"""
-    enriched_users = []
-    for user in users:
-        enriched_user = await enrich_user_with_solde_restant(db, user)
-        enriched_users.append(enriched_user)
-    return enriched_users
+    # Jours pris de tous les utilisateurs en une seule requête sur le registre des soldes
+    jours_pris_par_user = await SoldeLedgerService(db).get_jours_pris(users)
+    
+    return [
+        build_user_read(
+            user,
+            user.calculate_solde_conges_restant_from_jours_pris(jours_pris_par_user.get(user.id, 0))
+        )
+        for user in users
+    ]
 
 # Routes CRUD des utilisateurs (FastAPIUsers par défaut)
 # IMPORTANT: Inclure nos routes personnalisées AVANT FastAPIUsers pour éviter les conflits
@@ -238,6 +238,8 @@ async def update_user_role(
         )
     
     user.role = new_role
+    if user.departement_id:
+        await DashboardSnapshotService(db).reconstruire([user.departement_id])
     await db.commit()
     await db.refresh(user)
     return await enrich_user_with_solde_restant(db, user)
@@ -271,7 +273,12 @@ async def assign_departement(
             detail="Département non trouvé"
         )
     
+    departements_concernes = [dept_id for dept_id in (user.departement_id, departement_id) if dept_id]
+    await AbsenceJourService(db).changer_departement(user.id, departement_id)
+    moteur_conflits.invalider(departements_concernes)
     user.departement_id = departement_id
+    # Les compteurs de l'ancien et du nouveau département sont reconstruits dans la même transaction
+    await DashboardSnapshotService(db).reconstruire(departements_concernes)
     await db.commit()
     await db.refresh(user)
     return await enrich_user_with_solde_restant(db, user)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Service de maintenance de la table d'occupation journalière (absence_jour)
+"""
+
+import uuid
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, insert, func
+
+from models.absence_jour import AbsenceJour
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.user import User
+
+# Seuls les congés approuvés occupent des jours (même règle que le calendrier et les dashboards)
+STATUT_ABSENCE = StatutDemandeEnum.APPROUVEE
+
+def select_demandes_absentes(debut: date, fin: date):
+    """Sous-requête des demandes approuvées ayant au moins un jour d'absence dans [debut, fin]"""
+    return select(AbsenceJour.demande_id).where(AbsenceJour.jour.between(debut, fin)).distinct()
+
+class AbsenceJourService:
+    """Service pour lire et maintenir les jours d'absence par utilisateur"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enregistrer_transition(
+        self,
+        demandeur: Optional[User],
+        demande: DemandeConge,
+        ancien_statut: Optional[StatutDemandeEnum],
+        nouveau_statut: Optional[StatutDemandeEnum]
+    ) -> None:
+        """
+        Déplie ou retire les jours d'une demande selon son changement de statut.
+
+        Ne fait pas de commit : l'appelant l'inclut dans la transaction du changement de statut.
+        Un statut à None représente la création (ancien) ou la suppression (nouveau) de la demande.
+        """
+        etait_absente = ancien_statut == STATUT_ABSENCE
+        est_absente = nouveau_statut == STATUT_ABSENCE
+        if etait_absente == est_absente:
+            return
+
+        if demande.id is None:
+            # Demande en cours de création : son identifiant est attribué au flush
+            await self.db.flush()
+
+        if etait_absente:
+            await self.db.execute(delete(AbsenceJour).where(AbsenceJour.demande_id == demande.id))
+        else:
+            await self._deplier([demande], {demande.demandeur_id: demandeur.departement_id if demandeur else None})
+
+    async def changer_departement(self, user_id: uuid.UUID, departement_id: Optional[uuid.UUID]) -> None:
+        """Réaffecte les jours d'absence d'un utilisateur à son nouveau département. Ne fait pas de commit."""
+        await self.db.execute(
+            update(AbsenceJour)
+            .where(AbsenceJour.user_id == user_id)
+            .values(departement_id=departement_id)
+        )
+
+    async def get_demande_ids(self, debut: date, fin: date) -> List[uuid.UUID]:
+        """Identifiants des demandes approuvées ayant au moins un jour d'absence dans [debut, fin]"""
+        result = await self.db.execute(select_demandes_absentes(debut, fin))
+        return list(result.scalars().all())
+
+    async def get_absents(self, jour: date, user_ids: Optional[Iterable[uuid.UUID]] = None) -> List[uuid.UUID]:
+        """Identifiants des utilisateurs absents un jour donné (parmi user_ids si fourni)"""
+        query = select(AbsenceJour.user_id).where(AbsenceJour.jour == jour)
+        if user_ids is not None:
+            query = query.where(AbsenceJour.user_id.in_(list(user_ids)))
+        result = await self.db.execute(query.distinct())
+        return list(result.scalars().all())
+
+    async def compter_absents(self, debut: date, fin: date, user_ids: Iterable[uuid.UUID]) -> int:
+        """Nombre d'utilisateurs distincts (parmi user_ids) absents au moins un jour de [debut, fin]"""
+        result = await self.db.execute(
+            select(func.count(func.distinct(AbsenceJour.user_id)))
+            .where(
+                AbsenceJour.jour.between(debut, fin),
+                AbsenceJour.user_id.in_(list(user_ids))
+            )
+        )
+        return result.scalar_one()
+
+    async def compter_par_jour(self, departement_id: uuid.UUID, debut: date, fin: date) -> Dict[date, int]:
+        """Effectif absent du département pour chaque jour de [debut, fin] (0 les jours sans absence)"""
+        result = await self.db.execute(
+            select(AbsenceJour.jour, func.count(func.distinct(AbsenceJour.user_id)))
+            .where(
+                AbsenceJour.departement_id == departement_id,
+                AbsenceJour.jour.between(debut, fin)
+            )
+            .group_by(AbsenceJour.jour)
+        )
+        effectifs = {debut + timedelta(days=i): 0 for i in range((fin - debut).days + 1)}
+        for jour, nombre in result.all():
+            effectifs[jour] = nombre
+        return effectifs
+
+    async def reconstruire(self) -> int:
+        """
+        Vide la table et la remplit à partir de toutes les demandes approuvées.
+
+        Retourne le nombre de jours d'absence insérés. Ne fait pas de commit.
+        """
+        await self.db.execute(delete(AbsenceJour))
+
+        demandes_result = await self.db.execute(
+            select(DemandeConge).where(DemandeConge.statut == STATUT_ABSENCE)
+        )
+        demandes = list(demandes_result.scalars().all())
+        if not demandes:
+            return 0
+
+        # Les identifiants sont passés via IN car users.id et les clés étrangères n'ont pas le même format en base
+        users_result = await self.db.execute(
+            select(User.id, User.departement_id)
+            .where(User.id.in_({demande.demandeur_id for demande in demandes}))
+        )
+        departement_par_user = dict(users_result.all())
+
+        return await self._deplier(demandes, departement_par_user)
+
+    async def initialiser_si_vide(self) -> Optional[int]:
+        """
+        Remplit la table si elle est vide alors que des demandes approuvées existent (base créée
+        ou migrée avant la table). Retourne le nombre de jours insérés, None si rien n'était à faire.
+
+        Ne fait pas de commit.
+        """
+        remplie = await self.db.execute(select(AbsenceJour.demande_id).limit(1))
+        if remplie.first() is not None:
+            return None
+        approuvees = await self.db.execute(
+            select(DemandeConge.id).where(DemandeConge.statut == STATUT_ABSENCE).limit(1)
+        )
+        if approuvees.first() is None:
+            return None
+        return await self.reconstruire()
+
+    async def _deplier(self, demandes: List[DemandeConge], departement_par_user: Dict[uuid.UUID, Optional[uuid.UUID]]) -> int:
+        """Insère une ligne par jour calendaire (bornes incluses) de chaque demande, en un seul executemany"""
+        lignes = [
+            {
+                "demande_id": demande.id,
+                "jour": demande.date_debut + timedelta(days=decalage),
+                "user_id": demande.demandeur_id,
+                "departement_id": departement_par_user.get(demande.demandeur_id)
+            }
+            for demande in demandes
+            for decalage in range((demande.date_fin - demande.date_debut).days + 1)
+        ]
+        if lignes:
+            await self.db.execute(insert(AbsenceJour), lignes)
+        return len(lignes)
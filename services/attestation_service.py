@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Génération des attestations de congé au format PDF dans un pool de processus
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from services.stockage_attestations import StockageAttestations, stockage_attestations
+
+# Nombre de processus de rendu (configurable par variable d'environnement)
+TAILLE_POOL = int(os.getenv("ATTESTATIONS_TAILLE_POOL", "2"))
+# Nombre maximal d'attestations en attente d'un processus libre (au-delà, la requête attend une place)
+TAILLE_MAX_FILE = int(os.getenv("ATTESTATIONS_TAILLE_FILE", "20"))
+# Délai maximal (secondes) d'attente d'une place dans la file
+DELAI_ATTENTE_FILE = float(os.getenv("ATTESTATIONS_DELAI_FILE", "5"))
+# Délai maximal (secondes) de génération d'une attestation, attente d'un processus libre comprise
+DELAI_GENERATION = float(os.getenv("ATTESTATIONS_DELAI_GENERATION", "30"))
+# Délai maximal (secondes) pour terminer les générations en cours à l'arrêt de l'application
+DELAI_ARRET = 10.0
+
+# Version du modèle d'attestation : à incrémenter à chaque modification du rendu
+# pour que les attestations déjà générées ne soient plus servies
+VERSION_MODELE = "1"
+# Délai (secondes) avant qu'un fichier non référencé par une demande puisse être supprimé
+# (laisse le temps à la requête qui vient de le générer d'enregistrer son nom)
+DELAI_GRACE_NETTOYAGE = 3600
+
+class FileAttestationsPleine(Exception):
+    """Trop d'attestations en attente de génération"""
+
+class DelaiGenerationDepasse(Exception):
+    """L'attestation n'a pas été générée dans le délai imparti"""
+
+class DonneesAttestation(NamedTuple):
+    """Contenu d'une attestation, transmis au processus de rendu"""
+    demande_id: uuid.UUID
+    user_id: uuid.UUID
+    nom: str
+    prenom: str
+    role: Optional[str]
+    date_debut: date
+    date_fin: date
+    date_generation: date
+
+def empreinte_attestation(donnees: DonneesAttestation) -> str:
+    """
+    Empreinte du contenu d'une attestation (demande, identité de l'employé, version du modèle)
+
+    La date de génération n'en fait pas partie : une attestation reste valable tant que
+    la demande et l'employé n'ont pas changé, et garde la date de sa première génération.
+    """
+    contenu = json.dumps([
+        VERSION_MODELE,
+        str(donnees.demande_id),
+        str(donnees.user_id),
+        donnees.nom,
+        donnees.prenom,
+        donnees.role,
+        donnees.date_debut.isoformat(),
+        donnees.date_fin.isoformat()
+    ], ensure_ascii=False)
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+def nom_fichier_attestation(donnees: DonneesAttestation) -> str:
+    """Nom du fichier PDF : lisible, et unique grâce à l'empreinte du contenu"""
+    nom_clean = ''.join(c for c in donnees.nom if c.isalnum())
+    prenom_clean = ''.join(c for c in donnees.prenom if c.isalnum())
+    empreinte = empreinte_attestation(donnees)[:16]
+    return f"attestation_{nom_clean}_{prenom_clean}_{donnees.date_debut.strftime('%Y%m%d')}_{empreinte}.pdf"
+
+class ModeleAttestation(NamedTuple):
+    """Partie fixe de l'attestation précompilée et positions des champs variables"""
+    largeur: float
+    hauteur: float
+    polices: Tuple[str, ...]
+    operateurs_fixes: str
+    lignes: Tuple[Tuple[float, float, float, float], ...]
+    marge: float
+    y_employe: float
+    y_fonction: float
+    y_periode: float
+    x_date: float
+    y_date: float
+
+@lru_cache(maxsize=1)
+def compiler_modele() -> ModeleAttestation:
+    """
+    Met en page une fois par processus la partie fixe de l'attestation
+
+    Les textes fixes sont convertis en opérateurs PDF (positions et largeurs de texte
+    calculées une fois pour toutes) ; chaque document n'a plus qu'à les recopier.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    width, height = A4
+    left_margin = 50
+    y_pos = height - 100
+    # Canvas de compilation : seul l'objet texte produit est conservé
+    c = canvas.Canvas(io.BytesIO(), pagesize=A4)
+    texte = c.beginText()
+    polices = []
+    lignes = []
+
+    def ecrire(x: float, texte_fixe: str, police: str, taille: int) -> None:
+        if police not in polices:
+            polices.append(police)
+        texte.setFont(police, taille)
+        texte.setTextOrigin(x, y_pos)
+        texte.textOut(texte_fixe)
+
+    def centrer(texte_fixe: str, police: str, taille: int) -> None:
+        ecrire((width - stringWidth(texte_fixe, police, taille)) / 2, texte_fixe, police, taille)
+
+    # En-tête centré
+    centrer("RÉPUBLIQUE DE CÔTE D'IVOIRE", "Helvetica-Bold", 14)
+    y_pos -= 20
+    centrer("Union - Discipline - Travail", "Helvetica", 12)
+    y_pos -= 40
+    centrer("ENTREPRISE", "Helvetica-Bold", 12)
+    y_pos -= 40
+
+    # Ligne de séparation
+    lignes.append((left_margin, y_pos, width - left_margin, y_pos))
+    y_pos -= 40
+
+    # Titre principal
+    centrer("ATTESTATION DE CONGÉ", "Helvetica-Bold", 16)
+    y_pos -= 60
+
+    # Paragraphe 1 (les deux lignes suivantes sont variables)
+    ecrire(left_margin, "Nous soussignés entreprise, attestons que", "Helvetica", 12)
+    y_pos -= 15
+    y_employe = y_pos
+    y_pos -= 15
+    y_fonction = y_pos
+    y_pos -= 30
+
+    # Paragraphe 2 (variable)
+    y_periode = y_pos
+    y_pos -= 30
+
+    # Paragraphe 3
+    ecrire(left_margin, "En foi de quoi, cette attestation lui est délivrée pour servir", "Helvetica", 12)
+    y_pos -= 15
+    ecrire(left_margin, "et valoir ce que de droit.", "Helvetica", 12)
+    y_pos -= 60
+
+    # Date (alignée à droite) : les chiffres d'Helvetica ont tous la même largeur,
+    # la largeur du texte ne dépend donc pas de la date
+    x_date = width - left_margin - stringWidth("Fait à Abidjan, le 00/00/0000", "Helvetica", 12)
+    y_date = y_pos
+    y_pos -= 80
+
+    # Signature centrée
+    centrer("Nom et signature du DRH", "Helvetica", 12)
+    y_pos -= 30
+
+    # Ligne de signature
+    line_length = 150
+    start_x = (width - line_length) / 2
+    lignes.append((start_x, y_pos, start_x + line_length, y_pos))
+
+    return ModeleAttestation(
+        largeur=width,
+        hauteur=height,
+        polices=tuple(polices),
+        operateurs_fixes=texte.getCode(),
+        lignes=tuple(lignes),
+        marge=left_margin,
+        y_employe=y_employe,
+        y_fonction=y_fonction,
+        y_periode=y_periode,
+        x_date=x_date,
+        y_date=y_date
+    )
+
+def initialiser_processus_rendu() -> None:
+    """Prépare un processus du pool : compile le modèle et désactive l'encodage ASCII85 des flux"""
+    from reportlab import rl_config
+
+    # Les flux compressés restent binaires : plus rapide (encodeur en Python pur) et plus compact
+    rl_config.useA85 = 0
+    compiler_modele()
+
+def rendre_attestation_pdf(donnees: DonneesAttestation, pdf_path) -> None:
+    """
+    Dessine l'attestation et l'écrit dans pdf_path, chemin ou fichier (exécuté dans un processus du pool)
+
+    La partie fixe est recopiée depuis le modèle précompilé ; seuls les champs variables
+    sont mis en page à chaque document.
+    """
+    from reportlab.pdfgen import canvas
+
+    modele = compiler_modele()
+    c = canvas.Canvas(pdf_path, pagesize=(modele.largeur, modele.hauteur))
+
+    # Les noms internes des polices (/F1, /F2...) sont attribués dans l'ordre de première
+    # utilisation : les déclarer dans le même ordre que lors de la compilation du modèle
+    for police in modele.polices:
+        c.setFont(police, 12)
+    c.addLiteral(modele.operateurs_fixes)
+    for ligne in modele.lignes:
+        c.line(*ligne)
+
+    # Champs variables, dans un seul objet texte
+    nom_complet = f"{donnees.nom} {donnees.prenom}"
+    role_text = donnees.role or "employe"
+    date_debut = donnees.date_debut.strftime('%d/%m/%Y')
+    date_fin = donnees.date_fin.strftime('%d/%m/%Y')
+    date_today = donnees.date_generation.strftime('%d/%m/%Y')
+
+    texte = c.beginText()
+    texte.setFont("Helvetica", 12)
+    for x, y, contenu in (
+        (modele.marge, modele.y_employe, f"Monsieur/Madame {nom_complet}, fait partie de notre personnel"),
+        (modele.marge, modele.y_fonction, f"en qualité de {role_text} depuis sa date d'embauche."),
+        (modele.marge, modele.y_periode, f"Il bénéficie d'un congé allant du {date_debut} au {date_fin} inclus."),
+        (modele.x_date, modele.y_date, f"Fait à Abidjan, le {date_today}"),
+    ):
+        texte.setTextOrigin(x, y)
+        texte.textOut(contenu)
+    c.drawText(texte)
+
+    # Sauvegarder
+    c.save()
+
+def rendre_attestation_octets(donnees: DonneesAttestation) -> bytes:
+    """Rend l'attestation en mémoire (exécuté dans un processus du pool, seul le PDF final est renvoyé)"""
+    tampon = io.BytesIO()
+    rendre_attestation_pdf(donnees, tampon)
+    return tampon.getvalue()
+
+class _TamponZip:
+    """
+    Flux d'écriture de l'archive : le flux de réponse en retire les octets produits
+
+    Seuls les octets pas encore retirés restent en mémoire, et le flux n'est positionnable
+    qu'à l'intérieur de ceux-ci. zipfile y réécrit l'en-tête local de chaque membre (CRC
+    et tailles) avant qu'il ne soit envoyé : l'archive n'a pas besoin de descripteurs
+    de données (bit 3 des drapeaux), mal pris en charge par certains lecteurs.
+    """
+
+    def __init__(self):
+        self._tampon = io.BytesIO()
+        self._envoyes = 0
+
+    def write(self, donnees: bytes) -> int:
+        return self._tampon.write(donnees)
+
+    def tell(self) -> int:
+        return self._envoyes + self._tampon.tell()
+
+    def seek(self, position: int, whence: int = io.SEEK_SET) -> int:
+        if whence != io.SEEK_SET or position < self._envoyes:
+            raise OSError("Position déjà envoyée")
+        self._tampon.seek(position - self._envoyes)
+        return position
+
+    def flush(self) -> None:
+        pass
+
+    def vider(self) -> bytes:
+        contenu = self._tampon.getvalue()
+        self._envoyes += len(contenu)
+        self._tampon = io.BytesIO()
+        return contenu
+
+def _message_erreur(erreur: Exception) -> str:
+    """Motif d'échec d'une attestation, listé dans le fichier erreurs.txt d'une archive"""
+    if isinstance(erreur, FileAttestationsPleine):
+        return "file de génération pleine"
+    if isinstance(erreur, DelaiGenerationDepasse):
+        return "délai de génération dépassé"
+    return str(erreur)
+
+class GenerateurAttestations:
+    """
+    Pool de processus de rendu des attestations, démarré et arrêté par main.lifespan
+
+    Le rendu reportlab est du calcul pur : exécuté dans l'event loop, il bloquerait
+    toutes les requêtes en cours. Le nombre de générations en cours ou en attente est
+    borné (TAILLE_POOL + TAILLE_MAX_FILE) ; une place n'est libérée que lorsque le
+    processus a réellement fini, même si la requête a abandonné entre-temps. Tant que
+    le pool n'est pas démarré (scripts), le rendu se fait dans un thread.
+
+    Les PDF sont rendus en mémoire puis confiés au stockage des attestations, sous un
+    nom tiré de l'empreinte de leur contenu : une attestation déjà présente dans le
+    stockage est servie sans nouveau rendu.
+    """
+
+    def __init__(
+        self,
+        taille_pool: int = TAILLE_POOL,
+        taille_max_file: int = TAILLE_MAX_FILE,
+        stockage: StockageAttestations = stockage_attestations
+    ):
+        self.taille_pool = taille_pool
+        self.taille_max_file = taille_max_file
+        self.stockage = stockage
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._places: Optional[asyncio.Semaphore] = None
+        # Générations en cours par nom de fichier (requêtes simultanées pour la même attestation)
+        self._en_cours: Dict[str, asyncio.Task] = {}
+
+    @property
+    def demarre(self) -> bool:
+        return self._pool is not None
+
+    async def demarrer(self) -> None:
+        """Crée le pool de processus"""
+        if self.demarre:
+            return
+        self._places = asyncio.Semaphore(self.taille_pool + self.taille_max_file)
+        self._pool = self._creer_pool()
+
+    async def arreter(self) -> None:
+        """Abandonne les générations en attente et laisse finir celles en cours (dans la limite de DELAI_ARRET)"""
+        if not self.demarre:
+            return
+        pool, self._pool = self._pool, None
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True),
+                timeout=DELAI_ARRET
+            )
+        except asyncio.TimeoutError:
+            print("Arrêt du pool d'attestations : génération(s) interrompue(s)")
+
+    async def obtenir(self, donnees: DonneesAttestation) -> str:
+        """
+        Retourne le nom du fichier de l'attestation, en ne la générant que si elle n'existe pas encore
+
+        Lève les mêmes exceptions que generer.
+        """
+        pdf_filename = nom_fichier_attestation(donnees)
+        if await self.stockage.existe(pdf_filename):
+            return pdf_filename
+
+        tache = self._en_cours.get(pdf_filename)
+        if tache is None:
+            tache = asyncio.create_task(self.generer(donnees, pdf_filename))
+            self._en_cours[pdf_filename] = tache
+            tache.add_done_callback(lambda _: self._en_cours.pop(pdf_filename, None))
+        # shield : une requête abandonnée n'interrompt pas la génération attendue par les autres
+        return await asyncio.shield(tache)
+
+    async def flux_zip(self, lot: List[DonneesAttestation]) -> AsyncIterator[bytes]:
+        """
+        Génère les attestations du lot en parallèle et produit une archive ZIP au fil de l'eau
+
+        Chaque PDF est ajouté à l'archive (et envoyé) dès qu'il est prêt : seul le PDF en
+        cours d'ajout est gardé en mémoire. Le lot n'occupe qu'une partie du pool pour laisser
+        passer les générations individuelles. Les attestations en échec sont listées dans
+        le fichier erreurs.txt de l'archive.
+        """
+        concurrence = asyncio.Semaphore(self.taille_pool * 2)
+
+        async def obtenir_dans_la_limite(donnees: DonneesAttestation) -> Tuple[DonneesAttestation, Optional[str], Optional[str]]:
+            async with concurrence:
+                try:
+                    return donnees, await self.obtenir(donnees), None
+                except Exception as e:
+                    return donnees, None, _message_erreur(e)
+
+        tampon = _TamponZip()
+        # Les PDF sont déjà compressés : les stocker tels quels évite de recompresser dans l'event loop
+        archive = zipfile.ZipFile(tampon, "w", compression=zipfile.ZIP_STORED)
+        taches = [asyncio.create_task(obtenir_dans_la_limite(donnees)) for donnees in lot]
+        erreurs = []
+        try:
+            for prochaine in asyncio.as_completed(taches):
+                donnees, pdf_filename, erreur = await prochaine
+                if erreur is not None:
+                    erreurs.append(f"{donnees.nom} {donnees.prenom} (demande {donnees.demande_id}) : {erreur}")
+                    continue
+                try:
+                    contenu = await self._lire_ou_regenerer(donnees, pdf_filename)
+                except Exception as e:
+                    erreurs.append(f"{donnees.nom} {donnees.prenom} (demande {donnees.demande_id}) : {_message_erreur(e)}")
+                    continue
+                archive.writestr(pdf_filename, contenu)
+                yield tampon.vider()
+
+            if erreurs:
+                archive.writestr("erreurs.txt", "\n".join(erreurs) + "\n")
+            archive.close()
+            yield tampon.vider()
+        finally:
+            # Client déconnecté : abandonner les attestations pas encore commencées
+            for tache in taches:
+                tache.cancel()
+
+    async def _lire_ou_regenerer(self, donnees: DonneesAttestation, pdf_filename: str) -> bytes:
+        """
+        Contenu d'une attestation obtenue, rendue à nouveau si le fichier a disparu entre-temps
+        (supprimé par le nettoyage des attestations obsolètes après obtenir)
+        """
+        try:
+            return await self.stockage.lire_tout(pdf_filename)
+        except FileNotFoundError:
+            contenu = await self.rendre(donnees)
+            await self.stockage.enregistrer(pdf_filename, contenu)
+            return contenu
+
+    async def generer(self, donnees: DonneesAttestation, pdf_filename: str) -> str:
+        """
+        Génère le PDF, l'enregistre dans le stockage et retourne son nom de fichier
+
+        Lève les mêmes exceptions que rendre.
+        """
+        contenu = await self.rendre(donnees)
+        await self.stockage.enregistrer(pdf_filename, contenu)
+        return pdf_filename
+
+    async def rendre(self, donnees: DonneesAttestation) -> bytes:
+        """
+        Rend le PDF dans un processus du pool et retourne son contenu
+
+        Lève FileAttestationsPleine si aucune place ne se libère dans DELAI_ATTENTE_FILE,
+        et DelaiGenerationDepasse si le PDF n'est pas prêt dans DELAI_GENERATION.
+        """
+        if not self.demarre:
+            return await asyncio.to_thread(rendre_attestation_octets, donnees)
+
+        try:
+            await asyncio.wait_for(self._places.acquire(), timeout=DELAI_ATTENTE_FILE)
+        except asyncio.TimeoutError:
+            raise FileAttestationsPleine()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._soumettre(donnees)
+        except BaseException:
+            self._places.release()
+            raise
+
+        def liberer_place(_: Future) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._places.release)
+        future.add_done_callback(liberer_place)
+
+        try:
+            # shield : l'expiration du délai n'annule pas une génération déjà commencée
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=DELAI_GENERATION)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise DelaiGenerationDepasse()
+
+    def _soumettre(self, donnees: DonneesAttestation) -> Future:
+        try:
+            return self._pool.submit(rendre_attestation_octets, donnees)
+        except BrokenProcessPool:
+            # Un processus du pool a été tué (mémoire, signal) : repartir d'un pool neuf
+            self._pool = self._creer_pool()
+            return self._pool.submit(rendre_attestation_octets, donnees)
+
+    def _creer_pool(self) -> ProcessPoolExecutor:
+        # spawn : ne pas dupliquer par fork un processus qui exécute l'event loop et ses threads
+        # initializer : chaque processus compile le modèle dès son démarrage
+        return ProcessPoolExecutor(
+            max_workers=self.taille_pool,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initialiser_processus_rendu
+        )
+
+# Générateur partagé par toutes les requêtes du processus
+generateur_attestations = GenerateurAttestations()
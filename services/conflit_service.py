@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Moteur de détection des conflits de congés au sein d'une équipe (département)
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, SessionTransaction
+
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.user import User
+from utils.arbre_intervalles import ArbreIntervalles
+
+# Statuts des demandes qui occupent (ou peuvent encore occuper) une période
+STATUTS_CONFLIT = [
+    StatutDemandeEnum.EN_ATTENTE,
+    StatutDemandeEnum.APPROUVEE,
+    StatutDemandeEnum.DEMANDE_ANNULATION,
+    StatutDemandeEnum.ANNULATION_REFUSEE,
+]
+
+# Durée (secondes) après laquelle l'arbre d'un département est rechargé depuis la base,
+# pour prendre en compte les transitions traitées par les autres workers
+DUREE_VALIDITE_ARBRE = 300
+
+# Clé de Session.info sous laquelle sont gardées les transitions en attente de commit
+CLE_TRANSITIONS = "transitions_conflits"
+
+class CongeEquipe(NamedTuple):
+    """Période occupée par une demande d'un membre de l'équipe"""
+    demande_id: uuid.UUID
+    user_id: uuid.UUID
+    date_debut: date
+    date_fin: date
+    statut: StatutDemandeEnum
+
+class MoteurConflits:
+    """
+    Arbres d'intervalles des demandes actives, un par département, partagés par tout le processus
+
+    Chaque arbre est chargé à la première recherche sur son département, puis tenu à jour
+    par les transitions de statut traitées par ce processus, une fois leur transaction validée.
+    """
+
+    def __init__(self):
+        self._arbres: Dict[uuid.UUID, ArbreIntervalles] = {}
+        self._charges_le: Dict[uuid.UUID, float] = {}
+        self._verrous: Dict[uuid.UUID, asyncio.Lock] = {}
+
+    async def trouver_conflits(
+        self,
+        db: AsyncSession,
+        departement_id: uuid.UUID,
+        date_debut: date,
+        date_fin: date,
+        exclure_user_id: Optional[uuid.UUID] = None
+    ) -> List[CongeEquipe]:
+        """Demandes actives du département qui chevauchent [date_debut, date_fin], par date de début"""
+        arbre = await self._get_arbre(db, departement_id)
+        return [
+            conge for conge in arbre.chevauchements(date_debut, date_fin)
+            if conge.user_id != exclure_user_id
+        ]
+
+    async def enregistrer_transition(
+        self,
+        db: AsyncSession,
+        demandeur: Optional[User],
+        demande: DemandeConge,
+        nouveau_statut: Optional[StatutDemandeEnum]
+    ) -> None:
+        """
+        Répercute un changement de statut (ou de période) d'une demande sur l'arbre de son département.
+
+        Un statut à None représente la suppression de la demande. La modification n'est
+        appliquée qu'après le commit de la transaction de `db` (et oubliée en cas de rollback) :
+        les autres requêtes ne voient jamais de période non validée.
+        """
+        if not demandeur or not demandeur.departement_id:
+            return
+
+        conge = None
+        if nouveau_statut in STATUTS_CONFLIT:
+            if demande.id is None:
+                # Demande en cours de création : son identifiant est attribué au flush
+                await db.flush()
+            conge = CongeEquipe(demande.id, demande.demandeur_id, demande.date_debut, demande.date_fin, nouveau_statut)
+        elif demande.id is None:
+            return
+
+        db.sync_session.info.setdefault(CLE_TRANSITIONS, []).append((demandeur.departement_id, demande.id, conge))
+
+    def appliquer(self, transitions: List[Tuple[uuid.UUID, uuid.UUID, Optional[CongeEquipe]]]) -> None:
+        """
+        Applique des transitions validées (département, demande, congé ou None pour un retrait)
+
+        Sans effet sur les arbres pas encore chargés : ils le seront complètement à la prochaine recherche.
+        """
+        for departement_id, demande_id, conge in transitions:
+            arbre = self._arbres.get(departement_id)
+            if arbre is None:
+                continue
+            if conge is None:
+                arbre.retirer(demande_id)
+            else:
+                arbre.inserer(demande_id, conge.date_debut, conge.date_fin, conge)
+
+    def invalider(self, departement_ids: Optional[Iterable[uuid.UUID]] = None) -> None:
+        """Oublie les arbres concernés (tous par défaut) pour forcer leur rechargement"""
+        if departement_ids is None:
+            self._arbres.clear()
+            self._charges_le.clear()
+            return
+        for departement_id in departement_ids:
+            self._arbres.pop(departement_id, None)
+            self._charges_le.pop(departement_id, None)
+
+    async def _get_arbre(self, db: AsyncSession, departement_id: uuid.UUID) -> ArbreIntervalles:
+        """Retourne l'arbre du département, en le (re)chargeant s'il est absent ou trop ancien"""
+        if self._est_valide(departement_id):
+            return self._arbres[departement_id]
+
+        verrou = self._verrous.setdefault(departement_id, asyncio.Lock())
+        async with verrou:
+            # Une autre requête a pu charger l'arbre pendant l'attente du verrou
+            if not self._est_valide(departement_id):
+                self._arbres[departement_id] = await self._charger(db, departement_id)
+                self._charges_le[departement_id] = time.monotonic()
+        return self._arbres[departement_id]
+
+    def _est_valide(self, departement_id: uuid.UUID) -> bool:
+        charge_le = self._charges_le.get(departement_id)
+        return charge_le is not None and time.monotonic() - charge_le < DUREE_VALIDITE_ARBRE
+
+    async def _charger(self, db: AsyncSession, departement_id: uuid.UUID) -> ArbreIntervalles:
+        """Construit l'arbre à partir des demandes actives des membres du département"""
+        membres_result = await db.execute(
+            select(User.id).where(User.departement_id == departement_id)
+        )
+        membres = list(membres_result.scalars().all())
+
+        arbre = ArbreIntervalles()
+        if not membres:
+            return arbre
+
+        # Les identifiants sont passés via IN car users.id et les clés étrangères n'ont pas le même format en base
+        result = await db.execute(
+            select(
+                DemandeConge.id, DemandeConge.demandeur_id,
+                DemandeConge.date_debut, DemandeConge.date_fin, DemandeConge.statut
+            ).where(
+                DemandeConge.demandeur_id.in_(membres),
+                DemandeConge.statut.in_(STATUTS_CONFLIT)
+            )
+        )
+        for ligne in result.all():
+            conge = CongeEquipe(*ligne)
+            arbre.inserer(conge.demande_id, conge.date_debut, conge.date_fin, conge)
+        return arbre
+
+# Moteur partagé par toutes les requêtes du processus
+moteur_conflits = MoteurConflits()
+
+@event.listens_for(Session, "after_commit")
+def _appliquer_transitions_validees(session: Session) -> None:
+    transitions = session.info.pop(CLE_TRANSITIONS, None)
+    if transitions:
+        moteur_conflits.appliquer(transitions)
+
+@event.listens_for(Session, "after_transaction_end")
+def _oublier_transitions_abandonnees(session: Session, transaction: SessionTransaction) -> None:
+    # Rollback ou fermeture sans commit de la transaction principale : rien à appliquer
+    if transaction.parent is None:
+        session.info.pop(CLE_TRANSITIONS, None)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Service de maintenance des compteurs précalculés du dashboard DRH
+"""
+
+import uuid
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, and_, func
+
+from models.dashboard_snapshot import DashboardSnapshot
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.departement import Departement
+from models.user import User, RoleEnum
+from services.absence_jour_service import AbsenceJourService
+
+# Rôles pris en compte dans les statistiques par département
+ROLES_COMPTES = [RoleEnum.EMPLOYE, RoleEnum.CHEF_SERVICE]
+
+class DashboardSnapshotService:
+    """Service pour lire et maintenir la table dashboard_snapshot"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enregistrer_transition(
+        self,
+        demandeur: Optional[User],
+        demande: DemandeConge,
+        ancien_statut: Optional[StatutDemandeEnum],
+        nouveau_statut: Optional[StatutDemandeEnum]
+    ) -> None:
+        """
+        Répercute un changement de statut sur les compteurs du département du demandeur.
+
+        Ne fait pas de commit : l'appelant l'inclut dans la transaction du changement de statut,
+        après la mise à jour de la table absence_jour (dont dépendent les absences du jour).
+        Un statut à None représente la création (ancien) ou la suppression (nouveau) de la demande.
+        """
+        if ancien_statut == nouveau_statut:
+            return
+        if not demandeur or not demandeur.departement_id or demandeur.role not in ROLES_COMPTES:
+            return
+
+        valeurs = {}
+        if ancien_statut:
+            colonne = getattr(DashboardSnapshot, ancien_statut.value)
+            valeurs[ancien_statut.value] = colonne - 1
+        if nouveau_statut:
+            colonne = getattr(DashboardSnapshot, nouveau_statut.value)
+            valeurs[nouveau_statut.value] = colonne + 1
+
+        # Si la ligne n'existe pas encore, elle sera construite par la prochaine reconstruction
+        await self.db.execute(
+            update(DashboardSnapshot)
+            .where(DashboardSnapshot.departement_id == demandeur.departement_id)
+            .values(**valeurs)
+        )
+
+        # Un congé approuvé en cours modifie les absences du jour : les recalculer pour ce département
+        aujourd_hui = date.today()
+        if (StatutDemandeEnum.APPROUVEE in (ancien_statut, nouveau_statut)
+                and demande.date_debut <= aujourd_hui <= demande.date_fin):
+            await self.recalculer_totaux_du_jour([demandeur.departement_id])
+
+    async def recalculer_totaux_du_jour(self, departement_ids: Iterable[uuid.UUID]) -> None:
+        """
+        Recalcule effectifs, absences et soldes des lignes existantes des départements donnés
+
+        Les compteurs par statut ne sont pas relus. Ne fait pas de commit.
+        """
+        result = await self.db.execute(
+            select(DashboardSnapshot).where(DashboardSnapshot.departement_id.in_(list(departement_ids)))
+        )
+        snapshots = list(result.scalars().all())
+        if snapshots:
+            employes = await self._get_employes([snapshot.departement_id for snapshot in snapshots])
+            await self._calculer_totaux_du_jour(snapshots, employes)
+
+    async def supprimer(self, departement_ids: Iterable[uuid.UUID]) -> None:
+        """Supprime les lignes des départements donnés (avant leur suppression). Ne fait pas de commit."""
+        await self.db.execute(
+            delete(DashboardSnapshot).where(DashboardSnapshot.departement_id.in_(list(departement_ids)))
+        )
+
+    async def get_snapshots(self, departements: List[Departement]) -> Dict[uuid.UUID, DashboardSnapshot]:
+        """
+        Retourne une ligne par département, en recalculant celles qui manquent ou sont périmées
+
+        Lecture seule : les lignes recalculées ne sont pas enregistrées (ni la session de
+        l'appelant validée). La table est tenue à jour dans les transactions d'écriture
+        (enregistrer_transition, reconstruire des départements concernés) et par la tâche planifiée.
+        """
+        result = await self.db.execute(select(DashboardSnapshot))
+        snapshots = {snapshot.departement_id: snapshot for snapshot in result.scalars().all()}
+        # Détacher les lignes lues : les recalculs ci-dessous ne doivent pas être enregistrés
+        for snapshot in snapshots.values():
+            self.db.expunge(snapshot)
+
+        manquants = [dept.id for dept in departements if dept.id not in snapshots]
+        if manquants:
+            snapshots.update(await self._calculer(manquants, {}))
+
+        aujourd_hui = date.today()
+        perimes = [
+            snapshot for snapshot in snapshots.values()
+            if snapshot.date_reference != aujourd_hui
+        ]
+        if perimes:
+            employes = await self._get_employes([snapshot.departement_id for snapshot in perimes])
+            await self._calculer_totaux_du_jour(perimes, employes)
+
+        return snapshots
+
+    async def reconstruire(self, departement_ids: Optional[List[uuid.UUID]] = None) -> Dict[uuid.UUID, DashboardSnapshot]:
+        """
+        Recalcule entièrement et enregistre les compteurs des départements donnés (tous par défaut)
+
+        Ne fait pas de commit.
+        """
+        if departement_ids is None:
+            departements_result = await self.db.execute(select(Departement.id))
+            departement_ids = list(departements_result.scalars().all())
+
+        existants_result = await self.db.execute(
+            select(DashboardSnapshot).where(DashboardSnapshot.departement_id.in_(departement_ids))
+        )
+        existants = {snapshot.departement_id: snapshot for snapshot in existants_result.scalars().all()}
+
+        snapshots = await self._calculer(departement_ids, existants)
+        for snapshot in snapshots.values():
+            self.db.add(snapshot)
+        await self.db.flush()
+
+        return snapshots
+
+    async def _calculer(
+        self,
+        departement_ids: List[uuid.UUID],
+        existants: Dict[uuid.UUID, DashboardSnapshot]
+    ) -> Dict[uuid.UUID, DashboardSnapshot]:
+        """Calcule les compteurs des départements donnés (dans les lignes existantes fournies ou de nouvelles lignes)"""
+        employes = await self._get_employes(departement_ids)
+        departement_par_employe = {employe.id: employe.departement_id for employe in employes}
+
+        snapshots = {}
+        for departement_id in departement_ids:
+            snapshot = existants.get(departement_id) or DashboardSnapshot(departement_id=departement_id)
+            for statut in StatutDemandeEnum:
+                setattr(snapshot, statut.value, 0)
+            snapshots[departement_id] = snapshot
+
+        # Demandes par employé et par statut (une seule requête agrégée)
+        # Les identifiants sont passés via IN car users.id et les clés étrangères n'ont pas le même format en base
+        result = await self.db.execute(
+            select(DemandeConge.demandeur_id, DemandeConge.statut, func.count(DemandeConge.id))
+            .where(DemandeConge.demandeur_id.in_(list(departement_par_employe)))
+            .group_by(DemandeConge.demandeur_id, DemandeConge.statut)
+        )
+        for demandeur_id, statut, nombre in result.all():
+            snapshot = snapshots[departement_par_employe[demandeur_id]]
+            setattr(snapshot, statut.value, getattr(snapshot, statut.value) + nombre)
+
+        await self._calculer_totaux_du_jour(list(snapshots.values()), employes)
+
+        return snapshots
+
+    async def _calculer_totaux_du_jour(self, snapshots: List[DashboardSnapshot], employes: List[User]) -> None:
+        """Calcule effectifs, absences et soldes à partir des employés déjà chargés"""
+        aujourd_hui = date.today()
+        departement_par_employe = {employe.id: employe.departement_id for employe in employes}
+
+        par_departement = {
+            snapshot.departement_id: {"nombre_employes": 0, "employes_en_conge": 0, "solde_total": 0}
+            for snapshot in snapshots
+        }
+        for employe in employes:
+            totaux = par_departement[employe.departement_id]
+            totaux["nombre_employes"] += 1
+            totaux["solde_total"] += employe.solde_conges or 0
+
+        # Employés absents aujourd'hui (lus depuis la table d'occupation journalière)
+        absents = await AbsenceJourService(self.db).get_absents(aujourd_hui, departement_par_employe)
+        for user_id in absents:
+            par_departement[departement_par_employe[user_id]]["employes_en_conge"] += 1
+
+        for snapshot in snapshots:
+            totaux = par_departement[snapshot.departement_id]
+            snapshot.nombre_employes = totaux["nombre_employes"]
+            snapshot.employes_en_conge = totaux["employes_en_conge"]
+            snapshot.solde_total = totaux["solde_total"]
+            snapshot.date_reference = aujourd_hui
+
+    async def _get_employes(self, departement_ids: List[uuid.UUID]) -> List[User]:
+        """Récupère les employés et chefs de service des départements donnés"""
+        if not departement_ids:
+            return []
+        result = await self.db.execute(
+            select(User).where(
+                and_(
+                    User.departement_id.in_(departement_ids),
+                    User.role.in_(ROLES_COMPTES)
+                )
+            )
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Diffusion en temps réel des notifications créées vers les connexions ouvertes (pub/sub en mémoire)
+"""
+
+import asyncio
+import uuid
+from typing import Dict, Iterable, Set
+
+from models.notification import Notification
+
+# Nombre maximal de notifications en attente d'envoi par connexion
+TAILLE_FILE_ABONNEMENT = 100
+
+class Abonnement:
+    """File des notifications à envoyer sur une connexion"""
+
+    def __init__(self, user_id: uuid.UUID):
+        self.user_id = user_id
+        self.file: asyncio.Queue = asyncio.Queue(maxsize=TAILLE_FILE_ABONNEMENT)
+        # Passe à True quand la file déborde : la connexion doit se resynchroniser depuis la base
+        self.debordement = False
+
+class NotificationBroker:
+    """
+    Abonnements par utilisateur, partagés par tout le processus
+
+    Chaque connexion a sa propre file bornée : un client trop lent ne ralentit ni la
+    publication ni les autres clients. Il perd les notifications en trop, qu'il
+    relit ensuite depuis la table notifications.
+    """
+
+    def __init__(self):
+        self._abonnements: Dict[uuid.UUID, Set[Abonnement]] = {}
+
+    def abonner(self, user_id: uuid.UUID) -> Abonnement:
+        abonnement = Abonnement(user_id)
+        self._abonnements.setdefault(user_id, set()).add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement: Abonnement) -> None:
+        abonnements = self._abonnements.get(abonnement.user_id)
+        if abonnements is not None:
+            abonnements.discard(abonnement)
+            if not abonnements:
+                del self._abonnements[abonnement.user_id]
+
+    def publier(self, notifications: Iterable[Notification]) -> None:
+        """Transmet des notifications déjà enregistrées aux connexions de leurs destinataires"""
+        for notification in notifications:
+            for abonnement in self._abonnements.get(notification.destinataire_id, ()):
+                try:
+                    abonnement.file.put_nowait(notification)
+                except asyncio.QueueFull:
+                    abonnement.debordement = True
+
+# Broker partagé par toutes les requêtes du processus
+notification_broker = NotificationBroker()
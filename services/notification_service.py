@@ -3,24 +3,117 @@
 Service de notifications pour la gestion automatique des notifications de congés
 """
 
+import time
 import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, update, and_, or_, func
+from sqlalchemy.orm import aliased
 
 from models.notification import (
     Notification, NotificationCreate, TypeNotificationEnum, REGLES_NOTIFICATIONS
 )
 from models.demande_conge import DemandeConge, StatutDemandeEnum
 from models.user import User, RoleEnum
+from utils.user_loader import UserLoader
+from services.notification_broker import notification_broker
+from services.conflit_service import CongeEquipe
+
+# Nombre de jours passés dont les rappels non envoyés sont rattrapés (tâche quotidienne manquée)
+JOURS_RATTRAPAGE_RAPPELS = 7
+
+# Durée (secondes) pendant laquelle un compteur de non lues est servi sans relire la base,
+# pour prendre en compte les notifications créées ou lues par les autres workers
+DUREE_VALIDITE_COMPTEUR = 30
+
+class CompteurNonLues:
+    """Nombre de notifications non lues par utilisateur, partagé par tout le processus"""
+
+    def __init__(self):
+        self._valeurs: Dict[uuid.UUID, Tuple[int, float]] = {}
+
+    def get(self, user_id: uuid.UUID) -> Optional[int]:
+        """Retourne le compteur en cache, ou None s'il est absent ou trop ancien"""
+        valeur = self._valeurs.get(user_id)
+        if valeur is None or time.monotonic() - valeur[1] >= DUREE_VALIDITE_COMPTEUR:
+            return None
+        return valeur[0]
+
+    def definir(self, user_id: uuid.UUID, nombre: int) -> None:
+        self._valeurs[user_id] = (nombre, time.monotonic())
+
+    def ajouter(self, user_id: uuid.UUID, delta: int) -> None:
+        """Modifie un compteur déjà en cache (sans effet sinon : il sera lu en base)"""
+        valeur = self._valeurs.get(user_id)
+        if valeur is not None:
+            self._valeurs[user_id] = (max(0, valeur[0] + delta), valeur[1])
+
+    def invalider(self, user_id: Optional[uuid.UUID] = None) -> None:
+        if user_id is None:
+            self._valeurs.clear()
+        else:
+            self._valeurs.pop(user_id, None)
+
+# Compteurs partagés par toutes les requêtes du processus
+compteur_non_lues = CompteurNonLues()
+
+class HorlogeNotifications:
+    """
+    Dates de création strictement croissantes au sein du processus
+    
+    La date de création sert de curseur de reprise du flux SSE : chaque notification,
+    même créée dans le même lot, reçoit une date distincte dans l'ordre de diffusion.
+    """
+
+    def __init__(self):
+        self._derniere = datetime.min
+
+    def suivante(self) -> datetime:
+        maintenant = datetime.utcnow()
+        if maintenant <= self._derniere:
+            maintenant = self._derniere + timedelta(microseconds=1)
+        self._derniere = maintenant
+        return maintenant
+
+# Horloge partagée par toutes les requêtes du processus
+horloge_notifications = HorlogeNotifications()
 
 class NotificationService:
     """Service pour gérer les notifications automatiques"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, user_loader: Optional[UserLoader] = None):
         self.db = db
+        # Chargeur partagé avec la requête HTTP (ou propre au service en tâche de fond)
+        self.user_loader = user_loader or UserLoader(db)
+        # Notifications insérées mais pas encore validées, pendant une transaction()
+        self._en_attente_commit: Optional[List[Notification]] = None
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        Regroupe toutes les notifications créées dans le bloc en un seul commit
+        
+        Si le bloc échoue, aucune notification n'est enregistrée (rollback) : il peut
+        être rejoué sans que les destinataires reçoivent deux fois la même notification.
+        Les compteurs et les connexions en temps réel ne sont mis à jour qu'après le commit.
+        """
+        self._en_attente_commit = []
+        try:
+            yield
+            await self.db.commit()
+            notifications = self._en_attente_commit
+        except BaseException:
+            await self.db.rollback()
+            # Le rollback expire les utilisateurs déjà chargés : les relire au besoin
+            self.user_loader.clear()
+            raise
+        finally:
+            self._en_attente_commit = None
+        self._apres_commit(notifications)
     
     async def creer_notification(
         self, 
@@ -31,18 +124,56 @@ class NotificationService:
         demande_conge_id: Optional[uuid.UUID] = None
     ) -> Notification:
         """Crée une nouvelle notification"""
-        notification = Notification(
-            destinataire_id=destinataire_id,
-            type_notification=type_notification,
-            titre=titre,
-            message=message,
-            demande_conge_id=demande_conge_id
-        )
+        notifications = await self.creer_notifications_bulk([
+            NotificationCreate(
+                destinataire_id=destinataire_id,
+                type_notification=type_notification,
+                titre=titre,
+                message=message,
+                demande_conge_id=demande_conge_id
+            )
+        ])
+        return notifications[0]
+    
+    async def creer_notifications_bulk(self, notifications_data: List[NotificationCreate]) -> List[Notification]:
+        """
+        Crée plusieurs notifications en un seul INSERT (executemany) et un seul commit
+        (celui de la transaction() en cours le cas échéant)
+        
+        Les valeurs par défaut sont calculées ici, sans refresh : les notifications
+        retournées ne sont pas attachées à la session.
+        """
+        if not notifications_data:
+            return []
+        
+        # Une date distincte par notification, croissante dans l'ordre de diffusion
+        lignes = [
+            {
+                **notification_data.dict(),
+                "id": uuid.uuid4(),
+                "lue": False,
+                "email_envoye": False,
+                "date_creation": horloge_notifications.suivante()
+            }
+            for notification_data in notifications_data
+        ]
+        
+        await self.db.execute(insert(Notification), lignes)
+        notifications = [Notification(**ligne) for ligne in lignes]
+        
+        if self._en_attente_commit is not None:
+            self._en_attente_commit.extend(notifications)
+            return notifications
         
-        self.db.add(notification)
         await self.db.commit()
-        await self.db.refresh(notification)
-        return notification
+        self._apres_commit(notifications)
+        return notifications
+    
+    def _apres_commit(self, notifications: List[Notification]) -> None:
+        """Met à jour les compteurs de non lues et diffuse les notifications enregistrées"""
+        for destinataire_id, nombre in Counter(notification.destinataire_id for notification in notifications).items():
+            compteur_non_lues.ajouter(destinataire_id, nombre)
+        notification_broker.publier(notifications)
     
     async def notifier_nouvelle_demande(self, demande: DemandeConge) -> List[Notification]:
         """Notifie les responsables d'une nouvelle demande de congé"""
@@ -60,18 +191,17 @@ class NotificationService:
         titre = "Nouvelle demande de congé"
         message = f"Une nouvelle demande de congé a été soumise par {demandeur.nom_complet} du {demande.date_debut.strftime('%d/%m/%Y')} au {demande.date_fin.strftime('%d/%m/%Y')}"
         
-        # Créer les notifications
-        for destinataire_id in destinataires:
-            notification = await self.creer_notification(
+        # Créer les notifications (un seul INSERT pour tous les destinataires)
+        return await self.creer_notifications_bulk([
+            NotificationCreate(
                 destinataire_id=destinataire_id,
                 type_notification=TypeNotificationEnum.NOUVELLE_DEMANDE,
                 titre=titre,
                 message=message,
                 demande_conge_id=demande.id
             )
-            notifications.append(notification)
-        
-        return notifications
+            for destinataire_id in destinataires
+        ])
     
     async def notifier_validation_demande(
         self, 
@@ -101,21 +231,20 @@ class NotificationService:
             message += f"\n\nCommentaire : {commentaire}"
         
         # Créer la notification
-        notification = await self.creer_notification(
-            destinataire_id=demande.demandeur_id,
-            type_notification=type_notif,
-            titre=titre,
-            message=message,
-            demande_conge_id=demande.id
-        )
-        notifications.append(notification)
-        
-        return notifications
+        return await self.creer_notifications_bulk([
+            NotificationCreate(
+                destinataire_id=demande.demandeur_id,
+                type_notification=type_notif,
+                titre=titre,
+                message=message,
+                demande_conge_id=demande.id
+            )
+        ])
 
     async def notifier_conflit_demande_equipe(
         self, 
         nouvelle_demande: DemandeConge, 
-        demandes_en_conflit: List[DemandeConge],
+        demandes_en_conflit: List[CongeEquipe],
         chef_service_id: uuid.UUID
     ) -> Optional[Notification]:
         """Notifie le chef de service d'un conflit de congés dans son équipe."""
@@ -128,128 +257,173 @@ class NotificationService:
         message = f"La demande de {demandeur.nom_complet} du {nouvelle_demande.date_debut.strftime('%d/%m/%Y')} au {nouvelle_demande.date_fin.strftime('%d/%m/%Y')} entre en conflit avec d'autres demandes."
         
         # Créer la notification pour le chef de service
-        notification = await self.creer_notification(
-            destinataire_id=chef_service_id,
-            type_notification=TypeNotificationEnum.ALERTE_CONFLIT_EQUIPE,
-            titre=titre,
-            message=message,
-            demande_conge_id=nouvelle_demande.id
-        )
+        notifications = await self.creer_notifications_bulk([
+            NotificationCreate(
+                destinataire_id=chef_service_id,
+                type_notification=TypeNotificationEnum.ALERTE_CONFLIT_EQUIPE,
+                titre=titre,
+                message=message,
+                demande_conge_id=nouvelle_demande.id
+            )
+        ])
         
-        return notification
+        return notifications[0]
     
-    async def generer_rappels_automatiques(self) -> List[Notification]:
-        """Génère les rappels automatiques (15 jours avant et retour de congé)"""
-        notifications = []
-        
-        # Date d'aujourd'hui
+    async def generer_rappels_automatiques(self, jours_rattrapage: int = JOURS_RATTRAPAGE_RAPPELS) -> List[Notification]:
+        """
+        Génère les rappels automatiques (15 jours avant et retour de congé)
+        
+        Les rappels des `jours_rattrapage` jours précédents qui n'ont pas été envoyés
+        (tâche quotidienne non exécutée) sont rattrapés. Un congé approuvé moins de 15 jours
+        avant son début n'a pas de rappel « 15 jours avant » : il n'en aurait pas eu non plus
+        si la tâche avait tourné chaque jour.
+        """
         aujourd_hui = date.today()
         
-        # Rappels 15 jours avant le début du congé
-        date_debut_cible = aujourd_hui + timedelta(days=15)
-        notifications_15j = await self._generer_rappels_15_jours(date_debut_cible)
-        notifications.extend(notifications_15j)
+        # Rappels 15 jours avant le début du congé (congés qui n'ont pas encore commencé)
+        demandes_15j = [
+            demande for demande in await self._get_demandes_sans_rappel(
+                TypeNotificationEnum.RAPPEL_15_JOURS,
+                DemandeConge.date_debut,
+                max(aujourd_hui + timedelta(days=15 - jours_rattrapage), aujourd_hui + timedelta(days=1)),
+                aujourd_hui + timedelta(days=15)
+            )
+            # Seuls les rappels manqués sont rattrapés : la demande était approuvée le jour du rappel
+            if demande.date_reponse is None
+            or demande.date_reponse.date() <= demande.date_debut - timedelta(days=15)
+        ]
         
         # Rappels de retour de congé (le jour après la fin du congé)
-        date_fin_cible = aujourd_hui - timedelta(days=1)
-        notifications_retour = await self._generer_rappels_retour(date_fin_cible)
-        notifications.extend(notifications_retour)
-        
-        return notifications
-    
-    async def _generer_rappels_15_jours(self, date_debut: date) -> List[Notification]:
-        """Génère les rappels 15 jours avant le début du congé"""
-        notifications = []
-        
-        # Trouver les demandes approuvées qui commencent dans 15 jours
-        result = await self.db.execute(
-            select(DemandeConge).where(
-                and_(
-                    DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    DemandeConge.date_debut == date_debut
-                )
-            )
+        demandes_retour = await self._get_demandes_sans_rappel(
+            TypeNotificationEnum.RAPPEL_RETOUR_CONGE,
+            DemandeConge.date_fin,
+            aujourd_hui - timedelta(days=1 + jours_rattrapage),
+            aujourd_hui - timedelta(days=1)
         )
-        demandes = result.scalars().all()
         
-        for demande in demandes:
-            # Vérifier qu'on n'a pas déjà envoyé ce rappel
-            if await self._notification_deja_envoyee(demande.id, TypeNotificationEnum.RAPPEL_15_JOURS):
-                continue
-            
-            demandeur = await self._get_user(demande.demandeur_id)
+        # Demandeurs et chefs de service de toutes les demandes concernées, en une requête
+        demandeurs, chefs_service = await self._get_demandeurs_et_chefs(demandes_15j + demandes_retour)
+        
+        notifications_data = []
+        for demande in demandes_15j:
+            demandeur = demandeurs.get(demande.demandeur_id)
             if not demandeur:
                 continue
             
             # Destinataires : demandeur + chef de service
             destinataires = [demande.demandeur_id]
-            if demandeur.departement_id:
-                chef_service = await self._get_chef_service(demandeur.departement_id)
-                if chef_service and chef_service.id != demande.demandeur_id:
-                    destinataires.append(chef_service.id)
+            chef_service = chefs_service.get(demande.demandeur_id)
+            if chef_service and chef_service.id != demande.demandeur_id:
+                destinataires.append(chef_service.id)
             
-            # Créer les notifications
-            titre = "Rappel : Congé dans 15 jours"
-            message = f"Rappel : Le congé de {demandeur.nom_complet} commence dans 15 jours ({demande.date_debut.strftime('%d/%m/%Y')})"
+            jours_restants = (demande.date_debut - aujourd_hui).days
+            titre = f"Rappel : Congé dans {jours_restants} jours"
+            message = f"Rappel : Le congé de {demandeur.nom_complet} commence dans {jours_restants} jours ({demande.date_debut.strftime('%d/%m/%Y')})"
             
             for destinataire_id in destinataires:
-                notification = await self.creer_notification(
+                notifications_data.append(NotificationCreate(
                     destinataire_id=destinataire_id,
                     type_notification=TypeNotificationEnum.RAPPEL_15_JOURS,
                     titre=titre,
                     message=message,
                     demande_conge_id=demande.id
-                )
-                notifications.append(notification)
+                ))
         
-        return notifications
-    
-    async def _generer_rappels_retour(self, date_fin: date) -> List[Notification]:
-        """Génère les rappels de retour de congé"""
-        notifications = []
+        for demande in demandes_retour:
+            demandeur = demandeurs.get(demande.demandeur_id)
+            if not demandeur:
+                continue
+            
+            # Destinataires : chef de service uniquement (le demandeur sait qu'il revient)
+            chef_service = chefs_service.get(demande.demandeur_id)
+            if not chef_service or chef_service.id == demande.demandeur_id:
+                continue
+            
+            date_retour = demande.date_fin + timedelta(days=1)
+            titre = "Rappel : Retour de congé"
+            if date_retour == aujourd_hui:
+                message = f"Rappel : {demandeur.nom_complet} reprend le travail aujourd'hui après son congé"
+            else:
+                message = f"Rappel : {demandeur.nom_complet} a repris le travail le {date_retour.strftime('%d/%m/%Y')} après son congé"
+            
+            notifications_data.append(NotificationCreate(
+                destinataire_id=chef_service.id,
+                type_notification=TypeNotificationEnum.RAPPEL_RETOUR_CONGE,
+                titre=titre,
+                message=message,
+                demande_conge_id=demande.id
+            ))
         
-        # Trouver les demandes approuvées qui se terminent hier (retour aujourd'hui)
+        # Insérer tous les rappels en un seul lot
+        return await self.creer_notifications_bulk(notifications_data)
+    
+    async def _get_demandes_sans_rappel(
+        self,
+        type_notification: TypeNotificationEnum,
+        colonne_date,
+        debut: date,
+        fin: date
+    ) -> List[DemandeConge]:
+        """
+        Demandes approuvées dont la date (début ou fin) est dans [debut, fin] et pour lesquelles
+        aucune notification de ce type n'existe encore (anti-jointure NOT EXISTS)
+        """
+        if debut > fin:
+            return []
+        
+        rappel_existant = select(Notification.id).where(
+            and_(
+                Notification.demande_conge_id == DemandeConge.id,
+                Notification.type_notification == type_notification
+            )
+        )
         result = await self.db.execute(
             select(DemandeConge).where(
                 and_(
                     DemandeConge.statut == StatutDemandeEnum.APPROUVEE,
-                    DemandeConge.date_fin == date_fin
+                    colonne_date.between(debut, fin),
+                    ~rappel_existant.exists()
                 )
             )
         )
-        demandes = result.scalars().all()
-        
-        for demande in demandes:
-            # Vérifier qu'on n'a pas déjà envoyé ce rappel
-            if await self._notification_deja_envoyee(demande.id, TypeNotificationEnum.RAPPEL_RETOUR_CONGE):
-                continue
-            
-            demandeur = await self._get_user(demande.demandeur_id)
-            if not demandeur:
-                continue
-            
-            # Destinataires : chef de service uniquement (le demandeur sait qu'il revient)
-            destinataires = []
-            if demandeur.departement_id:
-                chef_service = await self._get_chef_service(demandeur.departement_id)
-                if chef_service and chef_service.id != demande.demandeur_id:
-                    destinataires.append(chef_service.id)
-            
-            # Créer les notifications
-            titre = "Rappel : Retour de congé"
-            message = f"Rappel : {demandeur.nom_complet} reprend le travail aujourd'hui après son congé"
-            
-            for destinataire_id in destinataires:
-                notification = await self.creer_notification(
-                    destinataire_id=destinataire_id,
-                    type_notification=TypeNotificationEnum.RAPPEL_RETOUR_CONGE,
-                    titre=titre,
-                    message=message,
-                    demande_conge_id=demande.id
+        return list(result.scalars().all())
+    
+    async def _get_demandeurs_et_chefs(
+        self,
+        demandes: List[DemandeConge]
+    ) -> Tuple[Dict[uuid.UUID, User], Dict[uuid.UUID, User]]:
+        """
+        Charge en une requête les demandeurs et le chef de service de leur département
+        
+        Retourne (demandeur par id, chef de service par id de demandeur).
+        """
+        demandeur_ids = {demande.demandeur_id for demande in demandes}
+        if not demandeur_ids:
+            return {}, {}
+        
+        # Auto-jointure sur users : les identifiants des demandeurs sont passés via IN
+        # car users.id et les clés étrangères n'ont pas le même format en base
+        Demandeur = aliased(User)
+        ChefService = aliased(User)
+        result = await self.db.execute(
+            select(Demandeur, ChefService)
+            .outerjoin(
+                ChefService,
+                and_(
+                    ChefService.departement_id == Demandeur.departement_id,
+                    ChefService.role == RoleEnum.CHEF_SERVICE
                 )
-                notifications.append(notification)
+            )
+            .where(Demandeur.id.in_(demandeur_ids))
+        )
         
-        return notifications
+        demandeurs = {}
+        chefs_service = {}
+        for demandeur, chef_service in result.all():
+            demandeurs[demandeur.id] = demandeur
+            if chef_service is not None and demandeur.departement_id:
+                chefs_service.setdefault(demandeur.id, chef_service)
+        return demandeurs, chefs_service
     
     async def _get_destinataires_pour_nouvelle_demande(self, demandeur: User) -> List[uuid.UUID]:
         """Détermine les destinataires pour une nouvelle demande selon les règles métier"""
@@ -274,10 +448,7 @@ class NotificationService:
     
     async def _get_user(self, user_id: uuid.UUID) -> Optional[User]:
         """Récupère un utilisateur par son ID"""
-        result = await self.db.execute(
-            select(User).where(User.id == user_id)
-        )
-        return result.scalar_one_or_none()
+        return await self.user_loader.load(user_id)
     
     async def _get_chef_service(self, departement_id: uuid.UUID) -> Optional[User]:
         """Récupère le chef de service d'un département"""
@@ -291,22 +462,6 @@ class NotificationService:
         )
         return result.scalar_one_or_none()
     
-    async def _notification_deja_envoyee(
-        self, 
-        demande_id: uuid.UUID, 
-        type_notification: TypeNotificationEnum
-    ) -> bool:
-        """Vérifie si une notification du type donné a déjà été envoyée pour cette demande"""
-        result = await self.db.execute(
-            select(Notification).where(
-                and_(
-                    Notification.demande_conge_id == demande_id,
-                    Notification.type_notification == type_notification
-                )
-            )
-        )
-        return result.scalar_one_or_none() is not None
-    
     async def marquer_comme_lue(self, notification_id: uuid.UUID, user_id: uuid.UUID) -> bool:
         """Marque une notification comme lue"""
         result = await self.db.execute(
@@ -322,11 +477,110 @@ class NotificationService:
         if not notification:
             return False
         
+        if notification.lue:
+            return True
+        
         notification.lue = True
         notification.date_lecture = datetime.utcnow()
         await self.db.commit()
+        compteur_non_lues.ajouter(user_id, -1)
         return True
     
+    async def marquer_toutes_comme_lues(
+        self,
+        user_id: uuid.UUID,
+        avant: Optional[datetime] = None,
+        type_notification: Optional[TypeNotificationEnum] = None
+    ) -> int:
+        """
+        Marque comme lues, en un seul UPDATE, les notifications non lues d'un utilisateur
+        
+        Filtres optionnels : créées avant une date et/ou d'un type donné.
+        Retourne le nombre de notifications modifiées.
+        """
+        conditions = [
+            Notification.destinataire_id == user_id,
+            Notification.lue == False
+        ]
+        if avant is not None:
+            conditions.append(Notification.date_creation < avant)
+        if type_notification is not None:
+            conditions.append(Notification.type_notification == type_notification)
+        
+        result = await self.db.execute(
+            update(Notification)
+            .where(and_(*conditions))
+            .values(lue=True, date_lecture=datetime.utcnow())
+        )
+        await self.db.commit()
+        
+        if avant is None and type_notification is None:
+            compteur_non_lues.definir(user_id, 0)
+        else:
+            compteur_non_lues.ajouter(user_id, -result.rowcount)
+        return result.rowcount
+    
+    async def get_notifications_depuis(
+        self,
+        user_id: uuid.UUID,
+        derniere_notification_id: uuid.UUID,
+        limit: int = 100
+    ) -> List[Notification]:
+        """
+        Récupère les notifications d'un utilisateur créées après une notification donnée,
+        de la plus ancienne à la plus récente (liste vide si cette notification n'existe pas)
+        """
+        result = await self.db.execute(
+            select(Notification.date_creation).where(
+                and_(
+                    Notification.id == derniere_notification_id,
+                    Notification.destinataire_id == user_id
+                )
+            )
+        )
+        date_reference = result.scalar_one_or_none()
+        if date_reference is None:
+            return []
+        
+        # Les dates de création sont strictement croissantes dans un processus (même ordre que
+        # le flux en direct) : l'id ne départage que deux workers tombés sur la même microseconde
+        result = await self.db.execute(
+            select(Notification)
+            .where(
+                and_(
+                    Notification.destinataire_id == user_id,
+                    or_(
+                        Notification.date_creation > date_reference,
+                        and_(
+                            Notification.date_creation == date_reference,
+                            Notification.id > derniere_notification_id
+                        )
+                    )
+                )
+            )
+            .order_by(Notification.date_creation.asc(), Notification.id.asc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    async def compter_non_lues(self, user_id: uuid.UUID) -> int:
+        """Nombre de notifications non lues d'un utilisateur (cache, sinon COUNT(*) sur l'index)"""
+        nombre = compteur_non_lues.get(user_id)
+        if nombre is not None:
+            return nombre
+        
+        result = await self.db.execute(
+            select(func.count()).select_from(Notification).where(
+                and_(
+                    Notification.destinataire_id == user_id,
+                    Notification.lue == False
+                )
+            )
+        )
+        nombre = result.scalar_one()
+        compteur_non_lues.definir(user_id, nombre)
+        return nombre
+    
     async def get_notifications_utilisateur(
         self, 
         user_id: uuid.UUID, 
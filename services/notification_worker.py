@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+File de traitement en tâche de fond des notifications liées aux demandes de congés
+"""
+
+import asyncio
+import uuid
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from models.database import async_session_maker
+from models.demande_conge import DemandeConge
+from services.conflit_service import CongeEquipe
+from services.notification_service import NotificationService
+
+# Nombre maximal d'événements en attente (au-delà, la publication attend qu'une place se libère)
+TAILLE_MAX_FILE = 1000
+# Délai maximal (secondes) d'attente d'une place dans la file avant d'abandonner l'événement
+DELAI_PUBLICATION = 2.0
+# Nombre maximal d'événements traités avec une même session
+TAILLE_LOT = 50
+# Nombre de tentatives par événement et délai (secondes) avant la première nouvelle tentative
+TENTATIVES_MAX = 3
+DELAI_NOUVELLE_TENTATIVE = 0.5
+# Délai maximal (secondes) pour vider la file à l'arrêt de l'application
+DELAI_ARRET = 10.0
+
+class TypeEvenementEnum(str, Enum):
+    DEMANDE_CREEE = "demande_creee"
+    DEMANDE_VALIDEE = "demande_validee"
+
+class EvenementDemande(NamedTuple):
+    """Événement métier d'une demande de congé, à notifier après le commit"""
+    type_evenement: TypeEvenementEnum
+    demande_id: uuid.UUID
+    # Validation : décision et commentaire du valideur
+    approuvee: Optional[bool] = None
+    commentaire: Optional[str] = None
+    # Création : conflits d'équipe détectés et chef de service à alerter
+    conflits: Tuple[CongeEquipe, ...] = ()
+    chef_service_id: Optional[uuid.UUID] = None
+
+class NotificationWorker:
+    """
+    File asyncio bornée consommée par une tâche de fond, démarrée et arrêtée par main.lifespan
+
+    Les notifications sont créées dans une session propre au worker, par lots, avec une
+    transaction par événement et de nouvelles tentatives en cas d'échec. Tant que le
+    worker n'est pas démarré (scripts, tests), les événements sont traités immédiatement.
+    """
+
+    def __init__(self):
+        self._file: Optional[asyncio.Queue] = None
+        self._tache: Optional[asyncio.Task] = None
+
+    @property
+    def demarre(self) -> bool:
+        return self._tache is not None and not self._tache.done()
+
+    async def demarrer(self) -> None:
+        """Crée la file et lance la tâche de traitement"""
+        if self.demarre:
+            return
+        self._file = asyncio.Queue(maxsize=TAILLE_MAX_FILE)
+        self._tache = asyncio.create_task(self._boucle())
+
+    async def arreter(self) -> None:
+        """Traite les événements encore en file (dans la limite de DELAI_ARRET) puis arrête la tâche"""
+        if not self.demarre:
+            return
+        try:
+            await asyncio.wait_for(self._file.join(), timeout=DELAI_ARRET)
+        except asyncio.TimeoutError:
+            print(f"Arrêt du worker de notifications : {self._file.qsize()} événement(s) non traité(s)")
+        self._tache.cancel()
+        try:
+            await self._tache
+        except asyncio.CancelledError:
+            pass
+        self._tache = None
+
+    async def publier(self, evenement: EvenementDemande) -> None:
+        """Ajoute un événement à la file (sans jamais faire échouer la requête appelante)"""
+        if not self.demarre:
+            try:
+                await self._traiter_lot([evenement])
+            except Exception as e:
+                print(f"Erreur lors de l'envoi des notifications: {e}")
+            return
+        try:
+            await asyncio.wait_for(self._file.put(evenement), timeout=DELAI_PUBLICATION)
+        except asyncio.TimeoutError:
+            print(f"File de notifications pleine : événement {evenement.type_evenement.value} "
+                  f"de la demande {evenement.demande_id} abandonné")
+
+    async def _boucle(self) -> None:
+        """Attend les événements et les traite par lots"""
+        while True:
+            lot = [await self._file.get()]
+            while len(lot) < TAILLE_LOT and not self._file.empty():
+                lot.append(self._file.get_nowait())
+            try:
+                await self._traiter_lot(lot)
+            except Exception as e:
+                print(f"Erreur inattendue du worker de notifications: {e}")
+            finally:
+                for _ in lot:
+                    self._file.task_done()
+
+    async def _traiter_lot(self, lot: List[EvenementDemande]) -> None:
+        """Charge les demandes du lot en une requête et traite chaque événement dans la même session"""
+        async with async_session_maker() as db:
+            service = NotificationService(db)
+            try:
+                result = await db.execute(
+                    select(DemandeConge).where(DemandeConge.id.in_({evenement.demande_id for evenement in lot}))
+                )
+                demandes: Optional[Dict[uuid.UUID, DemandeConge]] = {
+                    demande.id: demande for demande in result.scalars().all()
+                }
+            except Exception as e:
+                # Les demandes seront chargées une à une, avec les tentatives de chaque événement
+                print(f"Erreur lors du chargement du lot de notifications: {e}")
+                await db.rollback()
+                demandes = None
+
+            # Après un rollback, les demandes chargées sont expirées et doivent être relues une à une
+            recharger = demandes is None
+            for evenement in lot:
+                for tentative in range(1, TENTATIVES_MAX + 1):
+                    try:
+                        if recharger:
+                            await db.rollback()
+                            service.user_loader.clear()
+                            demande = await db.get(DemandeConge, evenement.demande_id, populate_existing=True)
+                        else:
+                            demande = demandes.get(evenement.demande_id)
+                        if demande is None:
+                            # Demande supprimée entre-temps : plus rien à notifier
+                            break
+                        # Toutes les notifications de l'événement sont validées ensemble : une
+                        # nouvelle tentative ne renvoie pas celles d'une étape déjà réussie
+                        async with service.transaction():
+                            await self._traiter(service, demande, evenement)
+                        break
+                    except Exception as e:
+                        recharger = True
+                        if tentative == TENTATIVES_MAX:
+                            print(f"Erreur lors de l'envoi des notifications ({evenement.type_evenement.value}, "
+                                  f"demande {evenement.demande_id}), abandon après {tentative} tentatives: {e}")
+                        else:
+                            await asyncio.sleep(DELAI_NOUVELLE_TENTATIVE * 2 ** (tentative - 1))
+
+    async def _traiter(self, service: NotificationService, demande: DemandeConge, evenement: EvenementDemande) -> None:
+        """Crée les notifications correspondant à un événement"""
+        if evenement.type_evenement == TypeEvenementEnum.DEMANDE_CREEE:
+            await service.notifier_nouvelle_demande(demande)
+            if evenement.conflits and evenement.chef_service_id:
+                await service.notifier_conflit_demande_equipe(
+                    nouvelle_demande=demande,
+                    demandes_en_conflit=list(evenement.conflits),
+                    chef_service_id=evenement.chef_service_id
+                )
+        elif evenement.type_evenement == TypeEvenementEnum.DEMANDE_VALIDEE:
+            await service.notifier_validation_demande(demande, evenement.approuvee, evenement.commentaire)
+
+# Worker partagé par toutes les requêtes du processus
+notification_worker = NotificationWorker()
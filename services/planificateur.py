@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Planificateur en processus des tâches périodiques (rappels, réconciliations, maintenance)
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import async_session_maker
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.tache_planifiee import VerrouTache, ExecutionTache
+from services.absence_jour_service import AbsenceJourService
+from services.attestation_service import DELAI_GRACE_NETTOYAGE
+from services.stockage_attestations import stockage_attestations
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from services.notification_service import NotificationService
+from services.solde_ledger_service import SoldeLedgerService
+from utils.cron import ExpressionCron
+
+# Intervalle maximal (secondes) entre deux réveils de la boucle (suit les changements d'heure)
+INTERVALLE_MAX_REVEIL = 60
+# Durée par défaut du bail d'exécution d'une tâche (libéré dès la fin de l'exécution)
+DUREE_BAIL_DEFAUT = timedelta(minutes=30)
+# Délai maximal (secondes) pour laisser finir les tâches en cours à l'arrêt de l'application
+DELAI_ARRET = 10.0
+# Durée de conservation de l'historique des exécutions
+JOURS_CONSERVATION_HISTORIQUE = 30
+
+# Statuts des demandes dont l'attestation reste valable (le congé a lieu)
+STATUTS_ATTESTATION_VALIDE = [
+    StatutDemandeEnum.APPROUVEE,
+    StatutDemandeEnum.DEMANDE_ANNULATION,
+    StatutDemandeEnum.ANNULATION_REFUSEE,
+]
+
+# Échéance enregistrée pour un bail créé par une exécution manuelle (antérieure à toute échéance)
+ECHEANCE_INITIALE = datetime(2000, 1, 1)
+
+FonctionTache = Callable[[AsyncSession], Awaitable[str]]
+
+class TachePlanifiee:
+    """Tâche exécutée à chaque échéance de son expression cron (heure locale du serveur)"""
+
+    def __init__(self, nom: str, cron: str, fonction: FonctionTache, description: str,
+                 duree_bail: timedelta = DUREE_BAIL_DEFAUT):
+        self.nom = nom
+        self.cron = ExpressionCron(cron)
+        self.fonction = fonction
+        self.description = description
+        self.duree_bail = duree_bail
+
+async def _envoyer_rappels(db: AsyncSession) -> str:
+    notifications = await NotificationService(db).generer_rappels_automatiques()
+    return f"{len(notifications)} rappel(s) envoyé(s)"
+
+async def _reconcilier_soldes(db: AsyncSession) -> str:
+    ecarts = await SoldeLedgerService(db).reconcilier()
+    await db.commit()
+    return f"{len(ecarts)} écart(s) de solde corrigé(s)"
+
+async def _reconstruire_absences(db: AsyncSession) -> str:
+    nombre_jours = await AbsenceJourService(db).reconstruire()
+    await db.commit()
+    return f"{nombre_jours} jour(s) d'absence reconstruit(s)"
+
+async def _reconstruire_dashboard(db: AsyncSession) -> str:
+    snapshots = await DashboardSnapshotService(db).reconstruire()
+    await db.commit()
+    return f"{len(snapshots)} département(s) recalculé(s)"
+
+async def _purger_historique(db: AsyncSession) -> str:
+    limite = datetime.utcnow() - timedelta(days=JOURS_CONSERVATION_HISTORIQUE)
+    result = await db.execute(delete(ExecutionTache).where(ExecutionTache.debut < limite))
+    await db.commit()
+    return f"{result.rowcount} exécution(s) supprimée(s) de l'historique"
+
+async def _nettoyer_attestations(db: AsyncSession) -> str:
+    result = await db.execute(
+        select(DemandeConge.attestation_pdf).where(
+            DemandeConge.attestation_pdf.isnot(None),
+            DemandeConge.statut.in_(STATUTS_ATTESTATION_VALIDE)
+        )
+    )
+    references = set(result.scalars().all())
+    supprimes = await stockage_attestations.supprimer_obsoletes(references, DELAI_GRACE_NETTOYAGE)
+    return f"{supprimes} attestation(s) obsolète(s) supprimée(s)"
+
+TACHES_PAR_DEFAUT = [
+    TachePlanifiee("rappels_automatiques", "0 7 * * *", _envoyer_rappels,
+                   "Rappels 15 jours avant le congé et au retour de congé"),
+    TachePlanifiee("reconciliation_soldes", "0 2 * * *", _reconcilier_soldes,
+                   "Réconciliation du registre des soldes avec les demandes"),
+    TachePlanifiee("reconstruction_absence_jour", "15 2 * * *", _reconstruire_absences,
+                   "Reconstruction des jours d'absence à partir des demandes approuvées"),
+    TachePlanifiee("reconstruction_dashboard", "30 2 * * *", _reconstruire_dashboard,
+                   "Recalcul complet des compteurs du tableau de bord"),
+    TachePlanifiee("nettoyage_attestations", "0 4 * * *", _nettoyer_attestations,
+                   "Suppression des attestations remplacées ou des demandes qui ne sont plus approuvées"),
+    TachePlanifiee("purge_historique_taches", "0 3 * * 0", _purger_historique,
+                   f"Suppression des exécutions de plus de {JOURS_CONSERVATION_HISTORIQUE} jours"),
+]
+
+class Planificateur:
+    """
+    Boucle asyncio qui lance les tâches à leurs échéances, démarrée et arrêtée par main.lifespan
+
+    Chaque worker uvicorn fait tourner sa propre boucle : avant d'exécuter une tâche,
+    le worker prend un bail en base (table taches_verrous) pour l'échéance concernée.
+    Un seul worker l'obtient, les autres passent leur tour. Un bail dont le détenteur
+    a disparu expire après la durée de bail de la tâche.
+    """
+
+    def __init__(self, taches: List[TachePlanifiee]):
+        self.taches: Dict[str, TachePlanifiee] = {tache.nom: tache for tache in taches}
+        self.detenteur = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.prochaines_echeances: Dict[str, datetime] = {}
+        self._boucle_tache: Optional[asyncio.Task] = None
+        self._en_cours: Dict[str, asyncio.Task] = {}
+
+    @property
+    def demarre(self) -> bool:
+        return self._boucle_tache is not None and not self._boucle_tache.done()
+
+    async def demarrer(self) -> None:
+        """Calcule les prochaines échéances et lance la boucle"""
+        if self.demarre:
+            return
+        maintenant = datetime.now()
+        self.prochaines_echeances = {
+            nom: tache.cron.prochaine_echeance(maintenant) for nom, tache in self.taches.items()
+        }
+        self._boucle_tache = asyncio.create_task(self._boucle())
+
+    async def arreter(self) -> None:
+        """Arrête la boucle et laisse finir les tâches en cours (dans la limite de DELAI_ARRET)"""
+        if not self.demarre:
+            return
+        self._boucle_tache.cancel()
+        try:
+            await self._boucle_tache
+        except asyncio.CancelledError:
+            pass
+        self._boucle_tache = None
+
+        en_cours = [tache for tache in self._en_cours.values() if not tache.done()]
+        if en_cours:
+            _, restantes = await asyncio.wait(en_cours, timeout=DELAI_ARRET)
+            for tache in restantes:
+                print("Arrêt du planificateur : tâche interrompue")
+                tache.cancel()
+            await asyncio.gather(*restantes, return_exceptions=True)
+
+    async def executer(self, nom: str) -> Optional[ExecutionTache]:
+        """
+        Exécute immédiatement une tâche (hors planning)
+
+        Retourne None si la tâche est déjà en cours d'exécution sur un worker.
+        """
+        return await self._executer(self.taches[nom], echeance=None)
+
+    async def _boucle(self) -> None:
+        """Lance les tâches arrivées à échéance, puis dort jusqu'à la prochaine"""
+        while True:
+            maintenant = datetime.now()
+            for nom, echeance in list(self.prochaines_echeances.items()):
+                if echeance > maintenant:
+                    continue
+                tache = self.taches[nom]
+                # Les échéances manquées (mise en veille, exécution trop longue) ne sont pas rejouées
+                self.prochaines_echeances[nom] = tache.cron.prochaine_echeance(maintenant)
+                precedente = self._en_cours.get(nom)
+                if precedente is not None and not precedente.done():
+                    continue
+                self._en_cours[nom] = asyncio.create_task(self._executer(tache, echeance))
+
+            prochaine = min(self.prochaines_echeances.values(), default=None)
+            attente = INTERVALLE_MAX_REVEIL
+            if prochaine is not None:
+                attente = min(attente, max((prochaine - datetime.now()).total_seconds(), 0))
+            await asyncio.sleep(attente)
+
+    async def _executer(self, tache: TachePlanifiee, echeance: Optional[datetime]) -> Optional[ExecutionTache]:
+        """Prend le bail, exécute la tâche dans sa propre session et enregistre le résultat"""
+        try:
+            async with async_session_maker() as db:
+                if not await self._acquerir_bail(db, tache, echeance):
+                    return None
+                execution = ExecutionTache(
+                    nom=tache.nom,
+                    detenteur=self.detenteur,
+                    echeance=echeance,
+                    debut=datetime.utcnow()
+                )
+                db.add(execution)
+                await db.commit()
+        except Exception as e:
+            print(f"Erreur lors de la prise du bail de la tâche {tache.nom}: {e}")
+            return None
+
+        debut = time.monotonic()
+        try:
+            async with async_session_maker() as db_tache:
+                execution.resultat = await tache.fonction(db_tache)
+            execution.succes = True
+        except Exception as e:
+            execution.succes = False
+            execution.erreur = f"{type(e).__name__}: {e}"
+            print(f"Erreur lors de l'exécution de la tâche {tache.nom}: {e}")
+        finally:
+            if execution.succes is None:
+                execution.succes = False
+                execution.erreur = "Exécution interrompue"
+            execution.fin = datetime.utcnow()
+            execution.duree_ms = int((time.monotonic() - debut) * 1000)
+            # Enregistrer le résultat et libérer le bail même si la tâche a été interrompue
+            try:
+                async with async_session_maker() as db:
+                    await db.merge(execution)
+                    await self._liberer_bail(db, tache)
+                    await db.commit()
+            except Exception as e:
+                print(f"Erreur lors de l'enregistrement de l'exécution de la tâche {tache.nom}: {e}")
+
+        return execution
+
+    async def _acquerir_bail(self, db: AsyncSession, tache: TachePlanifiee, echeance: Optional[datetime]) -> bool:
+        """
+        Prend le bail de la tâche pour une échéance (ou pour une exécution manuelle)
+
+        Le bail n'est accordé que s'il a expiré et, pour une échéance planifiée, si aucun
+        worker n'a déjà pris en charge cette échéance. La condition est vérifiée par
+        l'UPDATE lui-même : deux workers ne peuvent pas l'obtenir en même temps.
+        """
+        maintenant = datetime.utcnow()
+        valeurs = {"detenteur": self.detenteur, "expire_le": maintenant + tache.duree_bail}
+        conditions = [VerrouTache.nom == tache.nom, VerrouTache.expire_le < maintenant]
+        if echeance is not None:
+            valeurs["echeance"] = echeance
+            conditions.append(VerrouTache.echeance < echeance)
+
+        result = await db.execute(update(VerrouTache).where(*conditions).values(**valeurs))
+        if result.rowcount == 1:
+            await db.commit()
+            return True
+
+        existe = await db.execute(select(VerrouTache.nom).where(VerrouTache.nom == tache.nom))
+        if existe.scalar_one_or_none() is not None:
+            await db.rollback()
+            return False
+
+        # Première exécution de la tâche : créer le bail (un seul worker réussit l'insertion)
+        db.add(VerrouTache(
+            nom=tache.nom,
+            detenteur=self.detenteur,
+            echeance=echeance or ECHEANCE_INITIALE,
+            expire_le=valeurs["expire_le"]
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return False
+        return True
+
+    async def _liberer_bail(self, db: AsyncSession, tache: TachePlanifiee) -> None:
+        """Fait expirer le bail détenu par ce worker (l'échéance prise en charge reste enregistrée)"""
+        await db.execute(
+            update(VerrouTache)
+            .where(VerrouTache.nom == tache.nom, VerrouTache.detenteur == self.detenteur)
+            .values(expire_le=datetime.utcnow())
+        )
+
+# Planificateur partagé par tout le processus
+planificateur = Planificateur(TACHES_PAR_DEFAUT)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Service de maintenance du registre des soldes de congés (table solde_ledger)
+"""
+
+import uuid
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, extract
+from sqlalchemy.dialects.sqlite import insert
+
+from models.solde_ledger import SoldeLedger
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.user import User
+
+# Colonne du registre alimentée par chaque statut (les autres statuts ne comptent pas)
+COLONNE_PAR_STATUT = {
+    StatutDemandeEnum.APPROUVEE: "jours_pris",
+    StatutDemandeEnum.EN_ATTENTE: "jours_en_attente",
+}
+
+class SoldeLedgerService:
+    """Service pour lire et maintenir les soldes de congés par utilisateur et par année"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enregistrer_transition(
+        self,
+        demandeur: Optional[User],
+        demande: DemandeConge,
+        ancien_statut: Optional[StatutDemandeEnum],
+        nouveau_statut: Optional[StatutDemandeEnum],
+        ancienne_date_debut: Optional[date] = None,
+        ancien_working_time: Optional[int] = None
+    ) -> None:
+        """
+        Répercute un changement de statut (ou de période) d'une demande sur le registre.
+
+        Ne fait pas de commit : l'appelant l'inclut dans la transaction du changement de statut.
+        Un statut à None représente la création (ancien) ou la suppression (nouveau) de la demande.
+        """
+        if not demandeur:
+            return
+
+        # Registre jamais construit pour cet utilisateur : il le sera complètement par la prochaine réconciliation
+        existe = await self.db.execute(
+            select(SoldeLedger.annee).where(SoldeLedger.user_id == demandeur.id).limit(1)
+        )
+        if existe.first() is None:
+            return
+
+        ancienne_date_debut = ancienne_date_debut or demande.date_debut
+        if ancien_working_time is None:
+            ancien_working_time = demande.working_time
+
+        mouvements = []
+        if ancien_statut in COLONNE_PAR_STATUT:
+            mouvements.append((ancienne_date_debut.year, COLONNE_PAR_STATUT[ancien_statut], -(ancien_working_time or 0)))
+        if nouveau_statut in COLONNE_PAR_STATUT:
+            mouvements.append((demande.date_debut.year, COLONNE_PAR_STATUT[nouveau_statut], demande.working_time or 0))
+
+        for annee, colonne, jours in mouvements:
+            if jours:
+                await self._ajouter(demandeur, annee, colonne, jours)
+
+    async def get_jours_pris(self, users: Iterable[User]) -> Dict[uuid.UUID, int]:
+        """Retourne le total des jours pris (toutes années confondues) de chaque utilisateur"""
+        totaux = await self.get_totaux(users)
+        return {user_id: jours_pris for user_id, (jours_pris, _) in totaux.items()}
+
+    async def get_solde_restant(self, user: User) -> int:
+        """Calcule le solde de congés restant d'un utilisateur à partir du registre"""
+        jours_pris = await self.get_jours_pris([user])
+        return user.calculate_solde_conges_restant_from_jours_pris(jours_pris.get(user.id, 0))
+
+    async def get_annee(self, user: User, annee: int) -> Tuple[int, int]:
+        """Retourne (jours pris, jours en attente) d'un utilisateur pour une année"""
+        result = await self.db.execute(
+            select(SoldeLedger.annee, SoldeLedger.jours_pris, SoldeLedger.jours_en_attente)
+            .where(SoldeLedger.user_id == user.id)
+        )
+        lignes = {ligne_annee: (jours_pris, jours_en_attente) for ligne_annee, jours_pris, jours_en_attente in result.all()}
+        if not lignes:
+            # Registre pas encore construit : calculer depuis les demandes
+            lignes = {cle[1]: valeurs for cle, valeurs in (await self._calculer([user])).items()}
+        return lignes.get(annee, (0, 0))
+
+    async def get_totaux(self, users: Iterable[User]) -> Dict[uuid.UUID, Tuple[int, int]]:
+        """
+        Retourne (jours pris, jours en attente) de chaque utilisateur, toutes années confondues
+
+        Lecture seule : les totaux des utilisateurs sans registre sont calculés depuis leurs
+        demandes, leur registre étant construit par la réconciliation (tâche planifiée ou script).
+        """
+        users = {user.id: user for user in users}
+        if not users:
+            return {}
+
+        result = await self.db.execute(
+            select(SoldeLedger.user_id, func.sum(SoldeLedger.jours_pris), func.sum(SoldeLedger.jours_en_attente))
+            .where(SoldeLedger.user_id.in_(list(users)))
+            .group_by(SoldeLedger.user_id)
+        )
+        totaux = {user_id: (jours_pris, jours_en_attente) for user_id, jours_pris, jours_en_attente in result.all()}
+
+        manquants = [user for user_id, user in users.items() if user_id not in totaux]
+        if manquants:
+            for (user_id, _), (jours_pris, jours_en_attente) in (await self._calculer(manquants)).items():
+                total_pris, total_en_attente = totaux.get(user_id, (0, 0))
+                totaux[user_id] = (total_pris + jours_pris, total_en_attente + jours_en_attente)
+
+        return totaux
+
+    async def reconcilier(self) -> List[dict]:
+        """
+        Compare le registre de tous les utilisateurs avec leurs demandes et corrige les écarts.
+
+        Construit le registre des utilisateurs qui n'en ont pas encore (une ligne est toujours
+        créée pour l'année courante, même sans demande, pour marquer le registre comme construit).
+        Retourne la liste des écarts corrigés sur les registres existants. Ne fait pas de commit.
+        """
+        users_result = await self.db.execute(select(User))
+        users = list(users_result.scalars().all())
+        attendu = await self._calculer(users)
+
+        existants_result = await self.db.execute(select(SoldeLedger))
+        existants = {(ligne.user_id, ligne.annee): ligne for ligne in existants_result.scalars().all()}
+        users_avec_registre = {user_id for user_id, _ in existants}
+
+        ecarts = []
+        for cle in set(attendu) | set(existants):
+            jours_pris, jours_en_attente = attendu.get(cle, (0, 0))
+            ligne = existants.get(cle)
+            if ligne is None:
+                ligne = SoldeLedger(user_id=cle[0], annee=cle[1], jours_pris=0, jours_en_attente=0)
+                self.db.add(ligne)
+            if (ligne.jours_pris, ligne.jours_en_attente) != (jours_pris, jours_en_attente):
+                # Un registre absent est simplement construit, ce n'est pas un écart
+                if cle[0] in users_avec_registre:
+                    ecarts.append({
+                        "user_id": cle[0],
+                        "annee": cle[1],
+                        "jours_pris": (ligne.jours_pris, jours_pris),
+                        "jours_en_attente": (ligne.jours_en_attente, jours_en_attente)
+                    })
+                ligne.jours_pris = jours_pris
+                ligne.jours_en_attente = jours_en_attente
+        await self.db.flush()
+
+        return ecarts
+
+    async def _calculer(self, users: List[User]) -> Dict[Tuple[uuid.UUID, int], Tuple[int, int]]:
+        """Calcule (jours pris, jours en attente) par (utilisateur, année) depuis les demandes"""
+        annee_courante = date.today().year
+        user_ids = [user.id for user in users]
+        attendu = {(user_id, annee_courante): [0, 0] for user_id in user_ids}
+
+        # Une seule requête agrégée ; les identifiants sont passés via IN car users.id
+        # et les clés étrangères n'ont pas le même format en base
+        annee = extract("year", DemandeConge.date_debut)
+        result = await self.db.execute(
+            select(DemandeConge.demandeur_id, annee, DemandeConge.statut, func.sum(DemandeConge.working_time))
+            .where(
+                DemandeConge.demandeur_id.in_(user_ids),
+                DemandeConge.statut.in_(list(COLONNE_PAR_STATUT))
+            )
+            .group_by(DemandeConge.demandeur_id, annee, DemandeConge.statut)
+        )
+        for user_id, annee_demande, statut, jours in result.all():
+            valeurs = attendu.setdefault((user_id, int(annee_demande)), [0, 0])
+            index = 0 if statut == StatutDemandeEnum.APPROUVEE else 1
+            valeurs[index] += jours or 0
+
+        return {cle: tuple(valeurs) for cle, valeurs in attendu.items()}
+
+    async def _ajouter(self, user: User, annee: int, colonne: str, jours: int) -> None:
+        """
+        Ajoute (ou retire) des jours à une colonne du registre, en créant la ligne si besoin
+
+        Une seule instruction INSERT ... ON CONFLICT DO UPDATE : deux transactions qui créent
+        la même ligne en même temps ne se heurtent pas à la clé primaire.
+        """
+        valeurs = {"user_id": user.id, "annee": annee, "jours_pris": 0, "jours_en_attente": 0, colonne: jours}
+        instruction = insert(SoldeLedger).values(**valeurs)
+        await self.db.execute(
+            instruction.on_conflict_do_update(
+                index_elements=[SoldeLedger.user_id, SoldeLedger.annee],
+                set_={colonne: getattr(SoldeLedger, colonne) + jours, "updated_at": datetime.utcnow()}
+            )
+        )
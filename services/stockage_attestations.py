@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Stockage des fichiers PDF des attestations (dossier local ou dossier partagé adressé par contenu)
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Iterator, List, NamedTuple, Optional, Set
+
+# Type de stockage ("local" ou "adresse_contenu") et dossier racine (configurables par variable d'environnement)
+TYPE_STOCKAGE = os.getenv("ATTESTATIONS_STOCKAGE", "local")
+DOSSIER_STOCKAGE = os.getenv("ATTESTATIONS_DOSSIER", "attestations")
+# Taille des morceaux lus lors de l'envoi d'un fichier
+TAILLE_MORCEAU = 64 * 1024
+
+class InfosFichier(NamedTuple):
+    taille: int
+    modifie_le: datetime  # UTC
+    etag: str
+
+class StockageAttestations(ABC):
+    """
+    Interface de stockage des attestations, indexées par nom de fichier
+
+    Les noms contiennent l'empreinte du contenu de l'attestation : un fichier n'est
+    jamais modifié, seulement créé ou supprimé. Un stockage objet (S3, GCS...) n'a qu'à
+    implémenter les mêmes méthodes.
+    """
+
+    async def existe(self, nom: str) -> bool:
+        return await self.infos(nom) is not None
+
+    @abstractmethod
+    async def infos(self, nom: str) -> Optional[InfosFichier]:
+        """Taille, date de modification et ETag du fichier (None s'il n'existe pas)"""
+
+    @abstractmethod
+    async def enregistrer(self, nom: str, contenu: bytes) -> None:
+        """Enregistre le fichier de façon atomique (un fichier visible est toujours complet)"""
+
+    @abstractmethod
+    async def lire(self, nom: str, debut: int = 0, fin: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Ouvre le fichier et retourne ses octets [debut, fin] (fin incluse, jusqu'à la fin du
+        fichier par défaut) par morceaux
+
+        Le fichier est ouvert avant le retour : lève FileNotFoundError s'il n'existe pas (ou
+        plus), et une suppression ultérieure n'interrompt pas la lecture.
+        """
+
+    async def lire_tout(self, nom: str) -> bytes:
+        return b"".join([morceau async for morceau in await self.lire(nom)])
+
+    @abstractmethod
+    async def supprimer_obsoletes(self, references: Set[str], delai_grace: float) -> int:
+        """
+        Supprime les fichiers qui ne sont référencés par aucune demande et plus anciens que delai_grace
+        (ainsi que les fichiers temporaires abandonnés). Retourne le nombre de fichiers supprimés.
+        """
+
+class StockageLocal(StockageAttestations):
+    """Fichiers rangés directement dans un dossier du disque local (ou d'un volume partagé)"""
+
+    def __init__(self, dossier: str):
+        self.dossier = dossier
+
+    def chemin(self, nom: str) -> str:
+        # Les noms viennent de l'URL de téléchargement : refuser tout ce qui sortirait du dossier
+        if not nom or nom != os.path.basename(nom) or nom.startswith("."):
+            raise FileNotFoundError(nom)
+        return os.path.join(self.dossier, nom)
+
+    def chemins_lecture(self, nom: str) -> List[str]:
+        """Emplacements où chercher un fichier existant, par ordre de préférence"""
+        return [self.chemin(nom)]
+
+    async def infos(self, nom: str) -> Optional[InfosFichier]:
+        try:
+            stat = await asyncio.to_thread(self._stat, nom)
+        except FileNotFoundError:
+            return None
+        return InfosFichier(
+            taille=stat.st_size,
+            modifie_le=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        )
+
+    async def enregistrer(self, nom: str, contenu: bytes) -> None:
+        await asyncio.to_thread(self._ecrire, self.chemin(nom), contenu)
+
+    async def lire(self, nom: str, debut: int = 0, fin: Optional[int] = None) -> AsyncIterator[bytes]:
+        fichier = await asyncio.to_thread(self._ouvrir, nom)
+        return self._lire_morceaux(fichier, debut, fin)
+
+    async def _lire_morceaux(self, fichier: BinaryIO, debut: int, fin: Optional[int]) -> AsyncIterator[bytes]:
+        try:
+            await asyncio.to_thread(fichier.seek, debut)
+            restant = None if fin is None else fin - debut + 1
+            while restant is None or restant > 0:
+                taille = TAILLE_MORCEAU if restant is None else min(TAILLE_MORCEAU, restant)
+                morceau = await asyncio.to_thread(fichier.read, taille)
+                if not morceau:
+                    break
+                if restant is not None:
+                    restant -= len(morceau)
+                yield morceau
+        finally:
+            fichier.close()
+
+    async def supprimer_obsoletes(self, references: Set[str], delai_grace: float) -> int:
+        return await asyncio.to_thread(self._supprimer_obsoletes, references, time.time() - delai_grace)
+
+    def _stat(self, nom: str) -> os.stat_result:
+        for chemin in self.chemins_lecture(nom):
+            try:
+                return os.stat(chemin)
+            except FileNotFoundError:
+                pass
+        raise FileNotFoundError(nom)
+
+    def _ouvrir(self, nom: str) -> BinaryIO:
+        for chemin in self.chemins_lecture(nom):
+            try:
+                return open(chemin, "rb")
+            except FileNotFoundError:
+                pass
+        raise FileNotFoundError(nom)
+
+    def _ecrire(self, chemin: str, contenu: bytes) -> None:
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        # Écrire dans un fichier temporaire puis le renommer
+        chemin_temporaire = f"{chemin}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(chemin_temporaire, "wb") as fichier:
+                fichier.write(contenu)
+            os.replace(chemin_temporaire, chemin)
+        finally:
+            if os.path.exists(chemin_temporaire):
+                os.remove(chemin_temporaire)
+
+    def _supprimer_obsoletes(self, references: Set[str], limite: float) -> int:
+        supprimes = 0
+        for chemin in self._fichiers():
+            if os.path.basename(chemin) in references:
+                continue
+            try:
+                if os.stat(chemin).st_mtime < limite:
+                    os.remove(chemin)
+                    supprimes += 1
+            except FileNotFoundError:
+                pass
+        return supprimes
+
+    def _fichiers(self) -> Iterator[str]:
+        """Chemins de tous les fichiers du stockage"""
+        try:
+            with os.scandir(self.dossier) as entrees:
+                for entree in entrees:
+                    if entree.is_file():
+                        yield entree.path
+        except FileNotFoundError:
+            pass
+
+class StockageAdresseContenu(StockageLocal):
+    """
+    Fichiers répartis dans des sous-dossiers d'après l'empreinte de leur nom (ab/cd/nom)
+
+    Le nom d'une attestation contenant l'empreinte de son contenu, un même fichier a le
+    même emplacement sur tous les nœuds : un dossier partagé (NFS, volume réseau) suffit
+    pour qu'ils se partagent les attestations. Les sous-dossiers évitent les répertoires
+    de plusieurs centaines de milliers d'entrées.
+
+    Les fichiers enregistrés à plat par StockageLocal avant le passage à ce stockage
+    restent lus à leur emplacement d'origine : les URL déjà enregistrées restent valides.
+    """
+
+    def chemin(self, nom: str) -> str:
+        chemin_dossier = super().chemin(nom)
+        empreinte = hashlib.sha256(nom.encode("utf-8")).hexdigest()
+        return os.path.join(os.path.dirname(chemin_dossier), empreinte[:2], empreinte[2:4], nom)
+
+    def chemins_lecture(self, nom: str) -> List[str]:
+        return [self.chemin(nom), super().chemin(nom)]
+
+    def _fichiers(self) -> Iterator[str]:
+        for racine, _, noms in os.walk(self.dossier):
+            for nom in noms:
+                yield os.path.join(racine, nom)
+
+def creer_stockage(type_stockage: str = TYPE_STOCKAGE, dossier: str = DOSSIER_STOCKAGE) -> StockageAttestations:
+    if type_stockage == "local":
+        return StockageLocal(dossier)
+    if type_stockage == "adresse_contenu":
+        return StockageAdresseContenu(dossier)
+    raise ValueError(f"Type de stockage des attestations inconnu: {type_stockage!r}")
+
+# Stockage partagé par tout le processus
+stockage_attestations = creer_stockage()
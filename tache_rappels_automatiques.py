@@ -2,6 +2,9 @@
 """
 Script pour envoyer les rappels automatiques de congés
 À exécuter quotidiennement (par exemple via cron ou tâche planifiée)
+
+L'API exécute déjà cette tâche chaque matin via son planificateur (services/planificateur.py) ;
+ce script reste utile pour un déclenchement manuel ou sans l'API.
 """
 
 import asyncio
@@ -0,0 +1,82 @@
+"""
+Fixtures des tests : application FastAPI sur une base SQLite en mémoire
+"""
+
+import asyncio
+import sys
+import uuid
+from datetime import date
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.database import Base, get_database
+from models.user import User, RoleEnum
+from routes import demandes_conges_router, departements_router, jours_feries_router
+from routes.attestations import router as attestations_router
+from routes.notifications import router as notifications_router
+from middlewares.error_handling import setup_error_handlers
+from utils.auth import current_active_user
+from utils.dependencies import get_current_user
+
+class ContexteTest:
+    """Base en mémoire, application de test et utilisateur connecté (modifiable par chaque test)"""
+
+    def __init__(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        self.session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.utilisateur_connecte = None
+
+        self.app = FastAPI()
+        setup_error_handlers(self.app)
+        self.app.include_router(demandes_conges_router, prefix="/api")
+        self.app.include_router(departements_router, prefix="/api")
+        self.app.include_router(jours_feries_router, prefix="/api")
+        self.app.include_router(notifications_router, prefix="/api")
+        self.app.include_router(attestations_router)
+        self.app.dependency_overrides[get_database] = self._get_database
+        self.app.dependency_overrides[get_current_user] = lambda: self.utilisateur_connecte
+        self.app.dependency_overrides[current_active_user] = lambda: self.utilisateur_connecte
+
+    async def _get_database(self):
+        async with self.session_maker() as session:
+            yield session
+
+    async def creer_tables(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def ajouter(self, *objets) -> None:
+        async with self.session_maker() as session:
+            session.add_all(objets)
+            await session.commit()
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test")
+
+def creer_utilisateur(role: RoleEnum, nom: str, departement_id: uuid.UUID = None) -> User:
+    return User(
+        id=uuid.uuid4(),
+        email=f"{nom.lower()}@entreprise.ci",
+        hashed_password="x",
+        nom=nom,
+        prenom="Test",
+        telephone="0102030405",
+        numero_piece_identite=f"CI-{uuid.uuid4().hex[:10]}",
+        role=role,
+        date_embauche=date(2015, 1, 1),
+        departement_id=departement_id
+    )
+
+@pytest.fixture
+def contexte():
+    contexte = ContexteTest()
+    asyncio.run(contexte.creer_tables())
+    yield contexte
+    asyncio.run(contexte.engine.dispose())
@@ -0,0 +1,59 @@
+"""
+Tests de la table d'occupation journalière des absences
+"""
+
+import asyncio
+import uuid
+from datetime import date
+
+from models.demande_conge import StatutDemandeEnum
+from models.departement import Departement
+from models.user import RoleEnum
+from services.absence_jour_service import AbsenceJourService
+from services.planificateur import TACHES_PAR_DEFAUT
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_initialisation_de_la_table_vide(contexte):
+    """Des demandes approuvées sans jours d'absence (base antérieure à la table) sont dépliées au démarrage, une seule fois"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+
+    async def scenario():
+        await contexte.ajouter(departement, employe)
+        async with contexte.session_maker() as session:
+            sans_demande = await AbsenceJourService(session).initialiser_si_vide()
+
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(employe.id, StatutDemandeEnum.REFUSEE)
+        )
+        async with contexte.session_maker() as session:
+            premiere = await AbsenceJourService(session).initialiser_si_vide()
+            await session.commit()
+        async with contexte.session_maker() as session:
+            seconde = await AbsenceJourService(session).initialiser_si_vide()
+            effectifs = await AbsenceJourService(session).compter_par_jour(
+                departement.id, date(2025, 7, 11), date(2025, 7, 12)
+            )
+        return sans_demande, premiere, seconde, effectifs
+
+    sans_demande, premiere, seconde, effectifs = asyncio.run(scenario())
+
+    assert sans_demande is None
+    assert premiere == 11
+    assert seconde is None
+    assert effectifs == {date(2025, 7, 11): 1, date(2025, 7, 12): 0}
+
+def test_reconstruction_planifiee(contexte):
+    """La tâche nocturne reconstruit entièrement les jours d'absence à partir des demandes approuvées"""
+    taches = {tache.nom: tache for tache in TACHES_PAR_DEFAUT}
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(creer_demande(employe.id, StatutDemandeEnum.APPROUVEE))
+        async with contexte.session_maker() as session:
+            return await taches["reconstruction_absence_jour"].fonction(session)
+
+    assert asyncio.run(scenario()) == "11 jour(s) d'absence reconstruit(s)"
@@ -0,0 +1,52 @@
+"""
+Tests de l'arbre d'intervalles
+"""
+
+import random
+from datetime import date, timedelta
+
+from utils.arbre_intervalles import ArbreIntervalles
+
+def chevauchements_naifs(intervalles, debut, fin):
+    return sorted(
+        (intervalle_debut, cle) for cle, (intervalle_debut, intervalle_fin) in intervalles.items()
+        if intervalle_debut <= fin and intervalle_fin >= debut
+    )
+
+def test_operations_aleatoires_comparees_au_parcours_naif():
+    """Insertions, remplacements, retraits et recherches aléatoires comparés à une recherche exhaustive"""
+    aleatoire = random.Random(20250701)
+    origine = date(2025, 1, 1)
+    arbre = ArbreIntervalles()
+    intervalles = {}
+
+    for _ in range(3000):
+        operation = aleatoire.random()
+        if operation < 0.45:
+            cle = aleatoire.randrange(300)
+            debut = origine + timedelta(days=aleatoire.randrange(365))
+            fin = debut + timedelta(days=aleatoire.randrange(30))
+            arbre.inserer(cle, debut, fin, (debut, cle))
+            intervalles[cle] = (debut, fin)
+        elif operation < 0.7:
+            cle = aleatoire.randrange(300)
+            assert arbre.retirer(cle) == (intervalles.pop(cle, None) is not None)
+        else:
+            debut = origine + timedelta(days=aleatoire.randrange(-10, 380))
+            fin = debut + timedelta(days=aleatoire.randrange(60))
+            resultats = arbre.chevauchements(debut, fin)
+            # Les résultats sont triés par date de début
+            assert [resultat[0] for resultat in resultats] == sorted(resultat[0] for resultat in resultats)
+            assert sorted(resultats) == chevauchements_naifs(intervalles, debut, fin)
+
+        assert len(arbre) == len(intervalles)
+
+def test_bornes_incluses():
+    """Un intervalle qui touche la période par une de ses bornes la chevauche"""
+    arbre = ArbreIntervalles()
+    arbre.inserer("a", date(2025, 7, 1), date(2025, 7, 10), "a")
+
+    assert arbre.chevauchements(date(2025, 7, 10), date(2025, 7, 20)) == ["a"]
+    assert arbre.chevauchements(date(2025, 6, 20), date(2025, 7, 1)) == ["a"]
+    assert arbre.chevauchements(date(2025, 7, 11), date(2025, 7, 20)) == []
+    assert arbre.chevauchements(date(2025, 6, 20), date(2025, 6, 30)) == []
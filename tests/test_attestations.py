@@ -0,0 +1,334 @@
+"""
+Tests du stockage et du téléchargement des attestations
+"""
+
+import asyncio
+import io
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+import routes.attestations as module_attestations
+import services.attestation_service as module_attestation_service
+import services.planificateur as module_planificateur
+from models.demande_conge import StatutDemandeEnum
+from models.user import RoleEnum
+from services.attestation_service import (
+    DELAI_GRACE_NETTOYAGE, DelaiGenerationDepasse, DonneesAttestation, FileAttestationsPleine,
+    GenerateurAttestations, compiler_modele, initialiser_processus_rendu, nom_fichier_attestation,
+    rendre_attestation_octets
+)
+from services.stockage_attestations import StockageAdresseContenu, StockageAttestations, StockageLocal
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+CONTENU = bytes(range(256)) * 4
+
+@pytest.fixture
+def stockage(tmp_path, monkeypatch):
+    stockage = StockageAdresseContenu(str(tmp_path))
+    monkeypatch.setattr(module_attestations, "stockage_attestations", stockage)
+    return stockage
+
+def telecharger(contexte, nom, headers=None):
+    async def scenario():
+        async with contexte.client() as client:
+            return await client.get(f"/attestations/{nom}", headers=headers or {})
+    return asyncio.run(scenario())
+
+def test_stockage_incomplet_refuse_a_la_creation():
+    """Un stockage qui n'implémente pas toute l'interface ne peut pas être instancié"""
+    class StockageSansLecture(StockageAttestations):
+        async def infos(self, nom):
+            return None
+
+        async def enregistrer(self, nom, contenu):
+            pass
+
+        async def supprimer_obsoletes(self, references, delai_grace):
+            return 0
+
+    with pytest.raises(TypeError):
+        StockageSansLecture()
+
+def test_fichiers_a_plat_lus_apres_passage_a_l_adresse_contenu(contexte, stockage, tmp_path):
+    """Les attestations enregistrées par StockageLocal restent téléchargeables après le changement de stockage"""
+    asyncio.run(StockageLocal(str(tmp_path)).enregistrer("ancienne.pdf", CONTENU))
+    asyncio.run(stockage.enregistrer("nouvelle.pdf", CONTENU))
+
+    assert os.path.exists(tmp_path / "ancienne.pdf")
+    assert not os.path.exists(tmp_path / "nouvelle.pdf")
+    for nom in ("ancienne.pdf", "nouvelle.pdf"):
+        response = telecharger(contexte, nom)
+        assert response.status_code == 200
+        assert response.content == CONTENU
+
+def test_plages(contexte, stockage):
+    """Plage valide : 206 ; plage invalide : ignorée (200) ; plage hors du fichier : 416"""
+    asyncio.run(stockage.enregistrer("a.pdf", CONTENU))
+
+    partielle = telecharger(contexte, "a.pdf", {"Range": "bytes=2-4"})
+    assert partielle.status_code == 206
+    assert partielle.content == CONTENU[2:5]
+
+    fin = telecharger(contexte, "a.pdf", {"Range": "bytes=-10"})
+    assert fin.status_code == 206
+    assert fin.content == CONTENU[-10:]
+
+    invalide = telecharger(contexte, "a.pdf", {"Range": "bytes=5-3"})
+    assert invalide.status_code == 200
+    assert invalide.content == CONTENU
+
+    hors_fichier = telecharger(contexte, "a.pdf", {"Range": f"bytes={len(CONTENU)}-"})
+    assert hors_fichier.status_code == 416
+    assert hors_fichier.headers["content-range"] == f"bytes */{len(CONTENU)}"
+
+def test_requetes_conditionnelles(contexte, stockage):
+    """If-None-Match (prioritaire) et If-Modified-Since : 304 sans contenu ; If-Range périmé : fichier entier"""
+    asyncio.run(stockage.enregistrer("a.pdf", CONTENU))
+
+    complete = telecharger(contexte, "a.pdf")
+    etag, last_modified = complete.headers["etag"], complete.headers["last-modified"]
+    assert complete.status_code == 200
+    assert complete.headers["cache-control"] == "private, max-age=86400"
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'"autre", W/{etag}'},
+        {"If-None-Match": "*"},
+        {"If-Modified-Since": last_modified},
+    ):
+        non_modifie = telecharger(contexte, "a.pdf", headers)
+        assert non_modifie.status_code == 304, headers
+        assert non_modifie.content == b""
+        assert non_modifie.headers["etag"] == etag
+
+    # If-None-Match l'emporte sur If-Modified-Since
+    assert telecharger(contexte, "a.pdf", {"If-None-Match": '"autre"', "If-Modified-Since": last_modified}).status_code == 200
+    assert telecharger(contexte, "a.pdf", {"If-Modified-Since": "pas une date"}).status_code == 200
+
+    a_jour = telecharger(contexte, "a.pdf", {"Range": "bytes=0-9", "If-Range": etag})
+    assert a_jour.status_code == 206
+    perime = telecharger(contexte, "a.pdf", {"Range": "bytes=0-9", "If-Range": '"autre"'})
+    assert perime.status_code == 200
+    assert perime.content == CONTENU
+
+    async def entetes():
+        async with contexte.client() as client:
+            return await client.head("/attestations/a.pdf")
+
+    head = asyncio.run(entetes())
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(CONTENU))
+    assert head.headers["etag"] == etag
+
+def test_fichier_supprime_apres_lecture_des_infos(contexte, stockage, monkeypatch):
+    """Un fichier supprimé entre la lecture de ses infos et son ouverture donne une 404"""
+    asyncio.run(stockage.enregistrer("a.pdf", CONTENU))
+    infos = stockage.infos
+
+    async def infos_puis_suppression(nom):
+        resultat = await infos(nom)
+        os.remove(stockage.chemin(nom))
+        return resultat
+
+    monkeypatch.setattr(stockage, "infos", infos_puis_suppression)
+
+    assert telecharger(contexte, "a.pdf").status_code == 404
+
+def creer_donnees(nom: str) -> DonneesAttestation:
+    return DonneesAttestation(
+        demande_id=uuid.uuid4(), user_id=uuid.uuid4(), nom=nom, prenom="Test", role="employe",
+        date_debut=date(2025, 7, 1), date_fin=date(2025, 7, 11), date_generation=date(2025, 6, 1)
+    )
+
+@pytest.fixture
+def generateur(tmp_path):
+    """Générateur sur un stockage temporaire, dont le rendu renvoie un contenu propre à chaque attestation"""
+    generateur = GenerateurAttestations(stockage=StockageLocal(str(tmp_path)))
+    generateur.rendus = []
+
+    async def rendre(donnees):
+        generateur.rendus.append(donnees.nom)
+        await asyncio.sleep(0)
+        return f"PDF {donnees.nom}".encode() * 100
+
+    generateur.rendre = rendre
+    return generateur
+
+def test_attestation_rendue_une_seule_fois(generateur):
+    """Les demandes simultanées puis suivantes d'une même attestation se partagent un seul rendu"""
+    donnees = creer_donnees("Kone")
+
+    async def scenario():
+        simultanees = await asyncio.gather(*(generateur.obtenir(donnees) for _ in range(3)))
+        return simultanees + [await generateur.obtenir(donnees)]
+
+    noms = asyncio.run(scenario())
+
+    assert noms == [nom_fichier_attestation(donnees)] * 4
+    assert generateur.rendus == ["Kone"]
+
+def test_nom_tire_du_contenu_de_l_attestation(generateur, monkeypatch):
+    """Une nouvelle date de génération réutilise le PDF existant ; un changement de contenu ou de modèle en produit un autre"""
+    donnees = creer_donnees("Kone")
+
+    async def scenario():
+        noms = [
+            await generateur.obtenir(donnees),
+            await generateur.obtenir(donnees._replace(date_generation=date(2025, 6, 20))),
+            await generateur.obtenir(donnees._replace(date_fin=date(2025, 7, 12))),
+            await generateur.obtenir(donnees._replace(nom="Kone Epouse Traore")),
+        ]
+        monkeypatch.setattr(module_attestation_service, "VERSION_MODELE", "2")
+        return noms + [await generateur.obtenir(donnees)]
+
+    noms = asyncio.run(scenario())
+
+    assert noms[0] == noms[1]
+    assert len(set(noms)) == 4
+    assert generateur.rendus == ["Kone", "Kone", "Kone Epouse Traore", "Kone"]
+
+def test_rendu_depuis_le_modele_precompile(monkeypatch):
+    """Le modèle est compilé une fois par processus ; chaque PDF recopie sa partie fixe et y ajoute les champs variables"""
+    from reportlab import rl_config
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    # initialiser_processus_rendu modifie la configuration globale de reportlab
+    monkeypatch.setattr(rl_config, "useA85", rl_config.useA85)
+    compiler_modele.cache_clear()
+    initialiser_processus_rendu()
+    kone, traore = creer_donnees("Kone"), creer_donnees("Traore")._replace(role=None, date_generation=date(2025, 6, 20))
+    pdfs = [rendre_attestation_octets(kone), rendre_attestation_octets(traore)]
+
+    modele = compiler_modele()
+    assert compiler_modele.cache_info().misses == 1
+    for pdf, donnees in zip(pdfs, (kone, traore)):
+        assert pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF")
+        # Les noms internes des polices utilisés par la partie fixe désignent les bonnes polices
+        assert re.search(rb"/BaseFont /Helvetica-Bold [^>]*/Name /F2", pdf)
+        page = zlib.decompressobj().decompress(pdf[pdf.index(b"stream\n") + 7:]).decode("latin-1")
+        assert modele.operateurs_fixes in page
+        assert f"Monsieur/Madame {donnees.nom} Test" in page
+        assert f"en qualit\\351 de {donnees.role or 'employe'} " in page
+        assert f"le {donnees.date_generation.strftime('%d/%m/%Y')}) Tj" in page
+    # Date alignée à droite quelle que soit sa valeur
+    assert modele.x_date + stringWidth("Fait à Abidjan, le 20/06/2025", "Helvetica", 12) == pytest.approx(
+        modele.largeur - modele.marge
+    )
+
+def lire_archive(generateur, lot):
+    async def scenario():
+        return b"".join([morceau async for morceau in generateur.flux_zip(lot)])
+    return asyncio.run(scenario())
+
+def test_archive_sans_descripteur_de_donnees(generateur):
+    """Chaque membre de l'archive porte son CRC et sa taille dans son en-tête local"""
+    lot = [creer_donnees("Kone"), creer_donnees("Traore")]
+
+    contenu = lire_archive(generateur, lot)
+
+    with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+        assert archive.testzip() is None
+        membres = {membre.filename: membre for membre in archive.infolist()}
+        assert set(membres) == {nom_fichier_attestation(donnees) for donnees in lot}
+        for donnees in lot:
+            membre = membres[nom_fichier_attestation(donnees)]
+            assert archive.read(membre) == f"PDF {donnees.nom}".encode() * 100
+            assert membre.flag_bits & 0x08 == 0
+            # En-tête local : drapeaux (octet 6), CRC (octet 14) et tailles renseignés
+            signature, _, drapeaux, _, _, _, crc, taille_compressee, taille = struct.unpack(
+                "<IHHHHHIII", contenu[membre.header_offset:membre.header_offset + 26]
+            )
+            assert signature == 0x04034B50
+            assert drapeaux & 0x08 == 0
+            assert (crc, taille_compressee, taille) == (membre.CRC, membre.file_size, membre.file_size)
+
+def test_attestation_supprimee_avant_lecture_rendue_a_nouveau(generateur):
+    """Un fichier supprimé par le nettoyage entre son obtention et sa lecture est rendu à nouveau"""
+    donnees = creer_donnees("Kone")
+    obtenir = generateur.obtenir
+
+    async def obtenir_puis_nettoyage(donnees):
+        pdf_filename = await obtenir(donnees)
+        os.remove(generateur.stockage.chemin(pdf_filename))
+        return pdf_filename
+
+    generateur.obtenir = obtenir_puis_nettoyage
+
+    with zipfile.ZipFile(io.BytesIO(lire_archive(generateur, [donnees]))) as archive:
+        assert archive.namelist() == [nom_fichier_attestation(donnees)]
+        assert archive.read(nom_fichier_attestation(donnees)) == b"PDF Kone" * 100
+    assert generateur.rendus == ["Kone", "Kone"]
+    assert os.path.exists(generateur.stockage.chemin(nom_fichier_attestation(donnees)))
+
+def test_delais_du_pool_de_rendu(monkeypatch):
+    """Rendu trop long : 504 côté appelant mais place gardée jusqu'à la fin réelle ; pool saturé : file pleine"""
+    fin_du_rendu_lent = threading.Event()
+
+    def rendre_attestation_octets(donnees):
+        if donnees.nom == "Lent":
+            fin_du_rendu_lent.wait(5)
+        return f"PDF {donnees.nom}".encode()
+
+    monkeypatch.setattr(module_attestation_service, "rendre_attestation_octets", rendre_attestation_octets)
+    monkeypatch.setattr(module_attestation_service, "DELAI_GENERATION", 0.05)
+    monkeypatch.setattr(module_attestation_service, "DELAI_ATTENTE_FILE", 0.05)
+    # Pool de threads à la place des processus : le rendu simulé n'a pas à être importable par spawn
+    generateur = GenerateurAttestations(taille_pool=1, taille_max_file=0)
+    generateur._creer_pool = lambda: ThreadPoolExecutor(max_workers=1)
+
+    async def issue(donnees):
+        try:
+            return await generateur.rendre(donnees)
+        except (DelaiGenerationDepasse, FileAttestationsPleine) as e:
+            return type(e)
+
+    async def scenario():
+        await generateur.demarrer()
+        try:
+            issues = [await issue(creer_donnees("Lent")), await issue(creer_donnees("Rapide"))]
+            fin_du_rendu_lent.set()
+            await asyncio.sleep(0.1)
+            issues.append(await issue(creer_donnees("Rapide")))
+        finally:
+            fin_du_rendu_lent.set()
+            await generateur.arreter()
+        return issues
+
+    assert asyncio.run(scenario()) == [DelaiGenerationDepasse, FileAttestationsPleine, b"PDF Rapide"]
+
+def test_nettoyage_des_attestations_obsoletes(contexte, tmp_path, monkeypatch):
+    """Seuls les fichiers anciens qui ne sont plus l'attestation d'un congé valable sont supprimés"""
+    stockage = StockageLocal(str(tmp_path))
+    monkeypatch.setattr(module_planificateur, "stockage_attestations", stockage)
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    approuvee = creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+    approuvee.attestation_pdf = "approuvee.pdf"
+    refusee = creer_demande(employe.id, StatutDemandeEnum.REFUSEE)
+    refusee.attestation_pdf = "refusee.pdf"
+    taches = {tache.nom: tache for tache in module_planificateur.TACHES_PAR_DEFAUT}
+
+    async def scenario():
+        for nom in ("approuvee.pdf", "refusee.pdf", "remplacee.pdf", "recente.pdf"):
+            await stockage.enregistrer(nom, CONTENU)
+        ancien = time.time() - DELAI_GRACE_NETTOYAGE - 60
+        for nom in ("approuvee.pdf", "refusee.pdf", "remplacee.pdf"):
+            os.utime(stockage.chemin(nom), (ancien, ancien))
+        await contexte.ajouter(employe)
+        await contexte.ajouter(approuvee, refusee)
+        async with contexte.session_maker() as session:
+            return await taches["nettoyage_attestations"].fonction(session)
+
+    assert asyncio.run(scenario()) == "2 attestation(s) obsolète(s) supprimée(s)"
+    assert sorted(os.listdir(tmp_path)) == ["approuvee.pdf", "recente.pdf"]
@@ -0,0 +1,96 @@
+"""
+Tests de la détection des conflits de congés d'équipe
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from models.demande_conge import StatutDemandeEnum
+from models.departement import Departement
+from models.user import RoleEnum
+from services.conflit_service import moteur_conflits
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+@pytest.fixture(autouse=True)
+def arbres_vides():
+    moteur_conflits.invalider()
+    yield
+    moteur_conflits.invalider()
+
+def test_route_conflits(contexte):
+    """La route renvoie les congés actifs des collègues qui chevauchent la période, sans ceux de l'utilisateur"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue", departement.id)
+    externe = creer_utilisateur(RoleEnum.EMPLOYE, "Externe")
+    conge_collegue = creer_demande(collegue.id, StatutDemandeEnum.APPROUVEE)
+    contexte.utilisateur_connecte = employe
+
+    async def scenario():
+        await contexte.ajouter(departement, employe, collegue, externe)
+        await contexte.ajouter(
+            conge_collegue,
+            creer_demande(collegue.id, StatutDemandeEnum.REFUSEE),
+            creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE),
+            creer_demande(externe.id, StatutDemandeEnum.APPROUVEE)
+        )
+        async with contexte.client() as client:
+            chevauchement = await client.get("/api/demandes-conges/conflits",
+                                             params={"date_debut": "2025-07-11", "date_fin": "2025-07-20"})
+            sans_chevauchement = await client.get("/api/demandes-conges/conflits",
+                                                  params={"date_debut": "2025-07-12", "date_fin": "2025-07-20"})
+            invalide = await client.get("/api/demandes-conges/conflits",
+                                        params={"date_debut": "2025-07-20", "date_fin": "2025-07-12"})
+        return chevauchement, sans_chevauchement, invalide
+
+    chevauchement, sans_chevauchement, invalide = asyncio.run(scenario())
+
+    assert chevauchement.status_code == 200
+    conflits = chevauchement.json()
+    assert [conflit["demande_id"] for conflit in conflits] == [str(conge_collegue.id)]
+    assert conflits[0]["user"]["nom"] == "Collegue"
+    assert sans_chevauchement.json() == []
+    assert invalide.status_code == 400
+
+def test_arbre_modifie_seulement_apres_commit(contexte):
+    """Une transition n'apparaît dans l'arbre qu'après le commit, jamais après un rollback"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue", departement.id)
+
+    async def conflits():
+        async with contexte.session_maker() as session:
+            conges = await moteur_conflits.trouver_conflits(
+                session, departement.id, creer_demande(employe.id, None).date_debut,
+                creer_demande(employe.id, None).date_fin, exclure_user_id=employe.id
+            )
+        return [conge.demande_id for conge in conges]
+
+    async def scenario():
+        await contexte.ajouter(departement, employe, collegue)
+        # Charger l'arbre du département (vide)
+        etats = [await conflits()]
+
+        async with contexte.session_maker() as session:
+            annulee = creer_demande(collegue.id, StatutDemandeEnum.EN_ATTENTE)
+            session.add(annulee)
+            await moteur_conflits.enregistrer_transition(session, collegue, annulee, StatutDemandeEnum.EN_ATTENTE)
+            etats.append(await conflits())
+            await session.rollback()
+        etats.append(await conflits())
+
+        async with contexte.session_maker() as session:
+            validee = creer_demande(collegue.id, StatutDemandeEnum.EN_ATTENTE)
+            session.add(validee)
+            await moteur_conflits.enregistrer_transition(session, collegue, validee, StatutDemandeEnum.EN_ATTENTE)
+            etats.append(await conflits())
+            await session.commit()
+        etats.append(await conflits())
+        return etats, validee.id
+
+    etats, validee_id = asyncio.run(scenario())
+
+    assert etats == [[], [], [], [], [validee_id]]
@@ -0,0 +1,62 @@
+"""
+Tests des expressions cron du planificateur
+"""
+
+from datetime import datetime
+
+import pytest
+
+from utils.cron import ExpressionCron
+
+def echeances(expression: str, depart: datetime, nombre: int):
+    cron = ExpressionCron(expression)
+    resultats = []
+    for _ in range(nombre):
+        depart = cron.prochaine_echeance(depart)
+        resultats.append(depart)
+    return resultats
+
+def test_champs_plages_pas_et_listes():
+    """Plages, pas, listes et alias du dimanche donnent les valeurs attendues"""
+    cron = ExpressionCron("*/15 8-10,14 1,15 */3 1-5")
+
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.heures == {8, 9, 10, 14}
+    assert cron.jours == {1, 15}
+    assert cron.mois == {1, 4, 7, 10}
+    assert cron.jours_semaine == {1, 2, 3, 4, 5}
+    assert ExpressionCron("0 0 * * 5-7").jours_semaine == {5, 6, 0}
+    assert ExpressionCron("10-40/10 0 * * *").minutes == {10, 20, 30, 40}
+    assert ExpressionCron("5/20 0 * * *").minutes == {5, 25, 45}
+
+@pytest.mark.parametrize("expression", [
+    "* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8",
+    "5-1 * * * *", "*/0 * * * *", "a * * * *", "1-x * * * *",
+])
+def test_expressions_invalides(expression):
+    with pytest.raises(ValueError):
+        ExpressionCron(expression)
+
+def test_prochaines_echeances():
+    """Échéances strictement postérieures, passage de mois et d'année, jour de la semaine (0 = dimanche)"""
+    # Lundi 30 décembre 2024, 7 h 00
+    depart = datetime(2024, 12, 30, 7, 0)
+
+    assert echeances("0 7 * * *", depart, 2) == [datetime(2024, 12, 31, 7, 0), datetime(2025, 1, 1, 7, 0)]
+    assert echeances("30 2 * * *", datetime(2024, 12, 30, 2, 29, 59), 1) == [datetime(2024, 12, 30, 2, 30)]
+    # Dimanches à 3 h (purge hebdomadaire)
+    assert echeances("0 3 * * 0", depart, 2) == [datetime(2025, 1, 5, 3, 0), datetime(2025, 1, 12, 3, 0)]
+    assert echeances("0 3 * * 7", depart, 1) == [datetime(2025, 1, 5, 3, 0)]
+    # Jours ouvrés toutes les 20 minutes entre 18 h et 19 h : le vendredi soir enchaîne sur le lundi
+    assert echeances("*/20 18 * * 1-5", datetime(2025, 1, 3, 18, 40), 2) == [
+        datetime(2025, 1, 6, 18, 0), datetime(2025, 1, 6, 18, 20)
+    ]
+    # 29 février : prochaine année bissextile
+    assert echeances("0 0 29 2 *", depart, 1) == [datetime(2028, 2, 29, 0, 0)]
+
+def test_jour_du_mois_ou_jour_de_la_semaine():
+    """Jour du mois et jour de la semaine restreints tous deux : l'un ou l'autre suffit (comme cron)"""
+    # Le 15 du mois ou le lundi
+    assert echeances("0 9 15 * 1", datetime(2025, 1, 7, 10, 0), 3) == [
+        datetime(2025, 1, 13, 9, 0), datetime(2025, 1, 15, 9, 0), datetime(2025, 1, 20, 9, 0)
+    ]
@@ -0,0 +1,117 @@
+"""
+Tests des compteurs précalculés du dashboard DRH
+"""
+
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from models.dashboard_snapshot import DashboardSnapshot
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.departement import Departement
+from models.user import RoleEnum
+from services.absence_jour_service import AbsenceJourService
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_lecture_sans_ecriture_puis_reconstruction(contexte):
+    """Les lignes manquantes sont calculées à la lecture sans être enregistrées ; reconstruire() les enregistre"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+
+    async def compter_lignes():
+        async with contexte.session_maker() as session:
+            return (await session.execute(select(func.count()).select_from(DashboardSnapshot))).scalar_one()
+
+    async def scenario():
+        await contexte.ajouter(departement, employe)
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE),
+            creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+        )
+        async with contexte.session_maker() as session:
+            snapshots = await DashboardSnapshotService(session).get_snapshots([departement])
+            lu = snapshots[departement.id]
+            compteurs_lus = (lu.en_attente, lu.approuvee, lu.nombre_employes)
+            await session.commit()
+        lignes_apres_lecture = await compter_lignes()
+
+        async with contexte.session_maker() as session:
+            await DashboardSnapshotService(session).reconstruire()
+            await session.commit()
+        async with contexte.session_maker() as session:
+            enregistre = await session.get(DashboardSnapshot, departement.id)
+            compteurs_enregistres = (enregistre.en_attente, enregistre.approuvee, enregistre.nombre_employes)
+        return compteurs_lus, lignes_apres_lecture, compteurs_enregistres
+
+    compteurs_lus, lignes_apres_lecture, compteurs_enregistres = asyncio.run(scenario())
+
+    assert compteurs_lus == (1, 1, 1)
+    assert lignes_apres_lecture == 0
+    assert compteurs_enregistres == (1, 1, 1)
+
+def test_transition_du_jour_recalculee_dans_la_transaction(contexte):
+    """Un congé approuvé en cours met à jour les absences du jour de la ligne enregistrée, sans la périmer"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    demande = creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE)
+    demande.date_debut = date.today() - timedelta(days=1)
+    demande.date_fin = date.today() + timedelta(days=1)
+
+    async def scenario():
+        await contexte.ajouter(departement, employe)
+        await contexte.ajouter(demande)
+        async with contexte.session_maker() as session:
+            await DashboardSnapshotService(session).reconstruire()
+            await session.commit()
+
+        async with contexte.session_maker() as session:
+            approuvee = await session.get(DemandeConge, demande.id)
+            approuvee.statut = StatutDemandeEnum.APPROUVEE
+            await AbsenceJourService(session).enregistrer_transition(
+                employe, approuvee, StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE
+            )
+            await DashboardSnapshotService(session).enregistrer_transition(
+                employe, approuvee, StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE
+            )
+            await session.commit()
+
+        async with contexte.session_maker() as session:
+            ligne = await session.get(DashboardSnapshot, departement.id)
+            return ligne.en_attente, ligne.approuvee, ligne.employes_en_conge, ligne.date_reference
+
+    assert asyncio.run(scenario()) == (0, 1, 1, date.today())
+
+def test_changement_de_departement_reconstruit_seulement_les_departements_concernes(contexte):
+    """L'affectation d'un chef reconstruit l'ancien et le nouveau département, sans supprimer les autres lignes"""
+    ancien = Departement(id=uuid.uuid4(), nom="Informatique")
+    nouveau = Departement(id=uuid.uuid4(), nom="Comptabilite")
+    autre = Departement(id=uuid.uuid4(), nom="Juridique")
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh")
+    chef = creer_utilisateur(RoleEnum.CHEF_SERVICE, "Chef", ancien.id)
+    juriste = creer_utilisateur(RoleEnum.EMPLOYE, "Juriste", autre.id)
+    contexte.utilisateur_connecte = drh
+
+    async def scenario():
+        await contexte.ajouter(ancien, nouveau, autre, drh, chef, juriste)
+        await contexte.ajouter(creer_demande(chef.id, StatutDemandeEnum.EN_ATTENTE))
+        async with contexte.session_maker() as session:
+            await DashboardSnapshotService(session).reconstruire()
+            await session.commit()
+
+        async with contexte.client() as client:
+            response = await client.put(f"/api/departements/{nouveau.id}/chef", params={"chef_id": str(chef.id)})
+
+        async with contexte.session_maker() as session:
+            lignes = (await session.execute(select(DashboardSnapshot))).scalars().all()
+            return response, {
+                ligne.departement_id: (ligne.nombre_employes, ligne.en_attente) for ligne in lignes
+            }
+
+    response, lignes = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert lignes == {ancien.id: (0, 0), nouveau.id: (1, 1), autre.id: (1, 0)}
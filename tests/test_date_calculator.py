@@ -0,0 +1,36 @@
+"""
+Tests du calcul des jours ouvrables
+"""
+
+from datetime import date, timedelta
+
+from utils.date_calculator import calculate_working_days, get_holidays_for_year
+
+def compter_jour_par_jour(debut: date, fin: date) -> int:
+    """Ancien calcul : parcours de chaque jour de la période"""
+    jours_feries = set(get_holidays_for_year(debut.year)) | set(get_holidays_for_year(fin.year))
+    nombre = 0
+    jour = debut
+    while jour <= fin:
+        if jour.weekday() < 5 and jour not in jours_feries:
+            nombre += 1
+        jour += timedelta(days=1)
+    return nombre
+
+def test_identique_au_parcours_jour_par_jour():
+    """Même résultat que le parcours jour par jour, y compris à cheval sur deux années et sur des jours fériés"""
+    periodes = [
+        (date(2024, 12, 20), date(2025, 1, 10)),  # Noël et jour de l'an
+        (date(2025, 4, 18), date(2025, 4, 25)),   # Lundi de Pâques
+        (date(2025, 7, 28), date(2025, 8, 15)),   # Indépendance et Assomption
+        (date(2025, 12, 24), date(2026, 1, 2)),
+        (date(2025, 5, 1), date(2025, 5, 1)),     # Un seul jour, férié
+        (date(2025, 5, 3), date(2025, 5, 4)),     # Week-end seul
+    ]
+    for debut in (date(2024, 11, 1) + timedelta(days=decalage) for decalage in range(0, 120, 7)):
+        periodes.append((debut, debut + timedelta(days=45)))
+
+    for debut, fin in periodes:
+        assert calculate_working_days(debut, fin) == compter_jour_par_jour(debut, fin), (debut, fin)
+
+    assert calculate_working_days(date(2025, 1, 10), date(2025, 1, 9)) == 0
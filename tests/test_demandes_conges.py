@@ -0,0 +1,147 @@
+"""
+Tests des routes des demandes de congés
+"""
+
+import asyncio
+import uuid
+from datetime import date
+
+from sqlalchemy import event
+
+from models.demande_conge import DemandeConge, StatutDemandeEnum, TypeCongeEnum
+from models.departement import Departement
+from models.user import RoleEnum
+from routes.demandes_conges import select_demande_chevauchante
+from tests.conftest import creer_utilisateur
+
+def creer_demande(demandeur_id: uuid.UUID, statut: StatutDemandeEnum) -> DemandeConge:
+    return DemandeConge(
+        demandeur_id=demandeur_id,
+        type_conge=TypeCongeEnum.CONGES_PAYES,
+        date_debut=date(2025, 7, 1),
+        date_fin=date(2025, 7, 11),
+        nombre_jours="9 jour(s) ouvrable(s) sur 11 jour(s) total",
+        working_time=9,
+        real_time=11,
+        statut=statut
+    )
+
+def test_liste_demandes_drh_avec_actions(contexte):
+    """Le DRH voit toutes les demandes, enrichies du demandeur et des actions selon son rôle"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh", departement.id)
+    chef = creer_utilisateur(RoleEnum.CHEF_SERVICE, "Chef", departement.id)
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    demande_chef = creer_demande(chef.id, StatutDemandeEnum.EN_ATTENTE)
+    demande_employe = creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+    contexte.utilisateur_connecte = drh
+
+    async def scenario():
+        await contexte.ajouter(departement, drh, chef, employe)
+        await contexte.ajouter(demande_chef, demande_employe)
+        async with contexte.client() as client:
+            return await client.get("/api/demandes-conges/")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    demandes = {demande["id"]: demande for demande in response.json()}
+    assert len(demandes) == 2
+
+    chef_demande = demandes[str(demande_chef.id)]
+    assert chef_demande["user"]["nom"] == "Chef"
+    assert chef_demande["user"]["departement"] == "Informatique"
+    assert [action["action"] for action in chef_demande["actions"]] == ["approuver", "refuser", "details"]
+
+    employe_demande = demandes[str(demande_employe.id)]
+    assert employe_demande["user"]["nom"] == "Employe"
+    assert [action["action"] for action in employe_demande["actions"]] == ["generer_attestation", "details"]
+
+def test_liste_demandes_employe_limitee_a_ses_demandes(contexte):
+    """Un employé ne voit que ses propres demandes"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue")
+    demande = creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE)
+    contexte.utilisateur_connecte = employe
+
+    async def scenario():
+        await contexte.ajouter(employe, collegue)
+        await contexte.ajouter(demande, creer_demande(collegue.id, StatutDemandeEnum.EN_ATTENTE))
+        async with contexte.client() as client:
+            return await client.get("/api/demandes-conges/")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    demandes = response.json()
+    assert [d["id"] for d in demandes] == [str(demande.id)]
+    assert [action["action"] for action in demandes[0]["actions"]] == ["modifier", "annuler", "details"]
+
+def test_verification_de_chevauchement_sur_index_couvrant(contexte):
+    """La vérification de chevauchement ne lit que l'index (demandeur, statut, dates, id) et trouve la demande en conflit"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    approuvee = creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(approuvee, creer_demande(employe.id, StatutDemandeEnum.REFUSEE))
+        async with contexte.session_maker() as session:
+            requete = select_demande_chevauchante(
+                employe.id, date(2025, 7, 11), date(2025, 7, 15), exclure_demande_id=uuid.uuid4()
+            )
+            # Le plan est demandé pour la requête exacte, paramètres liés compris
+            executees = []
+
+            def capturer(conn, cursor, statement, parameters, context, executemany):
+                executees.append((statement, parameters))
+
+            event.listen(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+            try:
+                conflit = (await session.execute(requete)).first()
+            finally:
+                event.remove(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+            statement, parameters = executees[-1]
+            connexion = await session.connection()
+            plan = (await connexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            sans_conflit = (await session.execute(
+                select_demande_chevauchante(employe.id, date(2025, 7, 11), date(2025, 7, 15), exclure_demande_id=approuvee.id)
+            )).first()
+        return [ligne[-1] for ligne in plan], conflit, sans_conflit
+
+    plan, conflit, sans_conflit = asyncio.run(scenario())
+
+    assert any("USING COVERING INDEX ix_demandes_conges_demandeur_statut_dates" in etape for etape in plan), plan
+    assert tuple(conflit) == (date(2025, 7, 1), date(2025, 7, 11))
+    assert sans_conflit is None
+
+def test_statistiques_du_dashboard_par_statut(contexte):
+    """Compteurs par statut (tous présents, à 0 si besoin) : demandes de l'employé seul, celles des départements pour le DRH"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh")
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue", departement.id)
+
+    async def scenario():
+        await contexte.ajouter(departement, drh, employe, collegue)
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE),
+            creer_demande(employe.id, StatutDemandeEnum.REFUSEE),
+            creer_demande(employe.id, StatutDemandeEnum.REFUSEE),
+            creer_demande(collegue.id, StatutDemandeEnum.APPROUVEE)
+        )
+        reponses = {}
+        async with contexte.client() as client:
+            for utilisateur in (employe, drh):
+                contexte.utilisateur_connecte = utilisateur
+                reponses[utilisateur.nom] = (await client.get("/api/demandes-conges/stats/dashboard")).json()
+        return reponses
+
+    reponses = asyncio.run(scenario())
+
+    aucune = {statut.value: 0 for statut in StatutDemandeEnum}
+    assert reponses["Employe"]["stats_par_statut"] == {**aucune, "en_attente": 1, "refusee": 2}
+    assert reponses["Employe"]["total_demandes"] == 3
+    assert reponses["Employe"]["kpi_employe"]["demandes_refusees"] == 2
+    assert reponses["Drh"]["stats_par_statut"] == {
+        "approuvee": 1, "refusee": 2, "en_attente": 1, "demande_annulation": 0
+    }
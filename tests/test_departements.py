@@ -0,0 +1,46 @@
+"""
+Tests des routes des départements
+"""
+
+import asyncio
+import uuid
+
+from models.departement import Departement
+from models.user import RoleEnum
+from tests.conftest import creer_utilisateur
+
+def test_absences_reservees_au_drh_et_aux_membres(contexte):
+    """Le calendrier des absences n'est visible que du DRH et des membres du département"""
+    informatique = Departement(id=uuid.uuid4(), nom="Informatique")
+    comptabilite = Departement(id=uuid.uuid4(), nom="Comptabilité")
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh")
+    chef = creer_utilisateur(RoleEnum.CHEF_SERVICE, "Chef", informatique.id)
+    comptable = creer_utilisateur(RoleEnum.EMPLOYE, "Comptable", comptabilite.id)
+    url = f"/api/departements/{informatique.id}/absences/2025/7"
+
+    async def scenario():
+        await contexte.ajouter(informatique, comptabilite)
+        await contexte.ajouter(drh, chef, comptable)
+        statuts = {}
+        async with contexte.client() as client:
+            for utilisateur in (drh, chef, comptable):
+                contexte.utilisateur_connecte = utilisateur
+                statuts[utilisateur.nom] = (await client.get(url)).status_code
+        return statuts
+
+    assert asyncio.run(scenario()) == {"Drh": 200, "Chef": 200, "Comptable": 403}
+
+def test_absences_mois_invalide(contexte):
+    """Un mois ou une année hors bornes est refusé (422) au lieu de provoquer une erreur 500"""
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh")
+    contexte.utilisateur_connecte = drh
+    departement_id = uuid.uuid4()
+
+    async def scenario():
+        async with contexte.client() as client:
+            return [
+                (await client.get(f"/api/departements/{departement_id}/absences/{annee}/{mois}")).status_code
+                for annee, mois in ((2025, 13), (2025, 0), (0, 7), (10000, 7))
+            ]
+
+    assert asyncio.run(scenario()) == [422, 422, 422, 422]
@@ -0,0 +1,65 @@
+"""
+Tests des index composites des demandes de congés et des notifications
+"""
+
+import asyncio
+from datetime import date
+
+from sqlalchemy import event, select
+
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.notification import TypeNotificationEnum
+from models.user import RoleEnum
+from services.notification_service import NotificationService
+from tests.conftest import creer_utilisateur
+
+async def plan_des_requetes(contexte, session, appel):
+    """Exécute l'appel puis retourne le plan (EXPLAIN QUERY PLAN) de chaque requête émise, paramètres liés compris"""
+    executees = []
+
+    def capturer(conn, cursor, statement, parameters, context, executemany):
+        executees.append((statement, parameters))
+
+    event.listen(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+    try:
+        await appel()
+    finally:
+        event.remove(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+
+    connexion = await session.connection()
+    plans = []
+    for statement, parameters in executees:
+        plan = (await connexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+        plans.append(" | ".join(ligne[-1] for ligne in plan))
+    return plans
+
+def test_requetes_servies_par_les_index_composites(contexte):
+    """Les notifications non lues, les demandes d'un valideur et les rappels utilisent leur index composite"""
+    chef = creer_utilisateur(RoleEnum.CHEF_SERVICE, "Chef")
+
+    async def scenario():
+        await contexte.ajouter(chef)
+        async with contexte.session_maker() as session:
+            service = NotificationService(session)
+            notifications = await plan_des_requetes(
+                contexte, session, lambda: service.get_notifications_utilisateur(chef.id, non_lues_seulement=True)
+            )
+            a_valider = await plan_des_requetes(contexte, session, lambda: session.execute(
+                select(DemandeConge).where(
+                    DemandeConge.valideur_id == chef.id,
+                    DemandeConge.statut == StatutDemandeEnum.EN_ATTENTE
+                )
+            ))
+            rappels = await plan_des_requetes(contexte, session, lambda: service._get_demandes_sans_rappel(
+                TypeNotificationEnum.RAPPEL_15_JOURS, DemandeConge.date_debut, date(2025, 7, 1), date(2025, 7, 3)
+            ))
+        return notifications, a_valider, rappels
+
+    notifications, a_valider, rappels = asyncio.run(scenario())
+
+    assert len(notifications) == len(a_valider) == len(rappels) == 1
+    # Tri par date servi par l'index, sans B-tree temporaire
+    assert "ix_notifications_destinataire_lue_date" in notifications[0], notifications
+    assert "TEMP B-TREE" not in notifications[0], notifications
+    assert "ix_demandes_conges_valideur_statut" in a_valider[0], a_valider
+    assert "ix_demandes_conges_statut_dates" in rappels[0], rappels
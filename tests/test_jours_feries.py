@@ -0,0 +1,105 @@
+"""
+Tests des jours fériés
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date
+
+import pytest
+
+from models.user import RoleEnum
+from tests.conftest import creer_utilisateur
+from utils import date_calculator
+from utils.date_calculator import (
+    calculate_working_days, charger_definitions_jours_feries, get_cote_ivoire_holidays,
+    get_holidays_for_year, invalidate_holidays_cache, recharger_jours_feries
+)
+
+def test_annee_hors_bornes(contexte):
+    """Une année hors bornes est refusée (422) au lieu de provoquer une erreur 500"""
+    contexte.utilisateur_connecte = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    async def scenario():
+        async with contexte.client() as client:
+            return [(await client.get(f"/api/jours-feries/{annee}")).status_code for annee in (0, 1899, 2025, 2101, 10000)]
+
+    assert asyncio.run(scenario()) == [422, 422, 200, 422, 422]
+
+def test_annee_absente_du_fichier(caplog):
+    """Une année absente du fichier garde ses jours fériés fixes et chrétiens, avec un avertissement"""
+    invalidate_holidays_cache(2090)
+    with caplog.at_level(logging.WARNING, logger="utils.date_calculator"):
+        jours_feries = get_holidays_for_year(2090)
+
+    assert "2090" in caplog.text
+    assert {date(2090, 1, 1), date(2090, 5, 1), date(2090, 8, 7), date(2090, 11, 15), date(2090, 12, 25)} <= set(jours_feries)
+
+def ecrire_definitions(chemin, jours_variables):
+    chemin.write_text(json.dumps({
+        "version": 99,
+        "fetes_chretiennes": {"mots_cles": ["christmas"]},
+        "jours_fixes": [{"mois": 8, "jour": 7, "nom": "Fête de l'Indépendance"}],
+        "jours_variables": jours_variables
+    }), encoding="utf-8")
+    return chemin
+
+def test_definitions_invalides_refusees(tmp_path):
+    """Une date hors de son année, un champ manquant ou un fichier illisible lèvent ValueError"""
+    hors_annee = ecrire_definitions(tmp_path / "hors_annee.json", {"2030": [{"date": "2031-04-10", "nom": "Aïd"}]})
+    sans_nom = ecrire_definitions(tmp_path / "sans_nom.json", {"2030": [{"date": "2030-04-10"}]})
+    illisible = tmp_path / "illisible.json"
+    illisible.write_text("{pas du json", encoding="utf-8")
+
+    for chemin in (hors_annee, sans_nom, illisible, tmp_path / "absent.json"):
+        with pytest.raises(ValueError):
+            charger_definitions_jours_feries(chemin)
+
+    valide = charger_definitions_jours_feries(
+        ecrire_definitions(tmp_path / "valide.json", {"2030": [{"date": "2030-04-10", "nom": "Aïd"}]})
+    )
+    assert valide["version"] == 99
+    assert valide["jours_variables"] == {2030: [(date(2030, 4, 10), "Aïd")]}
+
+def test_rechargement_invalide_garde_les_anciennes_definitions(tmp_path):
+    """Un fichier invalide est refusé sans toucher aux définitions ni aux jours fériés en place"""
+    try:
+        recharger_jours_feries(ecrire_definitions(tmp_path / "valide.json", {"2030": [{"date": "2030-04-10", "nom": "Aïd"}]}))
+        avant = get_holidays_for_year(2030)
+        assert avant[date(2030, 4, 10)] == "Aïd"
+        assert calculate_working_days(date(2030, 4, 8), date(2030, 4, 12)) == 4
+
+        with pytest.raises(ValueError):
+            recharger_jours_feries(ecrire_definitions(tmp_path / "invalide.json", {"2030": [{"date": "2029-04-10", "nom": "Aïd"}]}))
+
+        invalidate_holidays_cache()
+        assert get_holidays_for_year(2030) == avant
+        assert calculate_working_days(date(2030, 4, 8), date(2030, 4, 12)) == 4
+    finally:
+        recharger_jours_feries()
+
+def test_jours_feries_calcules_une_fois_par_annee(monkeypatch):
+    """Chaque année est calculée une seule fois, jusqu'à son invalidation ; le calendrier ouvrable suit"""
+    calculs = []
+    calculer = date_calculator._compute_cote_ivoire_holidays
+
+    def calculer_en_comptant(year, definitions):
+        calculs.append(year)
+        return calculer(year, definitions)
+
+    monkeypatch.setattr(date_calculator, "_compute_cote_ivoire_holidays", calculer_en_comptant)
+    invalidate_holidays_cache()
+    try:
+        premier = get_cote_ivoire_holidays(2031)
+        assert get_cote_ivoire_holidays(2031) is premier
+        assert calculate_working_days(date(2031, 1, 1), date(2031, 12, 31)) == calculate_working_days(
+            date(2031, 1, 1), date(2031, 12, 31)
+        )
+        assert calculs == [2031]
+
+        invalidate_holidays_cache(2031)
+        assert get_cote_ivoire_holidays(2031) == premier
+        assert calculs == [2031, 2031]
+    finally:
+        invalidate_holidays_cache()
@@ -0,0 +1,301 @@
+"""
+Tests du service de notifications
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, select
+
+import routes.notifications as module_routes_notifications
+import services.notification_service as module_notification_service
+from models.demande_conge import DemandeConge, StatutDemandeEnum
+from models.notification import Notification, NotificationCreate, TypeNotificationEnum
+from models.user import RoleEnum
+from services.notification_broker import notification_broker
+from services.notification_service import NotificationService
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_reprise_dans_un_lot_suit_l_ordre_de_diffusion(contexte):
+    """Reprendre après une notification d'un lot renvoie exactement les suivantes, dans l'ordre du flux"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        abonnement = notification_broker.abonner(employe.id)
+        try:
+            async with contexte.session_maker() as session:
+                await NotificationService(session).creer_notifications_bulk([
+                    NotificationCreate(
+                        destinataire_id=employe.id,
+                        type_notification=TypeNotificationEnum.RAPPEL_15_JOURS,
+                        titre=f"Rappel {numero}",
+                        message="Rappel"
+                    )
+                    for numero in range(10)
+                ])
+            diffusees = [abonnement.file.get_nowait().id for _ in range(10)]
+        finally:
+            notification_broker.desabonner(abonnement)
+
+        async with contexte.session_maker() as session:
+            reprises = await NotificationService(session).get_notifications_depuis(employe.id, diffusees[3])
+        return diffusees, [notification.id for notification in reprises]
+
+    diffusees, reprises = asyncio.run(scenario())
+
+    assert reprises == diffusees[4:]
+
+def test_rappels_ni_doubles_ni_manques(contexte, monkeypatch):
+    """Chaque rappel est envoyé une seule fois, y compris après un jour sans exécution ; pas de rappel « 15 jours » tardif"""
+    jour_0 = date(2025, 6, 2)
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    def demande_approuvee(debut: date, approuvee_le: date) -> DemandeConge:
+        demande = creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+        demande.date_debut = debut
+        demande.date_fin = debut + timedelta(days=4)
+        demande.date_reponse = datetime.combine(approuvee_le, datetime.min.time())
+        return demande
+
+    rappel_jour_0 = demande_approuvee(jour_0 + timedelta(days=15), jour_0 - timedelta(days=30))
+    rappel_jour_saute = demande_approuvee(jour_0 + timedelta(days=16), jour_0 - timedelta(days=30))
+    rappel_jour_2 = demande_approuvee(jour_0 + timedelta(days=17), jour_0 + timedelta(days=2))
+    approuvee_tardivement = demande_approuvee(jour_0 + timedelta(days=14), jour_0 + timedelta(days=1))
+
+    class DateSimulee(date):
+        jour = jour_0
+
+        @classmethod
+        def today(cls):
+            return cls.jour
+
+    monkeypatch.setattr(module_notification_service, "date", DateSimulee)
+
+    async def executer(jour: date) -> int:
+        DateSimulee.jour = jour
+        async with contexte.session_maker() as session:
+            return len(await NotificationService(session).generer_rappels_automatiques())
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(rappel_jour_0, rappel_jour_saute, rappel_jour_2, approuvee_tardivement)
+        # Le jour 1 n'a pas été exécuté ; le jour 2 est exécuté deux fois
+        envoyes = [await executer(jour_0), await executer(jour_0 + timedelta(days=2)),
+                   await executer(jour_0 + timedelta(days=2))]
+        async with contexte.session_maker() as session:
+            result = await session.execute(
+                select(Notification.demande_conge_id, Notification.titre)
+                .where(Notification.type_notification == TypeNotificationEnum.RAPPEL_15_JOURS)
+            )
+            return envoyes, sorted((str(demande_id), titre) for demande_id, titre in result.all())
+
+    envoyes, rappels = asyncio.run(scenario())
+
+    assert envoyes == [1, 2, 0]
+    assert rappels == sorted([
+        (str(rappel_jour_0.id), "Rappel : Congé dans 15 jours"),
+        (str(rappel_jour_saute.id), "Rappel : Congé dans 14 jours"),
+        (str(rappel_jour_2.id), "Rappel : Congé dans 15 jours"),
+    ])
+
+def test_creation_en_lot_un_insert_un_commit(contexte):
+    """Un lot est inséré en une instruction et un commit ; dans une transaction() qui échoue, rien n'est enregistré ni diffusé"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue")
+
+    def rappels(*destinataires):
+        return [
+            NotificationCreate(
+                destinataire_id=destinataire.id,
+                type_notification=TypeNotificationEnum.RAPPEL_15_JOURS,
+                titre="Rappel",
+                message="Rappel"
+            )
+            for destinataire in destinataires
+        ]
+
+    async def scenario():
+        await contexte.ajouter(employe, collegue)
+        insertions = []
+        commits = []
+
+        def capturer(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO notifications"):
+                insertions.append(len(parameters) if executemany else 1)
+
+        def compter_commit(conn):
+            commits.append(1)
+
+        event.listen(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+        event.listen(contexte.engine.sync_engine, "commit", compter_commit)
+        abonnement = notification_broker.abonner(employe.id)
+        try:
+            async with contexte.session_maker() as session:
+                service = NotificationService(session)
+                creees = await service.creer_notifications_bulk(rappels(employe, collegue, employe))
+                bilan_lot = (list(insertions), len(commits))
+                try:
+                    async with service.transaction():
+                        await service.creer_notifications_bulk(rappels(employe))
+                        await service.creer_notifications_bulk(rappels(collegue))
+                        raise RuntimeError("échec simulé")
+                except RuntimeError:
+                    pass
+                diffusees = []
+                while not abonnement.file.empty():
+                    diffusees.append(abonnement.file.get_nowait().id)
+            async with contexte.session_maker() as session:
+                enregistrees = (await session.execute(select(Notification.id))).scalars().all()
+        finally:
+            notification_broker.desabonner(abonnement)
+            event.remove(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+            event.remove(contexte.engine.sync_engine, "commit", compter_commit)
+        return creees, bilan_lot, diffusees, enregistrees
+
+    creees, bilan_lot, diffusees, enregistrees = asyncio.run(scenario())
+
+    assert bilan_lot == ([3], 1)
+    assert sorted(map(str, enregistrees)) == sorted(str(notification.id) for notification in creees)
+    assert diffusees == [creees[0].id, creees[2].id]
+
+def test_compteur_de_non_lues(contexte, monkeypatch):
+    """Le compteur en cache suit les créations et lectures du processus, et relit la base une fois expiré"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    def notification(numero: int) -> Notification:
+        return Notification(
+            destinataire_id=employe.id,
+            type_notification=TypeNotificationEnum.RAPPEL_15_JOURS,
+            titre=f"Rappel {numero}",
+            message="Rappel",
+            date_creation=datetime(2025, 6, 1, 8, numero)
+        )
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(notification(0), notification(1))
+        compteurs = []
+        async with contexte.session_maker() as session:
+            service = NotificationService(session)
+            compteurs.append(await service.compter_non_lues(employe.id))
+            # Notification créée par un autre worker : invisible tant que le compteur est valide
+            await contexte.ajouter(notification(2))
+            compteurs.append(await service.compter_non_lues(employe.id))
+            creee = await service.creer_notification(employe.id, TypeNotificationEnum.RAPPEL_15_JOURS, "Rappel", "Rappel")
+            compteurs.append(await service.compter_non_lues(employe.id))
+            await service.marquer_comme_lue(creee.id, employe.id)
+            # Une seconde lecture de la même notification ne décompte rien
+            await service.marquer_comme_lue(creee.id, employe.id)
+            compteurs.append(await service.compter_non_lues(employe.id))
+            duree_validite = module_notification_service.DUREE_VALIDITE_COMPTEUR
+            monkeypatch.setattr(module_notification_service, "DUREE_VALIDITE_COMPTEUR", 0)
+            compteurs.append(await service.compter_non_lues(employe.id))
+            monkeypatch.setattr(module_notification_service, "DUREE_VALIDITE_COMPTEUR", duree_validite)
+            await service.marquer_toutes_comme_lues(employe.id)
+            compteurs.append(await service.compter_non_lues(employe.id))
+        return compteurs
+
+    assert asyncio.run(scenario()) == [2, 2, 3, 2, 3, 0]
+
+def test_tout_marquer_comme_lu_en_un_update(contexte):
+    """Un seul UPDATE marque les non lues filtrées de l'utilisateur connecté, sans toucher aux autres"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue")
+    contexte.utilisateur_connecte = employe
+
+    def notification(destinataire, type_notification: TypeNotificationEnum, jour: int) -> Notification:
+        return Notification(
+            destinataire_id=destinataire.id,
+            type_notification=type_notification,
+            titre="Notification",
+            message="Notification",
+            date_creation=datetime(2025, 6, jour, 8)
+        )
+
+    async def scenario():
+        await contexte.ajouter(employe, collegue)
+        await contexte.ajouter(
+            notification(employe, TypeNotificationEnum.RAPPEL_15_JOURS, 1),
+            notification(employe, TypeNotificationEnum.RAPPEL_15_JOURS, 10),
+            notification(employe, TypeNotificationEnum.RAPPEL_RETOUR_CONGE, 2),
+            notification(collegue, TypeNotificationEnum.RAPPEL_15_JOURS, 1)
+        )
+        updates = []
+
+        def capturer(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE notifications"):
+                updates.append(statement)
+
+        event.listen(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+        try:
+            async with contexte.client() as client:
+                filtree = await client.put("/api/notifications/marquer-toutes-lues", params={
+                    "avant": "2025-06-05T00:00:00",
+                    "type_notification": TypeNotificationEnum.RAPPEL_15_JOURS.value
+                })
+                compteur = await client.get("/api/notifications/count")
+                toutes = await client.put("/api/notifications/marquer-toutes-lues")
+        finally:
+            event.remove(contexte.engine.sync_engine, "before_cursor_execute", capturer)
+        async with contexte.session_maker() as session:
+            result = await session.execute(select(Notification.destinataire_id, Notification.lue))
+            lues = sorted((str(destinataire_id), lue) for destinataire_id, lue in result.all())
+        return filtree.json()["nombre"], compteur.json()["total_non_lues"], toutes.json()["nombre"], len(updates), lues
+
+    filtree, compteur, toutes, updates, lues = asyncio.run(scenario())
+
+    assert (filtree, compteur, toutes, updates) == (1, 2, 2, 2)
+    assert lues == sorted([(str(employe.id), True)] * 3 + [(str(collegue.id), False)])
+
+def test_reconnexion_sse_avec_last_event_id(contexte, monkeypatch):
+    """À la reconnexion, le flux renvoie les notifications manquées puis le direct, chacune une seule fois"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    anciennes = [
+        Notification(
+            destinataire_id=employe.id,
+            type_notification=TypeNotificationEnum.RAPPEL_15_JOURS,
+            titre=f"Rappel {numero}",
+            message="Rappel",
+            date_creation=datetime(2025, 6, 1, 8, numero)
+        )
+        for numero in range(3)
+    ]
+    monkeypatch.setattr(module_routes_notifications, "async_session_maker", contexte.session_maker)
+
+    class RequeteSimulee:
+        def __init__(self, last_event_id: str):
+            self.headers = {"last-event-id": last_event_id}
+            self.deconnecte = False
+
+        async def is_disconnected(self):
+            return self.deconnecte
+
+    def identifiant(evenement: str) -> str:
+        return evenement.split("\n")[0].removeprefix("id: ")
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(*anciennes)
+        requete = RequeteSimulee(str(anciennes[0].id))
+        reponse = await module_routes_notifications.stream_notifications(requete, current_user=employe)
+        flux = reponse.body_iterator
+        async with contexte.session_maker() as session:
+            service = NotificationService(session)
+            recus = [await flux.__anext__()]
+            # Créée après l'abonnement : reçue en direct et relue par le rattrapage
+            pendant = await service.creer_notification(employe.id, TypeNotificationEnum.RAPPEL_15_JOURS, "Pendant", "Rappel")
+            recus += [identifiant(await flux.__anext__()) for _ in range(3)]
+            apres = await service.creer_notification(employe.id, TypeNotificationEnum.RAPPEL_15_JOURS, "Après", "Rappel")
+            recus.append(identifiant(await flux.__anext__()))
+        requete.deconnecte = True
+        fin = [evenement async for evenement in flux]
+        return recus, fin, [str(pendant.id), str(apres.id)]
+
+    recus, fin, (pendant, apres) = asyncio.run(scenario())
+
+    assert recus[0].startswith("retry:")
+    assert recus[1:] == [str(anciennes[1].id), str(anciennes[2].id), pendant, apres]
+    assert fin == []
+    assert not notification_broker._abonnements.get(employe.id)
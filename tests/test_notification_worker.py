@@ -0,0 +1,112 @@
+"""
+Tests du traitement des notifications en tâche de fond
+"""
+
+import asyncio
+import uuid
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import services.notification_worker as module_worker
+from models.demande_conge import StatutDemandeEnum
+from models.departement import Departement
+from models.notification import Notification, TypeNotificationEnum
+from models.user import RoleEnum
+from services.conflit_service import CongeEquipe
+from services.notification_service import NotificationService
+from services.notification_worker import EvenementDemande, NotificationWorker, TypeEvenementEnum
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_nouvelle_tentative_sans_doublon(contexte, monkeypatch):
+    """Un échec après la première étape annule tout l'événement : la nouvelle tentative n'envoie rien en double"""
+    departement = Departement(id=uuid.uuid4(), nom="Informatique")
+    drh = creer_utilisateur(RoleEnum.DRH, "Drh")
+    chef = creer_utilisateur(RoleEnum.CHEF_SERVICE, "Chef", departement.id)
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe", departement.id)
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue", departement.id)
+    demande = creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE)
+    demande_collegue = creer_demande(collegue.id, StatutDemandeEnum.APPROUVEE)
+
+    monkeypatch.setattr(module_worker, "async_session_maker", contexte.session_maker)
+    monkeypatch.setattr(module_worker, "DELAI_NOUVELLE_TENTATIVE", 0)
+
+    notifier_conflit = NotificationService.notifier_conflit_demande_equipe
+    appels = []
+
+    async def notifier_conflit_echec_unique(self, *args, **kwargs):
+        appels.append(1)
+        if len(appels) == 1:
+            raise RuntimeError("échec simulé")
+        return await notifier_conflit(self, *args, **kwargs)
+
+    monkeypatch.setattr(NotificationService, "notifier_conflit_demande_equipe", notifier_conflit_echec_unique)
+
+    async def scenario():
+        await contexte.ajouter(departement, drh, chef, employe, collegue)
+        await contexte.ajouter(demande, demande_collegue)
+        await NotificationWorker().publier(EvenementDemande(
+            type_evenement=TypeEvenementEnum.DEMANDE_CREEE,
+            demande_id=demande.id,
+            conflits=(CongeEquipe(demande_collegue.id, collegue.id, date(2025, 7, 1), date(2025, 7, 11),
+                                  StatutDemandeEnum.APPROUVEE),),
+            chef_service_id=chef.id
+        ))
+        async with contexte.session_maker() as session:
+            result = await session.execute(select(Notification.destinataire_id, Notification.type_notification))
+            return sorted((str(destinataire_id), type_notification.value) for destinataire_id, type_notification in result.all())
+
+    notifications = asyncio.run(scenario())
+
+    assert len(appels) == 2
+    assert notifications == sorted([
+        (str(chef.id), TypeNotificationEnum.NOUVELLE_DEMANDE.value),
+        (str(drh.id), TypeNotificationEnum.NOUVELLE_DEMANDE.value),
+        (str(chef.id), TypeNotificationEnum.ALERTE_CONFLIT_EQUIPE.value),
+    ])
+
+def test_echec_du_rechargement_limite_a_l_evenement(contexte, monkeypatch):
+    """Un échec de traitement puis de rechargement de la demande est retenté pour cet événement, sans bloquer le reste du lot"""
+    premier = creer_utilisateur(RoleEnum.EMPLOYE, "Premier")
+    second = creer_utilisateur(RoleEnum.EMPLOYE, "Second")
+    demande_premier = creer_demande(premier.id, StatutDemandeEnum.APPROUVEE)
+    demande_second = creer_demande(second.id, StatutDemandeEnum.APPROUVEE)
+
+    monkeypatch.setattr(module_worker, "async_session_maker", contexte.session_maker)
+    monkeypatch.setattr(module_worker, "DELAI_NOUVELLE_TENTATIVE", 0)
+
+    notifier_validation = NotificationService.notifier_validation_demande
+    echecs = {"notification": 1, "rechargement": 1}
+
+    async def notifier_validation_echec_unique(self, demande, *args, **kwargs):
+        if demande.id == demande_premier.id and echecs["notification"]:
+            echecs["notification"] -= 1
+            raise RuntimeError("échec simulé")
+        return await notifier_validation(self, demande, *args, **kwargs)
+
+    get_session = AsyncSession.get
+
+    async def get_echec_unique(self, *args, **kwargs):
+        if echecs["rechargement"]:
+            echecs["rechargement"] -= 1
+            raise RuntimeError("base indisponible")
+        return await get_session(self, *args, **kwargs)
+
+    monkeypatch.setattr(NotificationService, "notifier_validation_demande", notifier_validation_echec_unique)
+    monkeypatch.setattr(AsyncSession, "get", get_echec_unique)
+
+    async def scenario():
+        await contexte.ajouter(premier, second)
+        await contexte.ajouter(demande_premier, demande_second)
+        await NotificationWorker()._traiter_lot([
+            EvenementDemande(TypeEvenementEnum.DEMANDE_VALIDEE, demande_premier.id, approuvee=True),
+            EvenementDemande(TypeEvenementEnum.DEMANDE_VALIDEE, demande_second.id, approuvee=True),
+        ])
+        async with contexte.session_maker() as session:
+            result = await session.execute(select(Notification.destinataire_id))
+            return sorted(str(destinataire_id) for destinataire_id in result.scalars().all())
+
+    assert asyncio.run(scenario()) == sorted([str(premier.id), str(second.id)])
+    assert echecs == {"notification": 0, "rechargement": 0}
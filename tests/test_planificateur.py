@@ -0,0 +1,89 @@
+"""
+Tests des baux d'exécution des tâches planifiées entre plusieurs workers
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import services.planificateur as module_planificateur
+from models.tache_planifiee import ExecutionTache, VerrouTache
+from services.planificateur import Planificateur, TachePlanifiee
+
+def creer_workers(contexte, monkeypatch, appels):
+    """Deux planificateurs (deux workers) partageant la même base et la même tâche"""
+    monkeypatch.setattr(module_planificateur, "async_session_maker", contexte.session_maker)
+
+    async def compter(db):
+        appels.append(1)
+        return "ok"
+
+    tache = TachePlanifiee("tache_test", "0 2 * * *", compter, "Tâche de test")
+    return tache, Planificateur([tache]), Planificateur([tache])
+
+def test_une_seule_execution_par_echeance(contexte, monkeypatch):
+    """Une échéance n'est exécutée que par le premier worker, même après la libération du bail"""
+    appels = []
+    tache, premier, second = creer_workers(contexte, monkeypatch, appels)
+    echeance = datetime(2025, 7, 1, 2, 0)
+
+    async def scenario():
+        resultats = [
+            await premier._executer(tache, echeance),
+            await second._executer(tache, echeance),
+            await second._executer(tache, echeance + timedelta(days=1)),
+        ]
+        async with contexte.session_maker() as session:
+            executions = (await session.execute(select(ExecutionTache))).scalars().all()
+            verrou = await session.get(VerrouTache, tache.nom)
+        return resultats, executions, verrou
+
+    resultats, executions, verrou = asyncio.run(scenario())
+
+    assert [resultat is not None for resultat in resultats] == [True, False, True]
+    assert len(appels) == 2
+    assert sorted((execution.detenteur, execution.succes) for execution in executions) == sorted([
+        (premier.detenteur, True), (second.detenteur, True)
+    ])
+    # Bail libéré, dernière échéance prise en charge enregistrée
+    assert verrou.detenteur == second.detenteur
+    assert verrou.echeance == echeance + timedelta(days=1)
+    assert verrou.expire_le <= datetime.utcnow()
+
+def test_bail_actif_puis_expire(contexte, monkeypatch):
+    """Un bail détenu bloque les autres workers jusqu'à son expiration (détenteur disparu)"""
+    appels = []
+    tache, premier, second = creer_workers(contexte, monkeypatch, appels)
+    echeance = datetime(2025, 7, 1, 2, 0)
+
+    async def acquerir(worker, echeance):
+        async with contexte.session_maker() as session:
+            return await worker._acquerir_bail(session, tache, echeance)
+
+    async def scenario():
+        # Le premier worker prend le bail puis disparaît sans le libérer
+        resultats = [await acquerir(premier, echeance)]
+        resultats.append(await acquerir(second, echeance + timedelta(days=1)))
+        resultats.append(await acquerir(second, None))
+
+        async with contexte.session_maker() as session:
+            await session.execute(
+                update(VerrouTache).where(VerrouTache.nom == tache.nom)
+                .values(expire_le=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await session.commit()
+        resultats.append(await acquerir(second, echeance))
+        resultats.append(await acquerir(second, echeance + timedelta(days=1)))
+        async with contexte.session_maker() as session:
+            verrou = await session.get(VerrouTache, tache.nom)
+        return resultats, verrou
+
+    resultats, verrou = asyncio.run(scenario())
+
+    # Bail actif : ni l'échéance suivante ni une exécution manuelle ; bail expiré : seulement une échéance nouvelle
+    assert resultats == [True, False, False, False, True]
+    assert verrou.detenteur == second.detenteur
+    assert verrou.echeance == echeance + timedelta(days=1)
+    assert verrou.expire_le > datetime.utcnow() + tache.duree_bail - timedelta(minutes=1)
+    assert appels == []
@@ -0,0 +1,125 @@
+"""
+Tests du registre des soldes de congés
+"""
+
+import asyncio
+from datetime import date
+
+from sqlalchemy import func, select
+
+from models.demande_conge import StatutDemandeEnum
+from models.solde_ledger import SoldeLedger
+from models.user import RoleEnum
+from services.solde_ledger_service import SoldeLedgerService
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_lecture_sans_registre_sans_ecriture(contexte):
+    """Sans registre, les totaux sont calculés depuis les demandes sans rien écrire ni valider"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE)
+        )
+        async with contexte.session_maker() as session:
+            # Modification en cours de l'appelant : la lecture ne doit pas la valider
+            session.add(creer_demande(employe.id, StatutDemandeEnum.APPROUVEE))
+            await session.flush()
+            totaux = await SoldeLedgerService(session).get_totaux([employe])
+            annee = await SoldeLedgerService(session).get_annee(employe, 2025)
+            await session.rollback()
+        async with contexte.session_maker() as session:
+            lignes = (await session.execute(select(func.count()).select_from(SoldeLedger))).scalar_one()
+        return totaux, annee, lignes
+
+    totaux, annee, lignes = asyncio.run(scenario())
+
+    assert totaux == {employe.id: (18, 9)}
+    assert annee == (18, 9)
+    assert lignes == 0
+
+def test_transition_apres_reconciliation(contexte):
+    """La réconciliation construit le registre, les transitions le tiennent ensuite à jour"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    demande = creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE)
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(demande)
+        async with contexte.session_maker() as session:
+            await SoldeLedgerService(session).reconcilier()
+            await session.commit()
+        async with contexte.session_maker() as session:
+            service = SoldeLedgerService(session)
+            demande.statut = StatutDemandeEnum.APPROUVEE
+            await service.enregistrer_transition(employe, demande, StatutDemandeEnum.EN_ATTENTE, StatutDemandeEnum.APPROUVEE)
+            await session.commit()
+            return await service.get_annee(employe, 2025), await service.get_annee(employe, date.today().year)
+
+    annee_demande, annee_courante = asyncio.run(scenario())
+
+    assert annee_demande == (9, 0)
+    if date.today().year != 2025:
+        assert annee_courante == (0, 0)
+
+def test_transition_vers_une_annee_sans_ligne(contexte):
+    """Une transition crée la ligne d'une année absente du registre, puis la suppression retire les jours"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    demande = creer_demande(employe.id, StatutDemandeEnum.APPROUVEE)
+
+    async def scenario():
+        await contexte.ajouter(employe)
+        await contexte.ajouter(demande)
+        async with contexte.session_maker() as session:
+            await SoldeLedgerService(session).reconcilier()
+            await session.commit()
+        async with contexte.session_maker() as session:
+            service = SoldeLedgerService(session)
+            # Report de la demande approuvée en 2030, avec un jour de plus
+            demande.date_debut, demande.date_fin, demande.working_time = date(2030, 7, 1), date(2030, 7, 12), 10
+            await service.enregistrer_transition(
+                employe, demande, StatutDemandeEnum.APPROUVEE, StatutDemandeEnum.APPROUVEE,
+                ancienne_date_debut=date(2025, 7, 1), ancien_working_time=9
+            )
+            await session.commit()
+            apres_report = await service.get_annee(employe, 2025), await service.get_annee(employe, 2030)
+            await service.enregistrer_transition(employe, demande, StatutDemandeEnum.APPROUVEE, None)
+            await session.commit()
+            apres_suppression = await service.get_annee(employe, 2030)
+            ecarts = await service.reconcilier()
+        return apres_report, apres_suppression, ecarts
+
+    apres_report, apres_suppression, ecarts = asyncio.run(scenario())
+
+    assert apres_report == ((0, 0), (10, 0))
+    assert apres_suppression == (0, 0)
+    # Les demandes n'ont pas été modifiées en base : le registre ne leur correspond plus
+    assert sorted((ecart["annee"], ecart["jours_pris"]) for ecart in ecarts) == [(2025, (0, 9))]
+
+def test_ecarts_de_reconciliation(contexte):
+    """La réconciliation corrige et signale les écarts d'un registre existant, pas la construction d'un nouveau"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    nouveau = creer_utilisateur(RoleEnum.EMPLOYE, "Nouveau")
+
+    async def scenario():
+        await contexte.ajouter(employe, nouveau)
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(nouveau.id, StatutDemandeEnum.EN_ATTENTE)
+        )
+        await contexte.ajouter(SoldeLedger(user_id=employe.id, annee=2025, jours_pris=4, jours_en_attente=2))
+        async with contexte.session_maker() as session:
+            ecarts = await SoldeLedgerService(session).reconcilier()
+            await session.commit()
+        async with contexte.session_maker() as session:
+            return ecarts, await SoldeLedgerService(session).get_totaux([employe, nouveau])
+
+    ecarts, totaux = asyncio.run(scenario())
+
+    assert [(ecart["user_id"], ecart["annee"], ecart["jours_pris"], ecart["jours_en_attente"]) for ecart in ecarts] == [
+        (employe.id, 2025, (4, 9), (2, 0))
+    ]
+    assert totaux == {employe.id: (9, 0), nouveau.id: (0, 9)}
@@ -0,0 +1,44 @@
+"""
+Tests des listes d'utilisateurs
+"""
+
+import asyncio
+
+from models.demande_conge import StatutDemandeEnum
+from models.user import RoleEnum
+from routes.users import enrich_users_with_solde_restant
+from services.solde_ledger_service import SoldeLedgerService
+from tests.conftest import creer_utilisateur
+from tests.test_demandes_conges import creer_demande
+
+def test_soldes_restants_d_une_liste(contexte):
+    """Le solde restant de chaque utilisateur déduit ses seuls jours approuvés, avec ou sans registre des soldes"""
+    employe = creer_utilisateur(RoleEnum.EMPLOYE, "Employe")
+    collegue = creer_utilisateur(RoleEnum.EMPLOYE, "Collegue")
+    sans_conge = creer_utilisateur(RoleEnum.EMPLOYE, "SansConge")
+    utilisateurs = [employe, collegue, sans_conge]
+
+    async def soldes():
+        async with contexte.session_maker() as session:
+            return [user.solde_conges_restant for user in await enrich_users_with_solde_restant(session, utilisateurs)]
+
+    async def scenario():
+        await contexte.ajouter(*utilisateurs)
+        await contexte.ajouter(
+            creer_demande(employe.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(employe.id, StatutDemandeEnum.EN_ATTENTE),
+            creer_demande(collegue.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(collegue.id, StatutDemandeEnum.APPROUVEE),
+            creer_demande(collegue.id, StatutDemandeEnum.REFUSEE)
+        )
+        sans_registre = await soldes()
+        async with contexte.session_maker() as session:
+            await SoldeLedgerService(session).reconcilier()
+            await session.commit()
+        return sans_registre, await soldes()
+
+    sans_registre, avec_registre = asyncio.run(scenario())
+
+    solde = employe.solde_conges
+    assert sans_registre == [solde - 9, solde - 18, solde]
+    assert avec_registre == sans_registre
@@ -1,7 +1,7 @@
 from .auth import fastapi_users, current_active_user, current_superuser
-from .dependencies import get_current_user, require_role, require_roles
+from .dependencies import get_current_user, get_user_loader, require_role, require_roles
 
 __all__ = [
     "fastapi_users", "current_active_user", "current_superuser",
-    "get_current_user", "require_role", "require_roles"
+    "get_current_user", "get_user_loader", "require_role", "require_roles"
 ] 
\ No newline at end of file
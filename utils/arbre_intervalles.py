@@ -0,0 +1,122 @@
+import random
+from datetime import date
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class _Noeud:
+    """Nœud d'un treap ordonné par (début, clé), augmenté de la fin maximale de son sous-arbre"""
+
+    __slots__ = ("debut", "fin", "cle", "valeur", "priorite", "fin_max", "gauche", "droite")
+
+    def __init__(self, debut: date, fin: date, cle: Hashable, valeur):
+        self.debut = debut
+        self.fin = fin
+        self.cle = cle
+        self.valeur = valeur
+        self.priorite = random.random()
+        self.fin_max = fin
+        self.gauche: Optional["_Noeud"] = None
+        self.droite: Optional["_Noeud"] = None
+
+    def recalculer(self) -> None:
+        fin_max = self.fin
+        if self.gauche is not None and self.gauche.fin_max > fin_max:
+            fin_max = self.gauche.fin_max
+        if self.droite is not None and self.droite.fin_max > fin_max:
+            fin_max = self.droite.fin_max
+        self.fin_max = fin_max
+
+
+def _separer(noeud: Optional[_Noeud], position: tuple) -> Tuple[Optional[_Noeud], Optional[_Noeud]]:
+    """Sépare le treap en (nœuds de position < position, nœuds de position >= position)"""
+    if noeud is None:
+        return None, None
+    if (noeud.debut, noeud.cle) < position:
+        noeud.droite, droite = _separer(noeud.droite, position)
+        noeud.recalculer()
+        return noeud, droite
+    gauche, noeud.gauche = _separer(noeud.gauche, position)
+    noeud.recalculer()
+    return gauche, noeud
+
+
+def _fusionner(gauche: Optional[_Noeud], droite: Optional[_Noeud]) -> Optional[_Noeud]:
+    """Fusionne deux treaps dont toutes les positions de gauche précèdent celles de droite"""
+    if gauche is None:
+        return droite
+    if droite is None:
+        return gauche
+    if gauche.priorite > droite.priorite:
+        gauche.droite = _fusionner(gauche.droite, droite)
+        gauche.recalculer()
+        return gauche
+    droite.gauche = _fusionner(gauche, droite.gauche)
+    droite.recalculer()
+    return droite
+
+
+class ArbreIntervalles:
+    """
+    Arbre d'intervalles de dates fermés [début, fin], identifiés par une clé unique
+
+    Insertion et suppression en O(log n), recherche des k intervalles qui chevauchent
+    une période en O(log n + k) (complexités moyennes du treap). Les clés doivent être
+    comparables entre elles (UUID par exemple).
+    """
+
+    def __init__(self):
+        self._racine: Optional[_Noeud] = None
+        self._debuts: Dict[Hashable, date] = {}
+
+    def __len__(self) -> int:
+        return len(self._debuts)
+
+    def __contains__(self, cle: Hashable) -> bool:
+        return cle in self._debuts
+
+    def inserer(self, cle: Hashable, debut: date, fin: date, valeur=None) -> None:
+        """Ajoute un intervalle (remplace celui de même clé s'il existe)"""
+        self.retirer(cle)
+        gauche, droite = _separer(self._racine, (debut, cle))
+        self._racine = _fusionner(_fusionner(gauche, _Noeud(debut, fin, cle, valeur)), droite)
+        self._debuts[cle] = debut
+
+    def retirer(self, cle: Hashable) -> bool:
+        """Retire l'intervalle de cette clé ; retourne False s'il n'était pas présent"""
+        debut = self._debuts.pop(cle, None)
+        if debut is None:
+            return False
+        gauche, reste = _separer(self._racine, (debut, cle))
+        # Le nœud retiré est le plus petit de `reste` : le détacher en descendant à gauche
+        self._racine = _fusionner(gauche, self._sans_minimum(reste))
+        return True
+
+    def chevauchements(self, debut: date, fin: date) -> List:
+        """Valeurs des intervalles qui chevauchent [debut, fin] (bornes incluses), par date de début"""
+        resultats = []
+        pile = []
+        noeud = self._racine
+        # Parcours infixe élagué : sous-arbres finissant avant `debut` ou commençant après `fin`
+        while pile or noeud is not None:
+            while noeud is not None and noeud.fin_max >= debut:
+                pile.append(noeud)
+                noeud = noeud.gauche
+            if not pile:
+                break
+            noeud = pile.pop()
+            if noeud.debut > fin:
+                break
+            if noeud.fin >= debut:
+                resultats.append(noeud.valeur)
+            noeud = noeud.droite
+        return resultats
+
+    @staticmethod
+    def _sans_minimum(noeud: Optional[_Noeud]) -> Optional[_Noeud]:
+        if noeud is None:
+            return None
+        if noeud.gauche is None:
+            return noeud.droite
+        noeud.gauche = ArbreIntervalles._sans_minimum(noeud.gauche)
+        noeud.recalculer()
+        return noeud
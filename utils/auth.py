@@ -12,15 +12,49 @@ from fastapi_users.db import SQLAlchemyUserDatabase
 
 from models.user import User, UserCreate
 from models.database import get_user_db
+from services.dashboard_snapshot_service import DashboardSnapshotService
+from services.absence_jour_service import AbsenceJourService
+from services.conflit_service import moteur_conflits
 
 SECRET = "SECRET_KEY_CHANGE_IN_PRODUCTION"  # À changer en production
 
+# Champs dont dépendent les effectifs (département, rôle) et le solde total précalculés du dashboard DRH :
+# date_embauche, date_naissance, nombre_enfants, has_medaille_honneur et genre entrent dans User.solde_conges
+CHAMPS_SNAPSHOT_DASHBOARD = {
+    "departement_id", "role", "date_embauche", "date_naissance",
+    "nombre_enfants", "has_medaille_honneur", "genre"
+}
+
 class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
 
+    async def update(self, user_update, user: User, safe: bool = False, request: Optional[Request] = None) -> User:
+        # Mémoriser le département avant modification, utilisé par on_after_update
+        self._ancien_departement_id = user.departement_id
+        return await super().update(user_update, user, safe=safe, request=request)
+
     async def on_after_register(self, user: User, request: Optional[Request] = None):
         print(f"Utilisateur {user.id} s'est inscrit.")
+        if user.departement_id:
+            await self._reconstruire_snapshot_dashboard([user.departement_id])
+
+    async def on_after_update(self, user: User, update_dict: dict, request: Optional[Request] = None):
+        ancien_departement_id = getattr(self, "_ancien_departement_id", None)
+        departements_concernes = [
+            dept_id for dept_id in {ancien_departement_id, user.departement_id} if dept_id
+        ]
+        session = self.user_db.session
+        if "departement_id" in update_dict:
+            await AbsenceJourService(session).changer_departement(user.id, user.departement_id)
+            moteur_conflits.invalider(departements_concernes)
+        if CHAMPS_SNAPSHOT_DASHBOARD & update_dict.keys():
+            await DashboardSnapshotService(session).reconstruire(departements_concernes)
+        await session.commit()
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None):
+        if user.departement_id:
+            await self._reconstruire_snapshot_dashboard([user.departement_id])
 
     async def on_after_forgot_password(
         self, user: User, token: str, request: Optional[Request] = None
@@ -32,6 +66,12 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     ):
         print(f"Vérification demandée pour l'utilisateur {user.id}. Token: {token}")
 
+    async def _reconstruire_snapshot_dashboard(self, departement_ids):
+        """Reconstruit les compteurs du dashboard DRH des départements concernés"""
+        session = self.user_db.session
+        await DashboardSnapshotService(session).reconstruire(departement_ids)
+        await session.commit()
+
 async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
     yield UserManager(user_db)
 
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from typing import FrozenSet, List, Tuple
+
+# (nom, minimum, maximum) des cinq champs d'une expression cron
+CHAMPS_CRON: List[Tuple[str, int, int]] = [
+    ("minute", 0, 59),
+    ("heure", 0, 23),
+    ("jour du mois", 1, 31),
+    ("mois", 1, 12),
+    ("jour de la semaine", 0, 6),  # 0 = dimanche (7 est accepté comme alias)
+]
+
+# Horizon de recherche de la prochaine échéance
+HORIZON_RECHERCHE = timedelta(days=366 * 5)
+
+
+def _parser_champ(valeur: str, nom: str, minimum: int, maximum: int) -> FrozenSet[int]:
+    """Convertit un champ cron (*, n, a-b, listes et pas /n) en ensemble de valeurs"""
+    # Le dimanche peut s'écrire 0 ou 7
+    borne_max = 7 if nom == "jour de la semaine" else maximum
+    valeurs = set()
+    for partie in valeur.split(","):
+        plage, _, pas = partie.partition("/")
+        try:
+            pas = int(pas) if pas else 1
+            if plage == "*":
+                debut, fin = minimum, maximum
+            elif "-" in plage:
+                debut, fin = (int(borne) for borne in plage.split("-", 1))
+            else:
+                debut = int(plage)
+                fin = maximum if pas != 1 else debut
+        except ValueError:
+            raise ValueError(f"Champ cron invalide ({nom}): {valeur!r}")
+        if not (minimum <= debut <= fin <= borne_max) or pas < 1:
+            raise ValueError(f"Champ cron invalide ({nom}): {valeur!r}")
+        valeurs.update(valeur % 7 if borne_max == 7 else valeur for valeur in range(debut, fin + 1, pas))
+    return frozenset(valeurs)
+
+
+class ExpressionCron:
+    """
+    Expression cron à cinq champs : minute heure jour-du-mois mois jour-de-la-semaine
+
+    Comme cron, si le jour du mois et le jour de la semaine sont tous deux restreints,
+    une date convient dès qu'elle correspond à l'un des deux.
+    """
+
+    def __init__(self, expression: str):
+        champs = expression.split()
+        if len(champs) != len(CHAMPS_CRON):
+            raise ValueError(f"Expression cron invalide (5 champs attendus): {expression!r}")
+        self.expression = expression
+        (self.minutes, self.heures, self.jours, self.mois, self.jours_semaine) = (
+            _parser_champ(valeur, nom, minimum, maximum)
+            for valeur, (nom, minimum, maximum) in zip(champs, CHAMPS_CRON)
+        )
+        self._jour_restreint = champs[2] != "*"
+        self._jour_semaine_restreint = champs[4] != "*"
+
+    def __str__(self) -> str:
+        return self.expression
+
+    def _jour_convient(self, instant: datetime) -> bool:
+        jour_ok = instant.day in self.jours
+        # datetime.weekday() : 0 = lundi ; cron : 0 = dimanche
+        jour_semaine_ok = (instant.weekday() + 1) % 7 in self.jours_semaine
+        if self._jour_restreint and self._jour_semaine_restreint:
+            return jour_ok or jour_semaine_ok
+        return jour_ok and jour_semaine_ok
+
+    def prochaine_echeance(self, apres: datetime) -> datetime:
+        """Première échéance strictement postérieure à `apres` (à la minute près)"""
+        instant = apres.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = instant + HORIZON_RECHERCHE
+        while instant < limite:
+            # Avancer par mois, jour puis heure entiers tant qu'ils ne conviennent pas
+            if instant.month not in self.mois:
+                annee, mois = divmod(instant.month, 12)
+                instant = instant.replace(year=instant.year + annee, month=mois + 1, day=1, hour=0, minute=0)
+            elif not self._jour_convient(instant):
+                instant = (instant + timedelta(days=1)).replace(hour=0, minute=0)
+            elif instant.hour not in self.heures:
+                instant = (instant + timedelta(hours=1)).replace(minute=0)
+            elif instant.minute not in self.minutes:
+                instant += timedelta(minutes=1)
+            else:
+                return instant
+        raise ValueError(f"Aucune échéance trouvée pour l'expression cron {self.expression!r}")
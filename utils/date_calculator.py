@@ -1,65 +1,190 @@
+import json
+import logging
+import threading
 import holidays
+import numpy as np
 from datetime import date, timedelta
-from typing import Set, Tuple
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
 
+# Semaine ouvrable : du lundi au vendredi
+WEEKMASK_OUVRABLE = "1111100"
 
-def get_cote_ivoire_holidays(year: int) -> Set[date]:
+logger = logging.getLogger(__name__)
+
+# Fichier versionné des définitions de jours fériés
+JOURS_FERIES_FILE = Path(__file__).resolve().parent.parent / "data" / "jours_feries.json"
+
+
+class JoursFeriesAnnee(NamedTuple):
+    """Jours fériés d'une année : noms par date et ensemble des dates"""
+    noms: Dict[date, str]
+    dates: FrozenSet[date]
+
+
+# Définitions chargées depuis JOURS_FERIES_FILE et registre partagé par tout le processus
+_definitions: Optional[dict] = None
+_holidays_par_annee: Dict[int, JoursFeriesAnnee] = {}
+_holidays_lock = threading.Lock()
+
+
+def charger_definitions_jours_feries(path: Path = JOURS_FERIES_FILE) -> dict:
+    """
+    Lit et valide le fichier de définitions des jours fériés
+    Lève ValueError si le fichier est invalide
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        
+        definitions = {
+            "version": data["version"],
+            "mots_cles_chretiens": [
+                mot.lower() for mot in data.get("fetes_chretiennes", {}).get("mots_cles", [])
+            ],
+            "jours_fixes": [
+                (int(jour["mois"]), int(jour["jour"]), jour["nom"])
+                for jour in data.get("jours_fixes", [])
+            ],
+            "jours_variables": {
+                int(annee): [
+                    (date.fromisoformat(jour["date"]), jour["nom"]) for jour in jours
+                ]
+                for annee, jours in data.get("jours_variables", {}).items()
+            }
+        }
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Fichier de jours fériés invalide ({path}): {e}")
+    
+    for annee, jours in definitions["jours_variables"].items():
+        if any(jour.year != annee for jour, _ in jours):
+            raise ValueError(f"Fichier de jours fériés invalide ({path}): date hors de l'année {annee}")
+    
+    return definitions
+
+
+def _get_definitions() -> dict:
+    """Retourne les définitions courantes (chargées au premier appel)"""
+    global _definitions
+    if _definitions is None:
+        _definitions = charger_definitions_jours_feries()
+    return _definitions
+
+
+def get_jours_feries_annee(year: int) -> JoursFeriesAnnee:
     """
-    Retourne l'ensemble des jours fériés en Côte d'Ivoire pour une année donnée
-    Basé sur les jours fériés français (pour les fêtes chrétiennes) mais adapté
+    Retourne les jours fériés en Côte d'Ivoire pour une année donnée
+    Chaque année n'est calculée qu'une fois, puis servie depuis le registre en mémoire
     """
-    # Commencer avec les jours fériés français pour avoir les fêtes chrétiennes
-    french_holidays = holidays.France(years=year)
+    jours_feries = _holidays_par_annee.get(year)
+    if jours_feries is not None:
+        return jours_feries
     
-    # Créer notre propre ensemble de jours fériés
-    ci_holidays = set()
+    with _holidays_lock:
+        # Une autre requête a pu calculer l'année pendant l'attente du verrou
+        jours_feries = _holidays_par_annee.get(year)
+        if jours_feries is None:
+            noms = _compute_cote_ivoire_holidays(year, _get_definitions())
+            jours_feries = JoursFeriesAnnee(noms, frozenset(noms))
+            _holidays_par_annee[year] = jours_feries
+    return jours_feries
+
+
+def get_cote_ivoire_holidays(year: int) -> FrozenSet[date]:
+    """Retourne l'ensemble des jours fériés en Côte d'Ivoire pour une année donnée"""
+    return get_jours_feries_annee(year).dates
+
+
+def warm_holidays_cache(years: Iterable[int]) -> None:
+    """Précalcule les jours fériés (et le calendrier ouvrable) des années données"""
+    years = sorted(set(years))
+    for year in years:
+        get_cote_ivoire_holidays(year)
+    if years:
+        _get_busday_calendar(years[0], years[-1])
+
+
+def invalidate_holidays_cache(year: Optional[int] = None) -> None:
+    """
+    Oublie les jours fériés mémorisés (une année ou toutes), à appeler quand les
+    données des jours fériés changent ; les calendriers ouvrables sont aussi vidés
+    """
+    with _holidays_lock:
+        if year is None:
+            _holidays_par_annee.clear()
+        else:
+            _holidays_par_annee.pop(year, None)
+        _get_busday_calendar.cache_clear()
+
+
+def recharger_jours_feries(path: Path = JOURS_FERIES_FILE) -> dict:
+    """
+    Recharge le fichier de jours fériés sans redémarrer le processus
+    
+    Le fichier est validé avant de remplacer les définitions courantes : en cas
+    d'erreur, les anciennes définitions restent en place et ValueError est levée.
+    """
+    global _definitions
+    definitions = charger_definitions_jours_feries(path)
+    with _holidays_lock:
+        _definitions = definitions
+    invalidate_holidays_cache()
+    
+    annee_courante = date.today().year
+    warm_holidays_cache([annee_courante, annee_courante + 1])
+    
+    return {
+        "version": definitions["version"],
+        "annees_definies": sorted(definitions["jours_variables"])
+    }
+
+
+def _compute_cote_ivoire_holidays(year: int, definitions: dict) -> Dict[date, str]:
+    """
+    Calcule les jours fériés en Côte d'Ivoire (date -> nom) pour une année donnée
+    Basé sur les jours fériés français (pour les fêtes chrétiennes) et sur le fichier de définitions
+    """
+    ci_holidays = {}
     
     # Ajouter les jours fériés chrétiens de France qui s'appliquent aussi en Côte d'Ivoire
-    for holiday_date, name in french_holidays.items():
-        # Garder seulement les fêtes chrétiennes universelles
+    mots_cles = definitions["mots_cles_chretiens"]
+    for holiday_date, name in holidays.France(years=year).items():
         name_lower = name.lower()
-        if any(keyword in name_lower for keyword in [
-            'new year', 'nouvel an',
-            'easter monday', 'lundi de pâques',
-            'ascension', 
-            'whit monday', 'lundi de pentecôte',
-            'assumption', 'assomption',
-            'all saints', 'toussaint',
-            'christmas', 'noël'
-        ]):
-            ci_holidays.add(holiday_date)
-    
-    # Ajouter les jours fériés spécifiques à la Côte d'Ivoire
+        if any(keyword in name_lower for keyword in mots_cles):
+            ci_holidays[holiday_date] = name
     
     # Jours fériés fixes spécifiques à la Côte d'Ivoire
-    ci_holidays.add(date(year, 5, 1))   # Fête du Travail
-    ci_holidays.add(date(year, 8, 7))   # Fête de l'Indépendance
-    ci_holidays.add(date(year, 11, 15)) # Jour de la Paix
+    for mois, jour, nom in definitions["jours_fixes"]:
+        ci_holidays[date(year, mois, jour)] = nom
     
-    # Ajouter les fêtes musulmanes (approximatives - ces dates varient selon le calendrier lunaire)
-    # En production, il faudrait utiliser une API ou base de données pour ces dates exactes
-    
-    # Dates approximatives pour 2024
-    if year == 2024:
-        ci_holidays.add(date(2024, 4, 10))  # Aïd el-Fitr (Fin du Ramadan)
-        ci_holidays.add(date(2024, 6, 16))  # Aïd el-Kebir (Fête du Sacrifice)
-        ci_holidays.add(date(2024, 9, 15))  # Maouloud (Naissance du Prophète)
-        
-    # Dates approximatives pour 2025  
-    elif year == 2025:
-        ci_holidays.add(date(2025, 3, 30))  # Aïd el-Fitr (Fin du Ramadan)
-        ci_holidays.add(date(2025, 6, 6))   # Aïd el-Kebir (Fête du Sacrifice)
-        ci_holidays.add(date(2025, 9, 4))   # Maouloud (Naissance du Prophète)
-        
-    # Dates approximatives pour 2026
-    elif year == 2026:
-        ci_holidays.add(date(2026, 3, 20))  # Aïd el-Fitr (Fin du Ramadan)
-        ci_holidays.add(date(2026, 5, 27))  # Aïd el-Kebir (Fête du Sacrifice)
-        ci_holidays.add(date(2026, 8, 25))  # Maouloud (Naissance du Prophète)
+    # Fêtes musulmanes : leurs dates suivent le calendrier lunaire et doivent être renseignées chaque année
+    jours_variables = definitions["jours_variables"].get(year)
+    if jours_variables is None:
+        logger.warning(
+            "Aucune date de fête musulmane définie pour %s dans %s : seuls les jours fériés fixes "
+            "et chrétiens sont pris en compte", year, JOURS_FERIES_FILE.name
+        )
+    for jour, nom in jours_variables or []:
+        ci_holidays[jour] = nom
     
     return ci_holidays
 
 
+@lru_cache(maxsize=32)
+def _get_busday_calendar(start_year: int, end_year: int) -> np.busdaycalendar:
+    """
+    Construit (une seule fois par plage d'années) le calendrier numpy des jours ouvrables
+    avec le tableau trié des jours fériés de Côte d'Ivoire
+    """
+    holidays_set = set()
+    for year in range(start_year, end_year + 1):
+        holidays_set.update(get_cote_ivoire_holidays(year))
+    
+    holidays_array = np.array(sorted(holidays_set), dtype="datetime64[D]")
+    return np.busdaycalendar(weekmask=WEEKMASK_OUVRABLE, holidays=holidays_array)
+
+
 def calculate_working_days(start_date: date, end_date: date) -> int:
     """
     Calcule le nombre de jours ouvrables entre deux dates en excluant :
@@ -69,24 +194,9 @@ def calculate_working_days(start_date: date, end_date: date) -> int:
     if start_date > end_date:
         return 0
     
-    # Obtenir tous les jours fériés pour les années concernées
-    holidays_set = set()
-    for year in range(start_date.year, end_date.year + 1):
-        holidays_set.update(get_cote_ivoire_holidays(year))
-    
-    # Compter les jours ouvrables
-    current_date = start_date
-    working_days = 0
-    
-    while current_date <= end_date:
-        # Vérifier si c'est un jour ouvrable
-        # weekday(): Lundi=0, Dimanche=6
-        # Weekend = samedi(5) et dimanche(6)
-        if current_date.weekday() < 5 and current_date not in holidays_set:
-            working_days += 1
-        current_date += timedelta(days=1)
-    
-    return working_days
+    calendar = _get_busday_calendar(start_date.year, end_date.year)
+    # busday_count exclut la date de fin : on compte jusqu'au lendemain pour l'inclure
+    return int(np.busday_count(start_date, end_date + timedelta(days=1), busdaycal=calendar))
 
 
 def calculate_total_days(start_date: date, end_date: date) -> int:
@@ -124,53 +234,4 @@ def get_holidays_for_year(year: int) -> dict:
     Retourne un dictionnaire des jours fériés avec leurs noms pour une année donnée
     Utile pour le debugging et l'affichage
     """
-    # Obtenir les jours fériés français pour les noms
-    french_holidays = holidays.France(years=year)
-    ci_holidays_set = get_cote_ivoire_holidays(year)
-    
-    result = {}
-    for holiday_date in ci_holidays_set:
-        # Essayer de trouver le nom dans les jours fériés français
-        if holiday_date in french_holidays:
-            result[holiday_date] = french_holidays[holiday_date]
-        else:
-            # Sinon, donner un nom basé sur la date
-            if holiday_date.month == 5 and holiday_date.day == 1:
-                result[holiday_date] = "Fête du Travail"
-            elif holiday_date.month == 8 and holiday_date.day == 7:
-                result[holiday_date] = "Fête de l'Indépendance"
-            elif holiday_date.month == 11 and holiday_date.day == 15:
-                result[holiday_date] = "Jour de la Paix"
-            else:
-                # Pour les fêtes musulmanes, déterminer le nom selon l'année et le mois
-                if year == 2024:
-                    if holiday_date.month == 4 and holiday_date.day == 10:
-                        result[holiday_date] = "Aïd el-Fitr (Fin du Ramadan)"
-                    elif holiday_date.month == 6 and holiday_date.day == 16:
-                        result[holiday_date] = "Aïd el-Kebir (Fête du Sacrifice)"
-                    elif holiday_date.month == 9 and holiday_date.day == 15:
-                        result[holiday_date] = "Maouloud (Naissance du Prophète)"
-                    else:
-                        result[holiday_date] = "Jour férié"
-                elif year == 2025:
-                    if holiday_date.month == 3 and holiday_date.day == 30:
-                        result[holiday_date] = "Aïd el-Fitr (Fin du Ramadan)"
-                    elif holiday_date.month == 6 and holiday_date.day == 6:
-                        result[holiday_date] = "Aïd el-Kebir (Fête du Sacrifice)"
-                    elif holiday_date.month == 9 and holiday_date.day == 4:
-                        result[holiday_date] = "Maouloud (Naissance du Prophète)"
-                    else:
-                        result[holiday_date] = "Jour férié"
-                elif year == 2026:
-                    if holiday_date.month == 3 and holiday_date.day == 20:
-                        result[holiday_date] = "Aïd el-Fitr (Fin du Ramadan)"
-                    elif holiday_date.month == 5 and holiday_date.day == 27:
-                        result[holiday_date] = "Aïd el-Kebir (Fête du Sacrifice)"
-                    elif holiday_date.month == 8 and holiday_date.day == 25:
-                        result[holiday_date] = "Maouloud (Naissance du Prophète)"
-                    else:
-                        result[holiday_date] = "Jour férié"
-                else:
-                    result[holiday_date] = "Jour férié"
-    
-    return result 
\ No newline at end of file
+    return dict(get_jours_feries_annee(year).noms)
@@ -1,14 +1,20 @@
 from typing import List
 from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.user import User, RoleEnum
-from models.database import get_user_db
+from models.database import get_user_db, get_database
 from .auth import current_active_user
+from .user_loader import UserLoader
 
 async def get_current_user(user: User = Depends(current_active_user)) -> User:
     """Récupère l'utilisateur actuel connecté"""
     return user
 
+async def get_user_loader(db: AsyncSession = Depends(get_database)) -> UserLoader:
+    """Fournit le chargeur d'utilisateurs partagé par tous les consommateurs d'une même requête"""
+    return UserLoader(db)
+
 def require_role(required_role: RoleEnum):
     """Décorateur de dépendance pour vérifier qu'un utilisateur a le rôle requis"""
     async def check_role(user: User = Depends(current_active_user)) -> User:
@@ -0,0 +1,127 @@
+import asyncio
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.user import User
+from models.departement import Departement
+from models.demande_conge import UserBasicInfo
+
+def build_user_basic_info(user: User, departement_nom: Optional[str]) -> UserBasicInfo:
+    """Construit les informations utilisateur de base à partir d'un utilisateur déjà chargé"""
+    return UserBasicInfo(
+        id=user.id,
+        nom=user.nom,
+        prenom=user.prenom,
+        email=user.email,
+        role=user.role.value if user.role else None,
+        departement=departement_nom
+    )
+
+class UserLoader:
+    """
+    Chargeur d'utilisateurs à portée de requête (pattern DataLoader)
+
+    Les identifiants demandés pendant un même tour de la boucle d'événements sont
+    regroupés en une seule requête `SELECT ... WHERE id IN (...)`, et chaque
+    utilisateur n'est chargé qu'une fois pour toute la durée de la requête HTTP.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._futures: Dict[uuid.UUID, asyncio.Future] = {}
+        self._departements: Dict[uuid.UUID, Optional[str]] = {}
+        self._pending: List[uuid.UUID] = []
+        self._dispatch_scheduled = False
+        # Références fortes sur les chargements groupés en cours : la boucle d'événements
+        # ne garde qu'une référence faible sur ses tâches
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+        # La session n'accepte pas d'opérations concurrentes
+        self._lock = asyncio.Lock()
+
+    def load(self, user_id: uuid.UUID) -> "asyncio.Future[Optional[User]]":
+        """Retourne un awaitable résolu avec l'utilisateur (ou None s'il n'existe pas)"""
+        future = self._futures.get(user_id)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures[user_id] = future
+        self._pending.append(user_id)
+
+        # Planifier un seul chargement groupé pour ce tour de boucle
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            task = loop.create_task(self._dispatch())
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+        return future
+
+    async def load_many(self, user_ids: Iterable[Optional[uuid.UUID]]) -> Dict[uuid.UUID, User]:
+        """Charge plusieurs utilisateurs en un seul lot (les identifiants vides sont ignorés)"""
+        ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        users = await asyncio.gather(*(self.load(user_id) for user_id in ids))
+        return {user_id: user for user_id, user in zip(ids, users) if user is not None}
+
+    async def load_basic_info(self, user_id: uuid.UUID) -> Optional[UserBasicInfo]:
+        """Charge les informations de base d'un utilisateur (avec le nom du département)"""
+        user = await self.load(user_id)
+        if user is None:
+            return None
+        return build_user_basic_info(user, self._departements.get(user_id))
+
+    async def load_basic_infos(self, user_ids: Iterable[Optional[uuid.UUID]]) -> Dict[uuid.UUID, UserBasicInfo]:
+        """Charge les informations de base de plusieurs utilisateurs en un seul lot"""
+        users = await self.load_many(user_ids)
+        return {
+            user_id: build_user_basic_info(user, self._departements.get(user_id))
+            for user_id, user in users.items()
+        }
+
+    def clear(self, user_id: Optional[uuid.UUID] = None) -> None:
+        """Oublie un utilisateur mémorisé (ou tous) après une modification"""
+        if user_id is None:
+            self._futures = {
+                key: future for key, future in self._futures.items() if not future.done()
+            }
+            self._departements.clear()
+        elif user_id in self._futures and self._futures[user_id].done():
+            del self._futures[user_id]
+            self._departements.pop(user_id, None)
+
+    async def _dispatch(self) -> None:
+        """Exécute la requête groupée pour tous les identifiants en attente"""
+        async with self._lock:
+            ids = self._pending
+            self._pending = []
+            self._dispatch_scheduled = False
+            if not ids:
+                return
+
+            try:
+                result = await self.db.execute(
+                    select(User, Departement.nom.label('departement_nom'))
+                    .outerjoin(Departement, User.departement_id == Departement.id)
+                    .where(User.id.in_(ids))
+                )
+                rows = result.all()
+            except Exception as e:
+                for user_id in ids:
+                    future = self._futures.pop(user_id, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                return
+
+            users = {}
+            for user, departement_nom in rows:
+                users[user.id] = user
+                self._departements[user.id] = departement_nom
+
+            for user_id in ids:
+                future = self._futures.get(user_id)
+                if future is not None and not future.done():
+                    future.set_result(users.get(user_id))